@@ -0,0 +1,251 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+A long-running analyzer that serves requests on a Unix socket, so editors and
+build systems pay for starting Python and importing the analyzer once.
+
+Every request and every response is a single line of JSON. A request is one
+of:
+
+    {"source": "<Jack source>", ...options}
+        analyzes the source, and responds with {"ok": true, "output": ...}.
+        For the "binary" format the output is base64, and the response also
+        holds "encoding": "base64". A syntax error responds with
+        {"ok": false, "error": ...}, and in recover mode also with every
+        error in "errors" and the output in "output".
+    {"paths": ["<.jack file or directory>", ...], ...options}
+        analyzes the files as JackAnalyzer does, writing every output next
+        to its input, and responds with {"ok": ..., "errors": [{"path": ...,
+        "error": ...}, ...]}.
+    {"command": "ping"} or {"command": "shutdown"}
+
+The options are "format", "parser" and "recover", as on the command line,
+and "tokens", which asks for the tokens xml of a source instead.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import typing
+from CompilationEngine import CompilationError, CompilationErrors
+from Emitters import EMITTERS
+from JackAnalyzer import (ENGINES, analyze_file, analyze_paths,
+                          create_token_file, find_jack_files)
+
+
+class RequestError(Exception):
+    """A request that cannot be served as it is."""
+
+
+def _option(request: dict, name: str, choices: typing.Iterable[str],
+            default: str) -> str:
+    value = request.get(name, default)
+    if value not in choices:
+        raise RequestError(f"{name} must be one of {', '.join(choices)}, "
+                           f"not {value!r}")
+    return value
+
+
+def handle_request(request: dict) -> dict:
+    """Serves a single request.
+
+    Args:
+        request (dict): the request, see the module docstring.
+
+    Returns:
+        dict: the response.
+
+    Raises:
+        RequestError: the request is malformed.
+    """
+    output_format = _option(request, "format", EMITTERS, "xml")
+    parser = _option(request, "parser", ENGINES, "recursive")
+    recover = bool(request.get("recover", False))
+    if "source" in request:
+        source = request["source"]
+        if not isinstance(source, str):
+            raise RequestError("source must be a string")
+        return _analyze_source(source, output_format, parser, recover,
+                               bool(request.get("tokens", False)))
+    if "paths" in request:
+        paths = request["paths"]
+        if not isinstance(paths, list) or \
+                not all(isinstance(path, str) for path in paths):
+            raise RequestError("paths must be a list of strings")
+        jack_files = [
+            input_path for path in paths
+            for input_path in find_jack_files(path)
+            if os.path.splitext(input_path)[1].lower() == ".jack"]
+        errors = analyze_paths(jack_files, output_format, parser=parser,
+                               recover=recover)
+        return {"ok": not errors,
+                "errors": [{"path": input_path, "error": str(error)}
+                           for input_path, error in errors]}
+    raise RequestError("a request needs a source, paths or a command")
+
+
+def _analyze_source(source: str, output_format: str, parser: str,
+                    recover: bool, tokens: bool) -> dict:
+    output_file = io.BytesIO() if output_format == "binary" and not tokens \
+        else io.StringIO()
+    response = {"ok": True}
+    try:
+        if tokens:
+            create_token_file(io.StringIO(source), output_file)
+        else:
+            analyze_file(io.StringIO(source), output_file,
+                         output_format=output_format, parser=parser,
+                         recover=recover)
+    except CompilationErrors as error:
+        response = {"ok": False, "error": str(error),
+                    "errors": [str(each) for each in error.errors]}
+    except CompilationError as error:
+        return {"ok": False, "error": str(error)}
+    output = output_file.getvalue()
+    if isinstance(output, bytes):
+        response["encoding"] = "base64"
+        output = base64.b64encode(output).decode("ascii")
+    response["output"] = output
+    return response
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    # Serves the requests of one connection, one line each, until the client
+    # closes it.
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise RequestError("a request must be a JSON object")
+                command = request.get("command")
+                if command == "shutdown":
+                    self._respond({"ok": True})
+                    # Returns once serve_forever(), which runs in another
+                    # thread, has stopped.
+                    self.server.shutdown()
+                    return
+                if command == "ping":
+                    response = {"ok": True}
+                elif command is not None:
+                    raise RequestError(f"unknown command {command!r}")
+                else:
+                    response = handle_request(request)
+            except (ValueError, RequestError) as error:
+                response = {"ok": False, "error": f"bad request: {error}"}
+            except Exception as error:
+                response = {"ok": False,
+                            "error": f"{type(error).__name__}: {error}"}
+            self._respond(response)
+
+    def _respond(self, response: dict) -> None:
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class AnalyzerServer(socketserver.ThreadingMixIn,
+                     socketserver.UnixStreamServer):
+    """Serves analysis requests on a Unix socket, one thread per connection,
+    until a client asks it to shut down.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str) -> None:
+        """Creates the socket, readable and writable by this user only.
+
+        Args:
+            socket_path (str): where to create the socket. A socket left
+                there by a server that is gone is replaced.
+
+        Raises:
+            OSError: a server is already listening on socket_path, or it is
+                not a socket.
+        """
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise OSError(f"{socket_path} exists and is not a socket")
+            try:
+                request(socket_path, {"command": "ping"})
+            except OSError:
+                os.unlink(socket_path)
+            else:
+                raise OSError(f"a server is already listening on "
+                              f"{socket_path}")
+        previous_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(previous_umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def request(socket_path: str, message: dict) -> dict:
+    """Sends a single request to a server and waits for its response.
+
+    Args:
+        socket_path (str): the socket the server listens on.
+        message (dict): the request, see the module docstring.
+
+    Returns:
+        dict: the response.
+
+    Raises:
+        OSError: there is no server listening on socket_path.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with connection.makefile("rb") as responses:
+            return json.loads(responses.readline())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="AnalyzerServer",
+        description="Serves JackAnalyzer requests on a Unix socket.")
+    parser.add_argument("socket_path", help="path of the socket")
+    parser.add_argument(
+        "--stop", action="store_true",
+        help="ask the server listening on the socket to shut down")
+    arguments = parser.parse_args()
+    if arguments.stop:
+        try:
+            request(arguments.socket_path, {"command": "shutdown"})
+        except OSError as error:
+            print(f"AnalyzerServer: {error}", file=sys.stderr)
+            sys.exit(1)
+        return
+    try:
+        server = AnalyzerServer(arguments.socket_path)
+    except OSError as error:
+        print(f"AnalyzerServer: {error}", file=sys.stderr)
+        sys.exit(1)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
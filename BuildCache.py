@@ -0,0 +1,175 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import json
+import os
+import typing
+
+# Default name of the manifest, kept in the analyzed directory.
+MANIFEST_NAME = ".jackcache.json"
+
+# The modules whose code determines the analyzer's output.
+_ANALYZER_MODULES = (
+    "JackAnalyzer.py", "JackTokenizer.py", "CompilationEngine.py",
+    "Emitters.py", "PredictiveParser.py", "ParseTree.py", "Pipeline.py",
+    "ParallelParser.py")
+
+
+def file_digest(path: str) -> str:
+    """
+    Args:
+        path (str): path of a file.
+
+    Returns:
+        str: the SHA-256 hex digest of the file's content.
+    """
+    import hashlib
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def analyzer_version() -> str:
+    """Hashes the analyzer's own source code, so that changing the analyzer
+    invalidates everything it cached.
+
+    Returns:
+        str: a SHA-256 hex digest.
+    """
+    import hashlib
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module in _ANALYZER_MODULES:
+        with open(os.path.join(directory, module), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def _stat_key(path: str) -> typing.List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class BuildCache:
+    """A persistent manifest of the outputs the analyzer has written.
+
+    Each entry is keyed by the path of a .jack file relative to the manifest,
+    and holds the SHA-256 of the source it was built from, the output format,
+    and the size and modification time of both files. A file whose source
+    size and modification time have not changed is not even hashed, and one
+    that was only touched is recognised by its hash. The whole manifest is
+    dropped when the analyzer's version changes.
+    """
+
+    def __init__(self, manifest_path: str,
+                 version: typing.Optional[str] = None) -> None:
+        """Loads the manifest, if there is one. One that cannot be read is
+        treated as empty.
+
+        Args:
+            manifest_path (str): path of the manifest file.
+            version (str, optional): version of the analyzer. Defaults to
+                analyzer_version().
+        """
+        self.manifest_path = os.path.abspath(manifest_path)
+        self.version = version if version is not None else analyzer_version()
+        self._root = os.path.dirname(self.manifest_path)
+        self._entries: typing.Dict[str, dict] = {}
+        self._digests: typing.Dict[str, str] = {}
+        try:
+            with open(self.manifest_path, 'r') as manifest:
+                data = json.load(manifest)
+            if isinstance(data, dict) and \
+                    data.get("version") == self.version and \
+                    isinstance(data.get("entries"), dict):
+                self._entries = data["entries"]
+        except (OSError, ValueError):
+            pass
+
+    def _key(self, input_path: str) -> str:
+        return os.path.relpath(os.path.abspath(input_path), self._root)
+
+    def is_fresh(self, input_path: str, output_path: str,
+                 output_format: str) -> bool:
+        """Checks whether the output of a file is up to date.
+
+        Args:
+            input_path (str): path of the .jack file.
+            output_path (str): path of its output.
+            output_format (str): the format the output should be in.
+
+        Returns:
+            bool: True if output_path holds the output for the current
+            content of input_path, in output_format.
+        """
+        key = self._key(input_path)
+        entry = self._entries.get(key)
+        try:
+            source_stat = _stat_key(input_path)
+            if entry is not None and entry["source_stat"] == source_stat:
+                digest = entry["source"]
+            else:
+                digest = file_digest(input_path)
+            self._digests[key] = digest
+            return entry is not None and entry["source"] == digest and \
+                entry["format"] == output_format and \
+                entry["output_stat"] == _stat_key(output_path)
+        except (OSError, LookupError, TypeError):
+            # A missing file, or an entry of a manifest edited by hand.
+            return False
+
+    def store(self, input_path: str, output_path: str, output_format: str,
+              output: typing.Union[str, bytes]) -> None:
+        """Writes an output, unless the file already holds exactly that
+        output, and records it.
+
+        Args:
+            input_path (str): path of the .jack file.
+            output_path (str): path of its output.
+            output_format (str): the format of the output.
+            output (str | bytes): the output.
+        """
+        key = self._key(input_path)
+        encoded = output if isinstance(output, bytes) else output.encode()
+        try:
+            with open(output_path, 'rb') as existing:
+                unchanged = existing.read() == encoded
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            with open(output_path, 'wb') as output_file:
+                output_file.write(encoded)
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = file_digest(input_path)
+        self._entries[key] = {
+            "source": digest,
+            "source_stat": _stat_key(input_path),
+            "format": output_format,
+            "output_stat": _stat_key(output_path),
+        }
+
+    def forget(self, input_path: str) -> None:
+        """Drops the entry of a file, e.g. because analyzing it failed.
+
+        Args:
+            input_path (str): path of the .jack file.
+        """
+        self._entries.pop(self._key(input_path), None)
+
+    def evict_stale(self) -> None:
+        """Drops the entries of .jack files that no longer exist."""
+        for key in list(self._entries):
+            if not os.path.exists(os.path.join(self._root, key)):
+                del self._entries[key]
+
+    def save(self) -> None:
+        """Writes the manifest, replacing the old one atomically."""
+        temporary_path = self.manifest_path + ".tmp"
+        with open(temporary_path, 'w') as manifest:
+            json.dump({"version": self.version, "entries": self._entries},
+                      manifest, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.manifest_path)
@@ -6,79 +6,167 @@ as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
 
-from JackTokenizer import JackTokenizer, KEYWORD, SYMBOL, INT_CONST, STRING_CONST, IDENTIFIER
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
-from io import StringIO
+import typing
+from JackTokenizer import JackTokenizer, KEYWORD, SYMBOL, INT_CONST, STRING_CONST, IDENTIFIER, TOKEN_CODES
+from Emitters import Emitter, XmlEmitter
+if typing.TYPE_CHECKING:
+    from Counters import HotPathCounters
+
+# Token codes the parser looks ahead for, so it never has to build strings.
+_CLASS_VAR_DEC_CODES = frozenset(TOKEN_CODES[k] for k in ("static", "field"))
+_SUBROUTINE_DEC_CODES = frozenset(
+    TOKEN_CODES[k] for k in ("constructor", "function", "method"))
+_OP_CODES = frozenset(
+    TOKEN_CODES[s] for s in ['+', '-', '*', '/', '&', '|', '<', '>', '='])
+_UNARY_OP_CODES = frozenset(TOKEN_CODES[s] for s in ['~', '-'])
+_VAR, _LET, _IF, _ELSE, _WHILE, _DO, _RETURN = (TOKEN_CODES[k] for k in (
+    "var", "let", "if", "else", "while", "do", "return"))
+_COMMA, _SEMICOLON, _DOT, _LEFT_PAREN, _RIGHT_PAREN, _LEFT_BRACKET = (
+    TOKEN_CODES[s] for s in (",", ";", ".", "(", ")", "["))
+_TERM_TYPES = (INT_CONST, STRING_CONST, KEYWORD)
+
+# Where a recovering engine resumes after a syntax error: the tokens it
+# skips ahead to inside a statement, and between class members. A ';' is
+# skipped too, as it ends the broken statement.
+MEMBER_SYNC_CODES = _CLASS_VAR_DEC_CODES | _SUBROUTINE_DEC_CODES
+STATEMENT_SYNC_CODES = MEMBER_SYNC_CODES | frozenset(
+    (_LET, _IF, _WHILE, _DO, _RETURN, _SEMICOLON, TOKEN_CODES["}"]))
+
+# What the iterative expression parser does next, kept on its stack.
+(_EXPRESSION, _TERM, _OPERATOR, _EXPRESSION_LIST, _NEXT_EXPRESSION,
+ _CLOSE_TERM, _CLOSE_PARENTHESES, _CLOSE_BRACKETS) = range(8)
 
 
 class CompilationError(Exception):
-    pass
+    """A syntax error, at the token with index token_index. line and column
+    are None when the tokenizer cannot tell them, e.g. in lazy mode.
+    """
+
+    def __init__(self, message: str, token_index: typing.Optional[int] = None,
+                 line: typing.Optional[int] = None,
+                 column: typing.Optional[int] = None) -> None:
+        super().__init__(message)
+        self.message = message
+        self.token_index = token_index
+        self.line = line
+        self.column = column
+
+    def __str__(self) -> str:
+        if self.line is None:
+            return self.message
+        return f"line {self.line}, column {self.column}: {self.message}"
+
+
+class CompilationErrors(CompilationError):
+    """All the syntax errors a recovering engine found in a file."""
+
+    def __init__(self, errors: typing.List[CompilationError]) -> None:
+        super().__init__("\n".join(
+            [f"{len(errors)} syntax error(s)"] +
+            [f"  {error}" for error in errors]))
+        self.errors = errors
+
+
+class _DepthTracker(Emitter):
+    """Passes events on to another emitter, keeping count of the open
+    elements, so that a recovering engine can close what a broken rule left
+    open.
+    """
+
+    def __init__(self, emitter: Emitter) -> None:
+        super().__init__(None)
+        self.emitter = emitter
+        self.depth = 0
+
+    def open_node(self, tag: str) -> None:
+        self.depth += 1
+        self.emitter.open_node(tag)
+
+    def close_node(self) -> None:
+        self.depth -= 1
+        self.emitter.close_node()
+
+    def terminal(self, tag: str, value: typing.Union[str, int]) -> None:
+        self.emitter.terminal(tag, value)
+
+    def flush(self) -> None:
+        self.emitter.flush()
+
+    def close_to(self, depth: int) -> None:
+        while self.depth > depth:
+            self.close_node()
 
 class Compilationengine:
     """Gets input from a JackTokenizer and emits its parsed structure into an
     output stream.
     """
 
-    def __init__(self, input_stream: 'JackTokenizer', output_stream) -> None:
+    def __init__(self, input_stream: 'JackTokenizer', output_stream,
+                 emitter: 'Emitter' = None,
+                 iterative_expressions: bool = False,
+                 recover: bool = False) -> None:
         """
         Creates a new compilation engine with the given input and output. The
         next routine called must be compileClass()
         :param input_stream: The input stream.
         :param output_stream: The output stream.
+        :param emitter: Receives the parsed structure, defaults to an
+            XmlEmitter over output_stream.
+        :param iterative_expressions: Parse expressions with an explicit
+            stack instead of recursion, so that their nesting is not limited
+            by Python's recursion limit. The output is the same.
+        :param recover: Do not stop at the first syntax error. Record it in
+            errors, skip ahead to the end of the statement or to the next
+            class member, and go on parsing. Elements a broken rule left
+            open are closed, so the output stays well-formed.
         """
         self.tknzr = input_stream
         self.output_stream = output_stream
-        self.current_xml_parent: ET.Element = None
-
-    def run(self):
-        classRoot = self.compile_class()
+        if emitter is None:
+            emitter = XmlEmitter(output_stream)
+        self.emitter = emitter
+        self.iterative_expressions = iterative_expressions
+        self.recover = recover
+        self.errors: typing.List[CompilationError] = []
+        if recover:
+            self.emitter = _DepthTracker(emitter)
+        self.counters: typing.Optional['HotPathCounters'] = None
+
+    def enable_counters(self) -> 'HotPathCounters':
+        """Counts how often the hot paths of this engine and its tokenizer
+        run, see HotPathCounters. Must be called before run().
 
-        def add_spaces_to_texts(elem, level=0):
-            if elem.text != None and str(elem.text).strip() != None:
-                elem.text = f" {str(elem.text)} "
-            elif len(elem) == 0:
-                elem.text = "\n"  + ("  " * level) # Fix: match opening tag level
-            for child in elem:
-                add_spaces_to_texts(child, level + 1)
-
-        add_spaces_to_texts(classRoot)
-
-        rough_string = ET.tostring(classRoot, encoding='unicode')
-        reparsed = minidom.parseString(rough_string)
-        pretty_xml = reparsed.toprettyxml(indent="  ")
-
-        pretty_xml_lines = pretty_xml.split('\n')
-        for i in range(len(pretty_xml_lines)):
-            line = pretty_xml_lines[i]
-            if "&amp;lt" in line:
-                pretty_xml_lines[i] = pretty_xml_lines[i].replace('&amp;lt', '&lt;')
-            if "&amp;gt" in line:
-                pretty_xml_lines[i] = pretty_xml_lines[i].replace('&amp;gt', '&gt;')
-            if "&amp;amp" in line:
-                pretty_xml_lines[i] = pretty_xml_lines[i].replace('&amp;amp', '&amp;')
-
-
-        if pretty_xml_lines[0].startswith('<?xml'):
-            pretty_xml = '\n'.join(pretty_xml_lines[1:]).strip()
-        pretty_xml += '\n'
+        Returns:
+            HotPathCounters: the counters, also kept in self.counters.
+        """
+        if self.counters is None:
+            from Counters import HotPathCounters
+            self.counters = HotPathCounters()
+            self.counters.attach(self)
+        return self.counters
 
-        self.output_stream.write(pretty_xml)
+    def run(self):
+        """Compiles the class, sending its structure to the emitter as it
+        goes.
+        """
+        if self.recover:
+            try:
+                self.compile_class()
+            except CompilationError as error:
+                self._record(error)
+                self.emitter.close_to(0)
+        else:
+            self.compile_class()
+        self.emitter.flush()
 
 
 
     ###################################################################################################################################################
     #   Program Control
     ###################################################################################################################################################
-    def compile_class(self) -> ET.Element:
-        """Compiles a complete class.
-        
-        Returns:
-            ET.Element: The root of the xml file.
-        """
-        class_root = ET.Element("class")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = class_root
+    def compile_class(self) -> None:
+        """Compiles a complete class."""
+        self.emitter.open_node("class")
 
         # class keyword
         self.add_token_to_xml(KEYWORD, "class")
@@ -90,26 +178,25 @@ class Compilationengine:
         self.add_token_to_xml(SYMBOL, "{")
 
         # classVarDec* (zero or more class variable declarations)
-        while self.tknzr._current_token in ("static", "field"):
-            self.compile_class_var_dec()
+        while self.tknzr.token_code() in _CLASS_VAR_DEC_CODES:
+            self._compile_recovering(
+                self.compile_class_var_dec, MEMBER_SYNC_CODES)
 
         # subroutineDec* (zero or more subroutine declarations)
-        while self.tknzr._current_token in ("constructor", "function", "method"):
-            self.compile_subroutine()
+        while self.tknzr.token_code() in _SUBROUTINE_DEC_CODES:
+            self._compile_recovering(
+                self.compile_subroutine, MEMBER_SYNC_CODES)
 
         # '}'
         self.add_token_to_xml(SYMBOL, "}")
 
         # restore parent
-        self.current_xml_parent = prev_parent
-        return class_root
+        self.emitter.close_node()
 
 
     def compile_class_var_dec(self) -> None:
         """Compiles a static declaration or a field declaration."""
-        var_dec = ET.SubElement(self.current_xml_parent, "classVarDec")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = var_dec
+        self.emitter.open_node("classVarDec")
 
         # 'static' or 'field'
         self.add_token_to_xml(KEYWORD)
@@ -124,7 +211,7 @@ class Compilationengine:
         self.add_token_to_xml(IDENTIFIER)
 
         # 0 or more (',' varName)
-        while self.tknzr._current_token == ",":
+        while self.tknzr.token_code() == _COMMA:
             self.add_token_to_xml(SYMBOL, ",")
             self.add_token_to_xml(IDENTIFIER)
 
@@ -132,7 +219,7 @@ class Compilationengine:
         self.add_token_to_xml(SYMBOL, ";")
 
         # restore parent
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
     def compile_subroutine(self) -> None:
@@ -141,9 +228,7 @@ class Compilationengine:
         You can assume that classes with constructors have at least one field,
         you will understand why this is necessary in project 11.
         """
-        subroutine_el = ET.SubElement(self.current_xml_parent, "subroutineDec")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = subroutine_el
+        self.emitter.open_node("subroutineDec")
 
         # 'constructor' | 'function' | 'method'
         self.add_token_to_xml(KEYWORD)
@@ -167,15 +252,13 @@ class Compilationengine:
         self.add_token_to_xml(SYMBOL, ')')
 
         # subroutineBody
-        body_el = ET.SubElement(self.current_xml_parent, "subroutineBody")
-        prev_body_el = self.current_xml_parent
-        self.current_xml_parent = body_el
+        self.emitter.open_node("subroutineBody")
 
         # '{'
         self.add_token_to_xml(SYMBOL, '{')
 
         # var declerations
-        while self.tknzr._current_token == "var":
+        while self.tknzr.token_code() == _VAR:
             self.compile_var_dec()
 
         # statements
@@ -185,22 +268,19 @@ class Compilationengine:
         self.add_token_to_xml(SYMBOL, '}')
 
         # restore parent
-        self.current_xml_parent = prev_body_el
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
+        self.emitter.close_node()
 
 
     def compile_parameter_list(self) -> None:
         """Compiles a (possibly empty) parameter list, not including the 
         enclosing "()".
         """
-        param_list_el = ET.SubElement(self.current_xml_parent, "parameterList")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = param_list_el
+        self.emitter.open_node("parameterList")
 
         # Empty parameter list
-        if self.tknzr._current_token == ')':
-            # Force newline text so minidom adds line breaks
-            self.current_xml_parent = prev_parent
+        if self.tknzr.token_code() == _RIGHT_PAREN:
+            self.emitter.close_node()
             return
 
         # At least one parameter: type varName
@@ -212,7 +292,7 @@ class Compilationengine:
         self.add_token_to_xml(IDENTIFIER)
 
         # Additional parameters
-        while self.tknzr._current_token == ',':
+        while self.tknzr.token_code() == _COMMA:
             self.add_token_to_xml(SYMBOL, ',')
             if self.tknzr.token_type() == KEYWORD:
                 self.add_token_to_xml(KEYWORD)
@@ -220,16 +300,14 @@ class Compilationengine:
                 self.add_token_to_xml(IDENTIFIER)
             self.add_token_to_xml(IDENTIFIER)
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
 
 
     def compile_var_dec(self) -> None:
         """Compiles a var declaration."""
-        var_dec_el = ET.SubElement(self.current_xml_parent, "varDec")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = var_dec_el
+        self.emitter.open_node("varDec")
 
         # 'var'
         self.add_token_to_xml(KEYWORD, "var")
@@ -244,38 +322,36 @@ class Compilationengine:
         self.add_token_to_xml(IDENTIFIER)
 
         # (',' varName)*
-        while self.tknzr._current_token == ",":
+        while self.tknzr.token_code() == _COMMA:
             self.add_token_to_xml(SYMBOL, ",")
             self.add_token_to_xml(IDENTIFIER)
 
         # ';'
         self.add_token_to_xml(SYMBOL, ";")
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
     def compile_statements(self) -> None:
         """Compiles a sequence of statements."""
-        statements_el = ET.SubElement(self.current_xml_parent, "statements")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = statements_el
-
-        while self.tknzr.token_type() == KEYWORD and \
-                self.tknzr._current_token in ['let', 'if', 'while', 'do', 'return']:
-
-            token = self.tknzr._current_token
-            if token == 'let':
-                self.compile_let()
-            elif token == 'if':
-                self.compile_if()
-            elif token == 'while':
-                self.compile_while()
-            elif token == 'do':
-                self.compile_do()
-            elif token == 'return':
-                self.compile_return()
+        self.emitter.open_node("statements")
+
+        while self.tknzr.token_code() in (_LET, _IF, _WHILE, _DO, _RETURN):
+
+            token = self.tknzr.token_code()
+            if token == _LET:
+                compile_statement = self.compile_let
+            elif token == _IF:
+                compile_statement = self.compile_if
+            elif token == _WHILE:
+                compile_statement = self.compile_while
+            elif token == _DO:
+                compile_statement = self.compile_do
+            else:
+                compile_statement = self.compile_return
+            self._compile_recovering(compile_statement, STATEMENT_SYNC_CODES)
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
     ###################################################################################################################################################
@@ -284,14 +360,12 @@ class Compilationengine:
 
     def compile_do(self) -> None:
         """Compiles a do statement."""
-        do_el = ET.SubElement(self.current_xml_parent, "doStatement")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = do_el
+        self.emitter.open_node("doStatement")
 
         self.add_token_to_xml(KEYWORD, 'do')
         self.add_token_to_xml(IDENTIFIER)  # subroutineName or class/var
 
-        if self.tknzr._current_token == ".":
+        if self.tknzr.token_code() == _DOT:
             self.add_token_to_xml(SYMBOL, '.')
             self.add_token_to_xml(IDENTIFIER)  # subroutineName
 
@@ -300,20 +374,18 @@ class Compilationengine:
         self.add_token_to_xml(SYMBOL, ')')
         self.add_token_to_xml(SYMBOL, ';')
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
     def compile_let(self) -> None:
         """Compiles a let statement."""
-        let_el = ET.SubElement(self.current_xml_parent, "letStatement")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = let_el
+        self.emitter.open_node("letStatement")
 
         self.add_token_to_xml(KEYWORD, 'let')
         self.add_token_to_xml(IDENTIFIER)  # varName
 
         #array
-        if self.tknzr._current_token == '[':
+        if self.tknzr.token_code() == _LEFT_BRACKET:
             self.add_token_to_xml(SYMBOL, '[')
             self.compile_expression()
             self.add_token_to_xml(SYMBOL, ']')
@@ -322,14 +394,12 @@ class Compilationengine:
         self.compile_expression()
         self.add_token_to_xml(SYMBOL, ';')
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
     def compile_while(self) -> None:
         """Compiles a while statement."""
-        while_el = ET.SubElement(self.current_xml_parent, "whileStatement")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = while_el
+        self.emitter.open_node("whileStatement")
 
         self.add_token_to_xml(KEYWORD, 'while')
         self.add_token_to_xml(SYMBOL, '(')
@@ -339,30 +409,26 @@ class Compilationengine:
         self.compile_statements()
         self.add_token_to_xml(SYMBOL, '}')
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
     def compile_return(self) -> None:
         """Compiles a return statement."""
-        return_el = ET.SubElement(self.current_xml_parent, "returnStatement")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = return_el
+        self.emitter.open_node("returnStatement")
 
         self.add_token_to_xml(KEYWORD, 'return')
 
-        if not (self.tknzr.token_type() == SYMBOL and self.tknzr._current_token == ';'):
+        if self.tknzr.token_code() != _SEMICOLON:
             self.compile_expression()
 
         self.add_token_to_xml(SYMBOL, ';')
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
     def compile_if(self) -> None:
         """Compiles an if statement, possibly with a trailing else clause."""
-        if_el = ET.SubElement(self.current_xml_parent, "ifStatement")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = if_el
+        self.emitter.open_node("ifStatement")
 
         self.add_token_to_xml(KEYWORD, 'if')
         self.add_token_to_xml(SYMBOL, '(')
@@ -372,13 +438,13 @@ class Compilationengine:
         self.compile_statements()
         self.add_token_to_xml(SYMBOL, '}')
 
-        if self.tknzr.token_type() == KEYWORD and self.tknzr._current_token == 'else':
+        if self.tknzr.token_code() == _ELSE:
             self.add_token_to_xml(KEYWORD, 'else')
             self.add_token_to_xml(SYMBOL, '{')
             self.compile_statements()
             self.add_token_to_xml(SYMBOL, '}')
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
     ###################################################################################################################################################
@@ -387,15 +453,13 @@ class Compilationengine:
     
     def compile_term(self) -> None:
         """Compiles a term."""
-        term_element = ET.SubElement(self.current_xml_parent, "term")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = term_element
+        self.emitter.open_node("term")
 
         token_type = self.tknzr.token_type()
-        token = self.tknzr.current_token_val()
+        token = self.tknzr.token_code()
 
         # Case 0: Unary operator (~ or -)
-        if token in ['~', '-']:
+        if token in _UNARY_OP_CODES:
             self.add_token_to_xml(SYMBOL)  # Add unary operator
             self.compile_term()            # Recursively compile the next term
 
@@ -404,7 +468,7 @@ class Compilationengine:
             self.add_token_to_xml(token_type)
 
         # Case 2: Parenthesized expression
-        elif token == '(':
+        elif token == _LEFT_PAREN:
             self.add_token_to_xml(SYMBOL, '(')
             self.compile_expression()
             self.add_token_to_xml(SYMBOL, ')')
@@ -413,60 +477,161 @@ class Compilationengine:
         elif token_type == IDENTIFIER:
             self.add_token_to_xml(IDENTIFIER)
 
-            if self.tknzr._current_token == '[':
+            if self.tknzr.token_code() == _LEFT_BRACKET:
                 self.add_token_to_xml(SYMBOL, '[')
                 self.compile_expression()
                 self.add_token_to_xml(SYMBOL, ']')
 
-            elif self.tknzr._current_token == '(':
+            elif self.tknzr.token_code() == _LEFT_PAREN:
                 self.add_token_to_xml(SYMBOL, '(')
                 self.compile_expression_list()
                 self.add_token_to_xml(SYMBOL, ')')
 
-            elif self.tknzr._current_token == '.':
+            elif self.tknzr.token_code() == _DOT:
                 self.add_token_to_xml(SYMBOL, '.')
                 self.add_token_to_xml(IDENTIFIER)
                 self.add_token_to_xml(SYMBOL, '(')
                 self.compile_expression_list()
                 self.add_token_to_xml(SYMBOL, ')')
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
     def compile_expression(self) -> None:
         """Compiles an expression."""
-        expr_element = ET.SubElement(self.current_xml_parent, "expression")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = expr_element
+        if self.iterative_expressions:
+            self.compile_expressions_iteratively(_EXPRESSION)
+            return
+        self.emitter.open_node("expression")
 
         # Always start with a term
         self.compile_term()
 
         # Binary operators only
-        while self.tknzr._current_token in ['+', '-', '*', '/', '&', '|', '<', '>', '=']:
-            if self.tknzr._current_token == '&':
-                pass
+        while self.tknzr.token_code() in _OP_CODES:
             self.add_token_to_xml(SYMBOL)  # the operator
             self.compile_term()
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
 
 
     def compile_expression_list(self) -> None:
         """Compiles a (possibly empty) comma-separated list of expressions."""
+        if self.iterative_expressions:
+            self.compile_expressions_iteratively(_EXPRESSION_LIST)
+            return
         # Create <expressionList> XML node
-        expr_list_element = ET.SubElement(self.current_xml_parent, "expressionList")
-        prev_parent = self.current_xml_parent
-        self.current_xml_parent = expr_list_element
+        self.emitter.open_node("expressionList")
 
         # Check if the list is non-empty
-        if self.tknzr._current_token != ')':
+        if self.tknzr.token_code() != _RIGHT_PAREN:
             self.compile_expression()
             # If there are more expressions, separated by commas
-            while self.tknzr._current_token == ',':
+            while self.tknzr.token_code() == _COMMA:
                 self.add_token_to_xml(SYMBOL, ',')
                 self.compile_expression()
 
-        self.current_xml_parent = prev_parent
+        self.emitter.close_node()
+
+
+    def compile_expressions_iteratively(self, start: int) -> None:
+        """Compiles an expression or an expression list exactly like
+        compile_expression() and compile_expression_list() do, but instead
+        of recursing into nested terms, keeps what is left to do on an
+        explicit stack. Jack has no operator precedence, so a term followed
+        by an operator only has to remember to look for the next term.
+
+        Args:
+            start (int): _EXPRESSION or _EXPRESSION_LIST.
+        """
+        tknzr = self.tknzr
+        emitter = self.emitter
+        stack = [start]
+        while stack:
+            step = stack.pop()
+            token = tknzr.token_code()
+
+            if step == _EXPRESSION:
+                emitter.open_node("expression")
+                stack.append(_OPERATOR)
+                stack.append(_TERM)
+
+            elif step == _OPERATOR:
+                # Binary operators only
+                if token in _OP_CODES:
+                    self.add_token_to_xml(SYMBOL)  # the operator
+                    stack.append(_OPERATOR)
+                    stack.append(_TERM)
+                else:
+                    emitter.close_node()
+
+            elif step == _TERM:
+                emitter.open_node("term")
+                token_type = tknzr.token_type()
+
+                # Unary operator (~ or -), its term comes next
+                if token in _UNARY_OP_CODES:
+                    self.add_token_to_xml(SYMBOL)
+                    stack.append(_CLOSE_TERM)
+                    stack.append(_TERM)
+
+                # Integer, string, keyword constant
+                elif token_type in _TERM_TYPES:
+                    self.add_token_to_xml(token_type)
+                    emitter.close_node()
+
+                # Parenthesized expression
+                elif token == _LEFT_PAREN:
+                    self.add_token_to_xml(SYMBOL, '(')
+                    stack.append(_CLOSE_PARENTHESES)
+                    stack.append(_EXPRESSION)
+
+                # Identifier - var, array, or subroutine call
+                elif token_type == IDENTIFIER:
+                    self.add_token_to_xml(IDENTIFIER)
+                    token = tknzr.token_code()
+                    if token == _LEFT_BRACKET:
+                        self.add_token_to_xml(SYMBOL, '[')
+                        stack.append(_CLOSE_BRACKETS)
+                        stack.append(_EXPRESSION)
+                    elif token == _LEFT_PAREN or token == _DOT:
+                        if token == _DOT:
+                            self.add_token_to_xml(SYMBOL, '.')
+                            self.add_token_to_xml(IDENTIFIER)
+                        self.add_token_to_xml(SYMBOL, '(')
+                        stack.append(_CLOSE_PARENTHESES)
+                        stack.append(_EXPRESSION_LIST)
+                    else:
+                        emitter.close_node()
+
+                else:
+                    emitter.close_node()
+
+            elif step == _CLOSE_TERM:
+                emitter.close_node()
+
+            elif step == _CLOSE_PARENTHESES:
+                self.add_token_to_xml(SYMBOL, ')')
+                emitter.close_node()
+
+            elif step == _CLOSE_BRACKETS:
+                self.add_token_to_xml(SYMBOL, ']')
+                emitter.close_node()
+
+            elif step == _EXPRESSION_LIST:
+                emitter.open_node("expressionList")
+                if token != _RIGHT_PAREN:
+                    stack.append(_NEXT_EXPRESSION)
+                    stack.append(_EXPRESSION)
+                else:
+                    emitter.close_node()
+
+            else:  # _NEXT_EXPRESSION
+                if token == _COMMA:
+                    self.add_token_to_xml(SYMBOL, ',')
+                    stack.append(_NEXT_EXPRESSION)
+                    stack.append(_EXPRESSION)
+                else:
+                    emitter.close_node()
 
 
     ###################################################################################################################################################
@@ -485,11 +650,90 @@ class Compilationengine:
             CompilationError: Mismatched token (as far as grammar).
         """
         if self.tknzr.token_type() == expected_type and \
-        (expected_value is None or self.tknzr._current_token == expected_value):
+        (expected_value is None or self.tknzr.token_code() == TOKEN_CODES[expected_value]):
     
-            token_element = ET.SubElement(self.current_xml_parent, self.tknzr.token_type_translated())
-            token_element.text = self.tknzr.current_token_val()
+            self.emitter.terminal(self.tknzr.token_type_translated(), self.tknzr.current_token_val())
             self.tknzr.advance()
         else:
-            raise CompilationError(f"Mismatched token: Expected {expected_type}/{expected_value}, got {self.tknzr.token_type()}/{self.tknzr.current_token_val()}")
+            raise self.error(f"Mismatched token: Expected {expected_type}/{expected_value}, got {self.describe_token()}")
+
+    def describe_token(self) -> str:
+        """
+        Returns:
+            str: the current token as error messages show it, its type and
+            value, or "end of input".
+        """
+        if not self.tknzr.has_more_tokens():
+            return "end of input"
+        return f"{self.tknzr.token_type()}/{self.tknzr.current_token_val()}"
+
+    def error(self, message: str) -> CompilationError:
+        """
+        Args:
+            message (str): what is wrong.
+
+        Returns:
+            CompilationError: an error at the current token.
+        """
+        index = self.tknzr.token_index()
+        if self.tknzr.token_count is None or index < 0:
+            return CompilationError(message, index)
+        return CompilationError(message, index, *self.tknzr.position_at(index))
+
+    def _compile_recovering(self, compile_rule: typing.Callable[[], None],
+                            sync_codes: typing.FrozenSet[int]) -> None:
+        """Compiles a statement or a class member. In recover mode, a syntax
+        error inside it is recorded, and parsing resumes at the next token in
+        sync_codes.
+
+        Args:
+            compile_rule: the compile_ method of the rule.
+            sync_codes (typing.FrozenSet[int]): STATEMENT_SYNC_CODES or
+                MEMBER_SYNC_CODES.
+
+        Raises:
+            CompilationError: if not in recover mode, or no token is left to
+                resume at.
+        """
+        if not self.recover:
+            compile_rule()
+            return
+        depth = self.emitter.depth
+        try:
+            compile_rule()
+        except CompilationError as error:
+            self._record(error)
+            self.synchronize(sync_codes, error)
+            self.emitter.close_to(depth)
+
+    def _record(self, error: CompilationError) -> None:
+        # An error is passed up until it is handled, or raised again when the
+        # input ends while recovering from it, and one on the same token as
+        # the last, where parsing resumed without moving on, repeats it.
+        if any(recorded is error for recorded in self.errors) or \
+                self.errors and \
+                self.errors[-1].token_index == error.token_index:
+            return
+        self.errors.append(error)
+
+    def synchronize(self, sync_codes: typing.FrozenSet[int],
+                    error: CompilationError) -> None:
+        """Skips tokens up to the next one in sync_codes, and past it if it
+        is a ';'.
+
+        Args:
+            sync_codes (typing.FrozenSet[int]): codes of the tokens to stop
+                at.
+            error (CompilationError): the error being recovered from.
+
+        Raises:
+            CompilationError: error, if the input ends first.
+        """
+        tknzr = self.tknzr
+        while tknzr.has_more_tokens() and tknzr.token_code() not in sync_codes:
+            tknzr.advance()
+        if not tknzr.has_more_tokens():
+            raise error
+        if tknzr.token_code() == _SEMICOLON:
+            tknzr.advance()
 
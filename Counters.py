@@ -0,0 +1,137 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import collections
+import typing
+
+
+class HotPathCounters:
+    """Counts how often the hot paths of a Compilationengine and its
+    JackTokenizer run.
+
+    Counting works by replacing the methods of one engine, tokenizer and
+    emitter with counting wrappers, as instance attributes, so engines that
+    do not count pay nothing for it.
+    """
+
+    def __init__(self) -> None:
+        self.advance_calls = 0
+        self.token_type_calls = 0
+        self.add_token_to_xml_calls = 0
+        # Elements opened, by tag, i.e. by grammar rule.
+        self.nodes: typing.Counter[str] = collections.Counter()
+        self.terminals = 0
+        # The deepest nesting of terms, which is also the deepest recursion
+        # of compile_term() in the recursive engine.
+        self.max_term_depth = 0
+        self._open_tags: typing.List[str] = []
+        self._term_depth = 0
+
+    def attach(self, engine) -> None:
+        """Starts counting the hot paths of an engine. Must be called before
+        the engine runs.
+
+        Args:
+            engine (Compilationengine): the engine.
+        """
+        tokenizer = engine.tknzr
+        emitter = engine.emitter
+        advance = tokenizer.advance
+        token_type = tokenizer.token_type
+        add_token_to_xml = engine.add_token_to_xml
+        open_node = emitter.open_node
+        close_node = emitter.close_node
+        terminal = emitter.terminal
+        # The tokenizer's constructor has already advanced to the first
+        # token, so the advances up to the current token are counted too.
+        self.advance_calls += tokenizer.token_index() + 1
+
+        def counted_advance() -> None:
+            self.advance_calls += 1
+            advance()
+
+        def counted_token_type() -> str:
+            self.token_type_calls += 1
+            return token_type()
+
+        def counted_add_token_to_xml(*args) -> None:
+            self.add_token_to_xml_calls += 1
+            add_token_to_xml(*args)
+
+        def counted_open_node(tag: str) -> None:
+            self.nodes[tag] += 1
+            self._open_tags.append(tag)
+            if tag == "term":
+                self._term_depth += 1
+                if self._term_depth > self.max_term_depth:
+                    self.max_term_depth = self._term_depth
+            open_node(tag)
+
+        def counted_close_node() -> None:
+            if self._open_tags.pop() == "term":
+                self._term_depth -= 1
+            close_node()
+
+        def counted_terminal(tag: str, value: typing.Union[str, int]) -> None:
+            self.terminals += 1
+            terminal(tag, value)
+
+        tokenizer.advance = counted_advance
+        tokenizer.token_type = counted_token_type
+        engine.add_token_to_xml = counted_add_token_to_xml
+        emitter.open_node = counted_open_node
+        emitter.close_node = counted_close_node
+        emitter.terminal = counted_terminal
+
+    def add(self, other: 'HotPathCounters') -> None:
+        """Adds the counts of another engine to these, keeping the larger
+        maximum depth.
+
+        Args:
+            other (HotPathCounters): the counters to add.
+        """
+        self.advance_calls += other.advance_calls
+        self.token_type_calls += other.token_type_calls
+        self.add_token_to_xml_calls += other.add_token_to_xml_calls
+        self.nodes.update(other.nodes)
+        self.terminals += other.terminals
+        self.max_term_depth = max(self.max_term_depth, other.max_term_depth)
+
+    def report(self) -> dict:
+        """
+        Returns:
+            dict: every count, plus token_type() calls per token, where the
+            tokens are the advance() calls.
+        """
+        return {
+            "advance_calls": self.advance_calls,
+            "token_type_calls": self.token_type_calls,
+            "token_type_calls_per_token":
+                self.token_type_calls / self.advance_calls
+                if self.advance_calls else 0.0,
+            "add_token_to_xml_calls": self.add_token_to_xml_calls,
+            "terminals": self.terminals,
+            "nodes": dict(self.nodes),
+            "max_term_depth": self.max_term_depth,
+        }
+
+    def summary(self) -> str:
+        """
+        Returns:
+            str: the counts, one per line, for people to read.
+        """
+        report = self.report()
+        nodes = ", ".join(f"{tag} {count}" for tag, count in
+                          sorted(self.nodes.items(), key=lambda item: -item[1]))
+        return "\n".join((
+            f"  advance() calls          {report['advance_calls']}",
+            f"  token_type() calls       {report['token_type_calls']} "
+            f"({report['token_type_calls_per_token']:.2f} per token)",
+            f"  add_token_to_xml() calls {report['add_token_to_xml_calls']}",
+            f"  terminals emitted        {report['terminals']}",
+            f"  max term depth           {report['max_term_depth']}",
+            f"  nodes: {nodes}"))
@@ -0,0 +1,413 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from JackTokenizer import KEYWORDS, TOKEN_CODES, KEYWORD_CODE
+
+# Number of pieces of output an emitter collects before writing them out.
+DEFAULT_BUFFER_SIZE = 1024
+
+# The tags of the grammar's non-terminals, in the order the binary format
+# numbers them.
+NODE_TAGS = (
+    "class", "classVarDec", "subroutineDec", "parameterList",
+    "subroutineBody", "varDec", "statements", "letStatement", "ifStatement",
+    "whileStatement", "doStatement", "returnStatement", "expression", "term",
+    "expressionList")
+
+# Token values are what the xml file shows, so three symbols arrive as
+# entities. Other formats want the symbol itself.
+_ENTITY_SYMBOLS = {'&lt': '<', '&gt': '>', '&amp': '&'}
+
+
+def escape_xml_text(text: str) -> str:
+    """Escapes the text of an xml element.
+
+    Symbol values are already written as entities without the ';' ('&lt'),
+    so after escaping, '&amp;lt', '&amp;gt' and '&amp;amp' are turned back
+    into the entities they stand for.
+
+    Args:
+        text (str): the text to escape.
+
+    Returns:
+        str: the escaped text.
+    """
+    if '&' in text or '<' in text or '>' in text or '"' in text:
+        text = text.replace("&", "&amp;").replace("<", "&lt;") \
+            .replace('"', "&quot;").replace(">", "&gt;")
+        text = text.replace('&amp;lt', '&lt;').replace('&amp;gt', '&gt;') \
+            .replace('&amp;amp', '&amp;')
+    return text
+
+
+class Emitter:
+    """Receives the parse tree from a Compilationengine, one event at a time,
+    in document order, and writes it out in some format.
+
+    Subclasses implement open_node(), close_node() and terminal(), and send
+    their output through _write(), which buffers it.
+    """
+
+    # What the buffered pieces of output are joined with.
+    _joiner: typing.Union[str, bytes] = ""
+
+    def __init__(self, output_stream: typing.IO,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 parents: typing.Sequence[str] = ()) -> None:
+        """
+        Args:
+            output_stream (typing.IO): the stream to write to.
+            buffer_size (int, optional): number of pieces of output to
+                collect before writing them to output_stream. Defaults to
+                DEFAULT_BUFFER_SIZE.
+            parents (typing.Sequence[str], optional): the tags of the
+                elements around what is emitted, outermost first, when it is
+                only part of a document, e.g. ("class",) for the members of
+                a class. They are not written, but the output is what it
+                would be inside them. Defaults to (), a whole document.
+        """
+        self.output_stream = output_stream
+        self._buffer_size = buffer_size
+        self._parents = tuple(parents)
+        self._pieces: typing.List[typing.Union[str, bytes]] = []
+
+    def reset(self, output_stream: typing.IO) -> None:
+        """Gets ready to write another document, to output_stream, keeping
+        whatever the emitter has cached. Whatever is still buffered is
+        dropped, so flush() first.
+
+        Args:
+            output_stream (typing.IO): the stream to write to.
+        """
+        self.output_stream = output_stream
+        self._pieces.clear()
+
+    def _write(self, piece: typing.Union[str, bytes]) -> None:
+        self._pieces.append(piece)
+        if len(self._pieces) >= self._buffer_size:
+            self.flush()
+
+    def open_node(self, tag: str) -> None:
+        """Starts a non-terminal element.
+
+        Args:
+            tag (str): the element's tag, e.g. "whileStatement".
+        """
+        raise NotImplementedError
+
+    def close_node(self) -> None:
+        """Ends the innermost open non-terminal element."""
+        raise NotImplementedError
+
+    def terminal(self, tag: str, value: typing.Union[str, int]) -> None:
+        """Emits a terminal element.
+
+        Args:
+            tag (str): the element's tag, e.g. "identifier".
+            value (str | int): the token's value, as current_token_val()
+                returns it.
+        """
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Writes out everything that is still buffered."""
+        if self._pieces:
+            self.output_stream.write(self._joiner.join(self._pieces))
+            self._pieces.clear()
+
+
+class XmlEmitter(Emitter):
+    """Writes the parse tree to an output stream as indented xml, while the
+    tree is being parsed.
+
+    Every element is indented by two spaces per level. A terminal is written
+    on one line, with a space on each side of its value. A non-terminal
+    without children is still written as an opening and a closing tag on two
+    lines, so its opening tag is held back until its first child or its end.
+    """
+
+    def __init__(self, output_stream: typing.TextIO,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 parents: typing.Sequence[str] = ()) -> None:
+        """
+        Args:
+            output_stream (typing.TextIO): the stream to write the xml to.
+            buffer_size (int, optional): number of lines to collect before
+                writing them to output_stream. Defaults to DEFAULT_BUFFER_SIZE.
+            parents (typing.Sequence[str], optional): see Emitter. Defaults
+                to ().
+        """
+        super().__init__(output_stream, buffer_size, parents)
+        self._open_tags: typing.List[str] = list(self._parents)
+        self._indents: typing.List[str] = [""]
+        self._pending = False
+        # The lines of keywords and symbols, by depth, tag and value. There
+        # are few of them, so they are kept for good, also across reset().
+        self._constant_lines: typing.Dict[
+            typing.Tuple[int, str, str], str] = {}
+
+    def reset(self, output_stream: typing.TextIO) -> None:
+        super().reset(output_stream)
+        self._open_tags[:] = self._parents
+        self._pending = False
+
+    def _indent(self, depth: int) -> str:
+        while len(self._indents) <= depth:
+            self._indents.append("  " * len(self._indents))
+        return self._indents[depth]
+
+    def _write_pending(self) -> None:
+        depth = len(self._open_tags) - 1
+        self._write(f"{self._indent(depth)}<{self._open_tags[depth]}>\n")
+        self._pending = False
+
+    def open_node(self, tag: str) -> None:
+        """Starts a non-terminal element.
+
+        Args:
+            tag (str): the element's tag, e.g. "whileStatement".
+        """
+        if self._pending:
+            self._write_pending()
+        self._open_tags.append(tag)
+        self._pending = True
+
+    def close_node(self) -> None:
+        """Ends the innermost open non-terminal element."""
+        tag = self._open_tags.pop()
+        indent = self._indent(len(self._open_tags))
+        if self._pending:
+            self._write(f"{indent}<{tag}>\n{indent}</{tag}>\n")
+            self._pending = False
+        else:
+            self._write(f"{indent}</{tag}>\n")
+
+    def terminal(self, tag: str, value: typing.Union[str, int]) -> None:
+        """Writes a terminal element.
+
+        Args:
+            tag (str): the element's tag, e.g. "identifier".
+            value (str | int): the token's value.
+        """
+        if self._pending:
+            self._write_pending()
+        depth = len(self._open_tags)
+        if tag == "keyword" or tag == "symbol":
+            key = (depth, tag, value)
+            line = self._constant_lines.get(key)
+            if line is None:
+                line = self._constant_lines[key] = \
+                    self._line(depth, tag, value)
+            self._write(line)
+        else:
+            self._write(self._line(depth, tag, value))
+
+    def _line(self, depth: int, tag: str, value: typing.Union[str, int]) \
+            -> str:
+        return f"{self._indent(depth)}<{tag}>" \
+               f"{escape_xml_text(f' {value} ')}</{tag}>\n"
+
+
+class FlatXmlEmitter(Emitter):
+    """Writes xml with every element on a line of its own and nothing
+    indented, the format of the tokens files: a <tokens> element holding
+    one terminal per token.
+
+    Nothing is held back, so together with a lazy JackTokenizer the memory
+    it takes does not grow with the input.
+    """
+
+    def __init__(self, output_stream: typing.TextIO,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 parents: typing.Sequence[str] = ()) -> None:
+        super().__init__(output_stream, buffer_size, parents)
+        self._open_tags: typing.List[str] = list(self._parents)
+        # The lines of keywords and symbols, by tag and value.
+        self._constant_lines: typing.Dict[typing.Tuple[str, str], str] = {}
+
+    def reset(self, output_stream: typing.TextIO) -> None:
+        super().reset(output_stream)
+        self._open_tags[:] = self._parents
+
+    def open_node(self, tag: str) -> None:
+        self._open_tags.append(tag)
+        self._write(f"<{tag}>\n")
+
+    def close_node(self) -> None:
+        self._write(f"</{self._open_tags.pop()}>\n")
+
+    def terminal(self, tag: str, value: typing.Union[str, int]) -> None:
+        if tag == "keyword" or tag == "symbol":
+            line = self._constant_lines.get((tag, value))
+            if line is None:
+                line = self._constant_lines[(tag, value)] = \
+                    f"<{tag}>{escape_xml_text(f' {value} ')}</{tag}>\n"
+            self._write(line)
+        else:
+            self._write(f"<{tag}>{escape_xml_text(f' {value} ')}</{tag}>\n")
+
+
+class JsonLinesEmitter(Emitter):
+    """Writes the parse tree as JSON lines, one object per event:
+
+        {"event": "open", "tag": "letStatement"}
+        {"event": "terminal", "tag": "symbol", "value": "<"}
+        {"event": "close", "tag": "letStatement"}
+
+    Integer constants are JSON numbers, and symbols are not escaped.
+    """
+
+    def __init__(self, output_stream: typing.TextIO,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 parents: typing.Sequence[str] = ()) -> None:
+        super().__init__(output_stream, buffer_size, parents)
+        self._open_tags: typing.List[str] = list(self._parents)
+        # Imported here, so that the other formats do not load json.
+        import json
+        self._dumps = json.dumps
+
+    def reset(self, output_stream: typing.TextIO) -> None:
+        super().reset(output_stream)
+        self._open_tags[:] = self._parents
+
+    def open_node(self, tag: str) -> None:
+        self._open_tags.append(tag)
+        self._write(f'{{"event": "open", "tag": "{tag}"}}\n')
+
+    def close_node(self) -> None:
+        tag = self._open_tags.pop()
+        self._write(f'{{"event": "close", "tag": "{tag}"}}\n')
+
+    def terminal(self, tag: str, value: typing.Union[str, int]) -> None:
+        value = self._dumps(_ENTITY_SYMBOLS.get(value, value))
+        self._write(
+            f'{{"event": "terminal", "tag": "{tag}", "value": {value}}}\n')
+
+
+# Record kinds of the binary format, see BinaryEmitter.
+BINARY_MAGIC = b"JKP1"
+BINARY_CLOSE = len(NODE_TAGS)
+BINARY_INT_CONST = BINARY_CLOSE + 1
+BINARY_STRING_CONST = BINARY_CLOSE + 2
+BINARY_IDENTIFIER = BINARY_CLOSE + 3
+BINARY_TOKEN = 128
+_OPEN_RECORDS = {tag: bytes((index,)) for index, tag in enumerate(NODE_TAGS)}
+_CLOSE_RECORD = bytes((BINARY_CLOSE,))
+_BINARY_TEXT_KINDS = {"stringConstant": BINARY_STRING_CONST,
+                      "identifier": BINARY_IDENTIFIER}
+_TOKEN_RECORDS = {text: bytes((BINARY_TOKEN + code,))
+                  for text, code in TOKEN_CODES.items()}
+_TOKEN_TEXTS = {code: text for text, code in TOKEN_CODES.items()}
+_KEYWORD_CODES = range(KEYWORD_CODE + 1, KEYWORD_CODE + 1 + len(KEYWORDS))
+
+
+class BinaryEmitter(Emitter):
+    """Writes the parse tree in a compact binary format, to a stream opened
+    in binary mode. Use read_binary() to decode it.
+
+    The output starts with BINARY_MAGIC, followed by one record per event.
+    The first byte of a record says what it is:
+
+    - 0-14: opens the non-terminal NODE_TAGS[byte].
+    - 15: closes the innermost open non-terminal.
+    - 16: integerConstant, followed by its value as 2 big-endian bytes.
+    - 17, 18: stringConstant or identifier, followed by the length of its
+      UTF-8 encoding as a varint (7 bits per byte, low bits first, high bit
+      set on all but the last byte), and the encoding itself.
+    - 128 + code: the keyword or symbol whose code in TOKEN_CODES is code.
+    """
+
+    _joiner = b""
+
+    def __init__(self, output_stream: typing.BinaryIO,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 parents: typing.Sequence[str] = ()) -> None:
+        super().__init__(output_stream, buffer_size, parents)
+        # Only a whole document starts with the magic.
+        if not self._parents:
+            self._write(BINARY_MAGIC)
+
+    def reset(self, output_stream: typing.BinaryIO) -> None:
+        super().reset(output_stream)
+        if not self._parents:
+            self._write(BINARY_MAGIC)
+
+    def open_node(self, tag: str) -> None:
+        self._write(_OPEN_RECORDS[tag])
+
+    def close_node(self) -> None:
+        self._write(_CLOSE_RECORD)
+
+    def terminal(self, tag: str, value: typing.Union[str, int]) -> None:
+        if tag == "integerConstant":
+            self._write(bytes((BINARY_INT_CONST,)) + value.to_bytes(2, "big"))
+        elif tag == "stringConstant" or tag == "identifier":
+            encoded = value.encode()
+            self._write(bytes((_BINARY_TEXT_KINDS[tag],)) +
+                        _varint(len(encoded)) + encoded)
+        else:
+            self._write(_TOKEN_RECORDS[_ENTITY_SYMBOLS.get(value, value)])
+
+
+def _varint(number: int) -> bytes:
+    encoded = bytearray()
+    while number >= 0x80:
+        encoded.append(number & 0x7F | 0x80)
+        number >>= 7
+    encoded.append(number)
+    return bytes(encoded)
+
+
+def read_binary(data: bytes) -> typing.Iterator[typing.Tuple]:
+    """Decodes the output of a BinaryEmitter.
+
+    Args:
+        data (bytes): everything the emitter wrote, including BINARY_MAGIC.
+
+    Yields:
+        ("open", tag), ("close",) and ("terminal", tag, value) tuples, where
+        values are the plain token values (symbols are not escaped).
+    """
+    if data[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError("not a binary parse tree")
+    position = len(BINARY_MAGIC)
+    while position < len(data):
+        kind = data[position]
+        position += 1
+        if kind < BINARY_CLOSE:
+            yield ("open", NODE_TAGS[kind])
+        elif kind == BINARY_CLOSE:
+            yield ("close",)
+        elif kind == BINARY_INT_CONST:
+            yield ("terminal", "integerConstant",
+                   int.from_bytes(data[position:position + 2], "big"))
+            position += 2
+        elif kind >= BINARY_TOKEN:
+            code = kind - BINARY_TOKEN
+            tag = "keyword" if code in _KEYWORD_CODES else "symbol"
+            yield ("terminal", tag, _TOKEN_TEXTS[code])
+        else:
+            length = shift = 0
+            while True:
+                byte = data[position]
+                position += 1
+                length |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            tag = "stringConstant" if kind == BINARY_STRING_CONST \
+                else "identifier"
+            yield ("terminal", tag,
+                   bytes(data[position:position + length]).decode())
+            position += length
+
+
+# The emitter for each output format, and the extension of its files.
+EMITTERS = {"xml": XmlEmitter, "jsonl": JsonLinesEmitter,
+            "binary": BinaryEmitter}
+OUTPUT_EXTENSIONS = {"xml": ".xml", "jsonl": ".jsonl", "binary": ".bin"}
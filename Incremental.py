@@ -0,0 +1,186 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import bisect
+import io
+import typing
+from JackTokenizer import JackTokenizer, TOKEN_CODES
+from CompilationEngine import CompilationError
+from ParseTree import Node, NODE_KINDS, TreeBuilder, to_xml
+from JackAnalyzer import ENGINES
+
+# For each kind of class member, the keywords it starts with and the
+# engine's rule for it.
+_MEMBER_RULES = {
+    NODE_KINDS["classVarDec"]: (
+        frozenset(TOKEN_CODES[keyword] for keyword in ("static", "field")),
+        "compile_class_var_dec"),
+    NODE_KINDS["subroutineDec"]: (
+        frozenset(TOKEN_CODES[keyword]
+                  for keyword in ("constructor", "function", "method")),
+        "compile_subroutine"),
+}
+# The tokens before the first member: 'class' className '{'.
+_CLASS_HEADER_SIZE = 3
+
+
+def _last_token(node: Node) -> int:
+    # Every member ends with a token, ';' or '}', so this is its last one.
+    while type(node) is not int:
+        node = node.children[-1]
+    return node
+
+
+def _shift_tokens(nodes: typing.Iterable[typing.Union[Node, int]],
+                  delta: int) -> None:
+    # Moves the token indices of whole subtrees by delta, in place.
+    stack = [node for node in nodes if type(node) is not int]
+    while stack:
+        children = stack.pop().children
+        for index, child in enumerate(children):
+            if type(child) is int:
+                children[index] = child + delta
+            else:
+                stack.append(child)
+
+
+class IncrementalParser:
+    """Keeps a Jack class tokenized and parsed while it is being edited.
+
+    After an edit, only the tokens around it are scanned again, see
+    JackTokenizer.edit(), and only the class member they belong to, a
+    classVarDec or a subroutineDec, is parsed again. The Nodes of the other
+    members are kept. If the edit reaches beyond one member, for instance
+    into the class header, or the member no longer ends where it did, the
+    whole class is parsed again.
+
+    Like the tokenizer's offsets, the token indices in the members after
+    the last edit are not moved right away: from member _gap on, they are
+    _gap_shift lower than they are. The tree property moves them when it is
+    read, and an edit only moves the members between it and the one before.
+    """
+
+    def __init__(self, source: str, parser: str = "recursive") -> None:
+        """Tokenizes and parses a class.
+
+        Args:
+            source (str): the class's source code.
+            parser (str, optional): one of JackAnalyzer.ENGINES, for parsing
+                the whole class and its members. Defaults to "recursive".
+
+        Raises:
+            CompilationError: the class has a syntax error. Fix it with
+                edit().
+        """
+        self.tokenizer = JackTokenizer(io.StringIO(source))
+        self._engine = ENGINES[parser]
+        self._tree: typing.Optional[Node] = None
+        self._gap = 0
+        self._gap_shift = 0
+        self._parse_class()
+
+    @property
+    def tree(self) -> typing.Optional[Node]:
+        """The class node, None while the class has a syntax error. Its
+        terminals are indices of the tokenizer's tokens.
+        """
+        if self._tree is not None and self._gap_shift:
+            _shift_tokens(self._tree.children[self._gap:-1], self._gap_shift)
+            self._gap_shift = 0
+        return self._tree
+
+    def edit(self, start: int, end: int, text: str) -> Node:
+        """Replaces source[start:end] with text, and updates the tree.
+
+        Args:
+            start (int): offset of the first character to replace.
+            end (int): offset after the last character to replace.
+            text (str): the text to put instead.
+
+        Returns:
+            Node: what was parsed again, the member that held the edit or
+            the whole class.
+
+        Raises:
+            CompilationError: the edited class has a syntax error. The tree
+                is then None until an edit fixes it.
+            ValueError: the range is not within the source.
+        """
+        first, old_stop, new_stop = self.tokenizer.edit(start, end, text)
+        if self._tree is not None:
+            member = self._parse_member(first, old_stop, new_stop)
+            if member is not None:
+                return member
+        return self._parse_class()
+
+    def to_xml(self) -> str:
+        """
+        Returns:
+            str: the tree as xml, the same as JackAnalyzer writes.
+        """
+        return to_xml(self.tree, self.tokenizer)
+
+    def _parse_class(self) -> Node:
+        self._tree = None
+        self._gap_shift = 0
+        self.tokenizer.seek(0)
+        builder = TreeBuilder(self.tokenizer)
+        self._engine(self.tokenizer, None, builder).run()
+        self._tree = builder.root
+        return self._tree
+
+    def _first_token(self, position: int) -> int:
+        # The index of the first token of the member at a position.
+        first = self._tree.children[position].children[0]
+        return first + self._gap_shift if position >= self._gap else first
+
+    def _parse_member(self, first: int, old_stop: int, new_stop: int) \
+            -> typing.Optional[Node]:
+        # Parses the member that held the old tokens [first, old_stop) again,
+        # and puts it in the tree. Returns None, leaving the tree alone, if
+        # the edit is not within a single member.
+        children = self._tree.children
+        position = bisect.bisect_right(
+            range(len(children) - 1), first, _CLASS_HEADER_SIZE,
+            key=self._first_token) - 1
+        if position < _CLASS_HEADER_SIZE:
+            return None
+        member = children[position]
+        member_last = _last_token(member)
+        if position >= self._gap:
+            member_last += self._gap_shift
+        if old_stop - 1 > member_last:
+            return None
+        delta = new_stop - old_stop
+        keywords, rule = _MEMBER_RULES[member.kind]
+        member_first = self._first_token(position)
+        # The member, and the token after it, must both still be there.
+        if member_last + delta + 1 >= self.tokenizer.token_count or \
+                member_first >= self.tokenizer.token_count:
+            return None
+        self.tokenizer.seek(member_first)
+        if self.tokenizer.token_code() not in keywords:
+            return None
+        builder = TreeBuilder(self.tokenizer)
+        try:
+            getattr(self._engine(self.tokenizer, None, builder), rule)()
+        except CompilationError:
+            return None
+        if self.tokenizer.token_index() != member_last + delta + 1:
+            return None
+        # Moves the members between the gap and this one, so that the ones
+        # before it are all where they are and the ones after it all left
+        # behind by the same shift.
+        if self._gap_shift:
+            _shift_tokens(children[self._gap:position], self._gap_shift)
+            _shift_tokens(children[position + 1:self._gap],
+                          -self._gap_shift)
+        children[position] = builder.root
+        children[-1] += delta
+        self._gap = position + 1
+        self._gap_shift += delta
+        return builder.root
@@ -5,107 +5,651 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import functools
+import io
 import os
 import sys
 import typing
 from JackTokenizer import JackTokenizer
-from CompilationEngine import Compilationengine, ET
+from CompilationEngine import (Compilationengine, CompilationError,
+                               CompilationErrors)
+from Emitters import EMITTERS, OUTPUT_EXTENSIONS, FlatXmlEmitter
+# The modules below are only needed by some modes, so they are imported by
+# the functions that use them, keeping the start of a plain run short. Run
+# "python benchmark.py --startup" to see what a start costs.
+if typing.TYPE_CHECKING:
+    import argparse
+    from TokenCache import TokenCache
+    from BuildCache import BuildCache
+    from Profiler import Profiler, FileProfile
+    from Counters import HotPathCounters
+
+
+def _predictive_engine(*args, **kwargs) -> Compilationengine:
+    # PredictiveParser builds its parse tables when it is imported.
+    from PredictiveParser import PredictiveEngine
+    return PredictiveEngine(*args, **kwargs)
+
+
+# The engine behind each choice of --parser. They all build the same tree,
+# except that "table" rejects empty terms, see PredictiveParser.GRAMMAR.
+ENGINES = {
+    "recursive": Compilationengine,
+    "iterative": functools.partial(
+        Compilationengine, iterative_expressions=True),
+    "table": _predictive_engine}
 
 def analyze_file(
-        input_file: typing.TextIO, output_file: typing.TextIO) -> None:
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        use_mmap: bool = False, output_format: str = "xml",
+        token_cache: typing.Optional['TokenCache'] = None,
+        parser: str = "recursive", recover: bool = False,
+        profile: typing.Optional['FileProfile'] = None) -> None:
     """Analyzes a single file.
 
     Args:
         input_file (typing.TextIO): the file to analyze.
-        output_file (typing.TextIO): writes all output to this file.
+        output_file (typing.TextIO): writes all output to this file. Must be
+            opened in binary mode for the "binary" format.
+        use_mmap (bool, optional): memory-map input_file rather than read it,
+            see JackTokenizer. Defaults to False.
+        output_format (str, optional): one of Emitters.EMITTERS. Defaults to
+            "xml".
+        token_cache (TokenCache, optional): reuses the tokens of sources
+            that were tokenized before, in either mode. Defaults to None.
+        parser (str, optional): one of ENGINES. Defaults to "recursive".
+        recover (bool, optional): go on parsing after a syntax error, and
+            report all of them at the end. Defaults to False.
+        profile (FileProfile, optional): if given, the file is analyzed one
+            phase after the other instead of in a single streaming pass, and
+            every phase is timed into profile. Defaults to None.
+
+    Raises:
+        CompilationError: the first syntax error, or, when recovering,
+            CompilationErrors with all of them. The output written so far
+            is kept.
     """
-    tokenizer = JackTokenizer(input_file)
-    engine = Compilationengine(tokenizer, output_file)
-    engine.run()
+    if profile is not None:
+        _analyze_file_in_phases(input_file, output_file, use_mmap,
+                                output_format, token_cache, parser, recover,
+                                profile)
+        return
+    tokenizer = JackTokenizer(
+        input_file, use_mmap=use_mmap, token_cache=token_cache)
+    try:
+        emitter = EMITTERS[output_format](output_file)
+        engine = ENGINES[parser](tokenizer, output_file, emitter,
+                                 recover=recover)
+        try:
+            engine.run()
+        except CompilationError:
+            emitter.flush()
+            raise
+        if engine.errors:
+            raise CompilationErrors(engine.errors)
+    finally:
+        tokenizer.close()
+
+def _analyze_file_in_phases(
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        use_mmap: bool, output_format: str,
+        token_cache: typing.Optional['TokenCache'], parser: str, recover: bool,
+        profile: 'FileProfile', buffered: bool = False) -> None:
+    # If buffered, output_file is an in-memory buffer that the caller writes
+    # out, and times: the tree is serialized straight into it.
+    from ParseTree import TreeBuilder, emit_tree
+    # A memory-mapped file is only read as it is tokenized.
+    with profile.phase("read"):
+        source = input_file if use_mmap else io.StringIO(input_file.read())
+    with profile.phase("tokenize"):
+        tokenizer = JackTokenizer(
+            source, use_mmap=use_mmap, token_cache=token_cache)
+    try:
+        builder = TreeBuilder(tokenizer)
+        with profile.phase("parse"):
+            engine = ENGINES[parser](tokenizer, None, builder, recover=recover)
+            engine.run()
+        with profile.phase("serialize"):
+            output = output_file if buffered else \
+                io.BytesIO() if output_format == "binary" else io.StringIO()
+            emit_tree(builder.root, tokenizer, EMITTERS[output_format](output))
+        if not buffered:
+            with profile.phase("write"):
+                output_file.write(output.getvalue())
+    finally:
+        tokenizer.close()
+    if engine.errors:
+        raise CompilationErrors(engine.errors)
+
+def _token_cache(directory: typing.Optional[str]) \
+        -> typing.Optional['TokenCache']:
+    if not directory:
+        return None
+    from TokenCache import TokenCache
+    return TokenCache(directory)
 
 def create_token_file(
-    input_file: typing.TextIO, output_file: typing.TextIO) -> None:
+    input_file: typing.TextIO, output_file: typing.TextIO,
+    token_cache: typing.Optional['TokenCache'] = None) -> None:
     """creates a token file using the JackTokenizer module.
 
+    The tokens are written as they are scanned. Without a token cache, the
+    input is also read a chunk at a time, so memory use stays the same
+    however large the file is.
+
     Args:
         input_file (typing.TextIO): the file to analyze.
         output_file (typing.TextIO): writes all output to this file.
+        token_cache (TokenCache, optional): see analyze_file. Needs the
+            whole input in memory. Defaults to None.
     """
-    root = ET.Element("tokens")
-    tokenizer = JackTokenizer(input_file)
+    tokenizer = JackTokenizer(input_file, lazy=token_cache is None,
+                              token_cache=token_cache)
+    emitter = FlatXmlEmitter(output_file)
+    emitter.open_node("tokens")
     while tokenizer.has_more_tokens():
-        tokenElement = ET.SubElement(root, tokenizer.token_type_translated())
-        tokenElement.text = " " + str(tokenizer.current_token_val()) + " "
+        emitter.terminal(tokenizer.token_type_translated(),
+                         tokenizer.current_token_val())
         tokenizer.advance()
-    try:
-        xml_bytes = ET.tostring(root, encoding="utf-8", xml_declaration=False)
-        xml_string = xml_bytes.decode("utf-8")
-        output_file.write(xml_string)
-    except Exception as e:
-        print(f"Error writing XML content to TextIO object: {e}")
-
+    emitter.close_node()
+    emitter.flush()
 
 
-def main_only_tokens():
+def main_only_tokens(args: typing.Optional['argparse.Namespace'] = None):
     # Parses the input path and calls analyze_file on each input file.
     # This opens both the input and the output files!
     # Both are closed automatically when the code finishes running.
     # If the output file does not exist, it is created automatically in the
     # correct path, using the correct filename.
-    if not len(sys.argv) == 2:
-        sys.exit("Invalid usage, please use: JackAnalyzer <input path>")
-    argument_path = os.path.abspath(sys.argv[1])
-    if os.path.isdir(argument_path):
-        files_to_assemble = [
-            os.path.join(argument_path, filename)
-            for filename in os.listdir(argument_path)]
-    else:
-        files_to_assemble = [argument_path]
-    for input_path in files_to_assemble:
+    if args is None:
+        args = parse_arguments()
+    token_cache = _token_cache(args.token_cache)
+    for input_path in find_jack_files(args.input_path):
         filename = os.path.basename(input_path).split('.')[0]
         _, extension = os.path.splitext(input_path)
         if extension.lower() != ".jack":
             continue
         input_dir = os.path.dirname(input_path)
         # creating a new directory for our result xml file
-        compare_folder = input_dir + "\\Compare"
-        if not os.path.exists(compare_folder):
-            os.makedirs(compare_folder)
-        output_path = compare_folder + "\\" + filename + "T.xml"
+        compare_folder = os.path.join(input_dir, "Compare")
+        os.makedirs(compare_folder, exist_ok=True)
+        output_path = os.path.join(compare_folder, filename + "T.xml")
         with open(input_path, 'r') as input_file, \
                 open(output_path, 'w') as output_file:
-            create_token_file(input_file, output_file)
+            create_token_file(input_file, output_file, token_cache)
+
+def find_jack_files(path: str) -> typing.List[str]:
+    """
+    Args:
+        path (str): a .jack file, or a directory of .jack files.
+
+    Returns:
+        typing.List[str]: the absolute paths of the .jack files, sorted.
+    """
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        return [path]
+    return [os.path.join(path, filename)
+            for filename in sorted(os.listdir(path))
+            if os.path.splitext(filename)[1].lower() == ".jack"]
+
+
+def count_file(input_path: str, parser: str = "recursive") \
+        -> 'HotPathCounters':
+    """Analyzes a single file without writing anything, counting how often
+    the hot paths run.
+
+    Args:
+        input_path (str): path of the .jack file.
+        parser (str, optional): one of ENGINES. Defaults to "recursive".
+
+    Returns:
+        HotPathCounters: the counts.
+    """
+    with open(input_path, 'r') as input_file:
+        tokenizer = JackTokenizer(input_file)
+    engine = ENGINES[parser](tokenizer, io.StringIO())
+    counters = engine.enable_counters()
+    engine.run()
+    return counters
+
+
+def main_counting(args: 'argparse.Namespace') -> None:
+    # Prints the hot path counts of every .jack file and their total.
+    from Counters import HotPathCounters
+    files_to_count = find_jack_files(args.input_path)
+    total = HotPathCounters()
+    failed = False
+    for input_path in files_to_count:
+        try:
+            counters = count_file(input_path, args.parser)
+        except Exception as error:
+            print(f"{input_path}: {type(error).__name__}: {error}",
+                  file=sys.stderr)
+            failed = True
+            continue
+        total.add(counters)
+        print(f"{input_path}\n{counters.summary()}")
+    if len(files_to_count) > 1:
+        print(f"total\n{total.summary()}")
+    if failed:
+        sys.exit(1)
+
+class Analysis(typing.NamedTuple):
+    """What analyze_many, or analyze_to_string, made of one source."""
+    # The name the source was given with.
+    name: str
+    # The output, bytes for the "binary" format. If there is an error, it
+    # holds everything emitted before it.
+    output: typing.Union[str, bytes]
+    # The first syntax error or, when recovering, CompilationErrors with all
+    # of them. None for a valid source.
+    error: typing.Optional[CompilationError]
+
+
+def analyze_to_string(input_path: str, output_format: str = "xml",
+                      use_mmap: bool = False,
+                      token_cache_dir: typing.Optional[str] = None,
+                      parser: str = "recursive", recover: bool = False,
+                      profile: typing.Optional['FileProfile'] = None) \
+        -> Analysis:
+    """Analyzes a single file and returns its output instead of writing it.
+    This is what analyze_paths runs for every file, in this process or in
+    a worker process, and the output is then written by write_analysis.
+
+    Args:
+        input_path (str): path of the .jack file.
+        output_format (str, optional): one of Emitters.EMITTERS. Defaults to
+            "xml".
+        use_mmap (bool, optional): see analyze_file. Defaults to False.
+        token_cache_dir (str, optional): directory of a TokenCache to use.
+            Defaults to None.
+        parser (str, optional): one of ENGINES. Defaults to "recursive".
+        recover (bool, optional): see analyze_file. Defaults to False.
+        profile (FileProfile, optional): see analyze_file, but the output is
+            not written anywhere, so no "write" phase is timed: that is up to
+            the caller. Defaults to None.
+
+    Returns:
+        Analysis: named input_path. A syntax error is returned rather than
+        raised.
+
+    Raises:
+        OSError: input_path cannot be read.
+    """
+    token_cache = _token_cache(token_cache_dir)
+    output_file = io.BytesIO() if output_format == "binary" else io.StringIO()
+    error = None
+    with open(input_path, 'rb' if use_mmap else 'r') as input_file:
+        try:
+            if profile is not None:
+                _analyze_file_in_phases(input_file, output_file, use_mmap,
+                                        output_format, token_cache, parser,
+                                        recover, profile, buffered=True)
+            else:
+                analyze_file(input_file, output_file, use_mmap=use_mmap,
+                             output_format=output_format,
+                             token_cache=token_cache, parser=parser,
+                             recover=recover)
+        except CompilationError as raised:
+            error = raised
+    return Analysis(input_path, output_file.getvalue(), error)
+
+
+def _profile_to_string(*args) -> typing.Tuple[Analysis, 'FileProfile']:
+    # What a worker process runs when profiling, so the profile comes back.
+    from Profiler import FileProfile
+    profile = FileProfile()
+    return analyze_to_string(*args, profile=profile), profile
+
+
+def analyze_many(
+        sources: typing.Iterable[typing.Tuple[str, typing.Union[str,
+                                                                typing.IO]]],
+        output_format: str = "xml", parser: str = "recursive",
+        recover: bool = False,
+        token_cache: typing.Optional['TokenCache'] = None) \
+        -> typing.Iterator[Analysis]:
+    """Analyzes many sources in this process, one after the other. This is
+    the entry point for programs that embed the analyzer.
+
+    The tokenizer's regexes and the parse tables are built once per process
+    anyway. On top of that, the engine is looked up once and a single
+    output buffer and emitter are reused for every source, so the emitter's
+    caches carry over from one source to the next. A source with syntax
+    errors does not stop the others.
 
-def main_analyzing() -> None:
+    Args:
+        sources (typing.Iterable[typing.Tuple[str, str | typing.IO]]):
+            (name, source) pairs, where the source is Jack code, or a stream
+            to read it from, in text or binary mode. Read one at a time, as
+            the results are asked for.
+        output_format (str, optional): one of Emitters.EMITTERS. Defaults to
+            "xml".
+        parser (str, optional): one of ENGINES. Defaults to "recursive".
+        recover (bool, optional): see analyze_file. Defaults to False.
+        token_cache (TokenCache, optional): see analyze_file. Defaults to
+            None.
+
+    Yields:
+        Analysis: the result of every source, in order.
+    """
+    engine = ENGINES[parser]
+    output_file = io.BytesIO() if output_format == "binary" else io.StringIO()
+    emitter = EMITTERS[output_format](output_file)
+    for name, source in sources:
+        output_file.seek(0)
+        output_file.truncate()
+        emitter.reset(output_file)
+        if isinstance(source, str):
+            source = io.StringIO(source)
+        tokenizer = JackTokenizer(source, token_cache=token_cache)
+        error = None
+        try:
+            compiler = engine(tokenizer, output_file, emitter, recover=recover)
+            compiler.run()
+            if compiler.errors:
+                error = CompilationErrors(compiler.errors)
+        except CompilationError as raised:
+            emitter.flush()
+            error = raised
+        yield Analysis(name, output_file.getvalue(), error)
+
+
+def output_path_for(input_path: str, output_format: str = "xml") -> str:
+    """
+    Args:
+        input_path (str): path of a .jack file.
+        output_format (str, optional): one of Emitters.EMITTERS. Defaults to
+            "xml".
+
+    Returns:
+        str: the path its output is written to, next to it.
+    """
+    return os.path.splitext(input_path)[0] + OUTPUT_EXTENSIONS[output_format]
+
+
+def write_analysis(analysis: Analysis, output_format: str = "xml",
+                   cache: typing.Optional['BuildCache'] = None) -> None:
+    """Writes the output of a .jack file next to it, as every way of
+    analyzing many files does.
+
+    A file that failed gets an output file too, so that the output of an
+    earlier run is not left behind as if it were current. It holds the tree
+    recovered from the syntax errors, if they were recovered from, and is
+    empty otherwise. Its cache entry is dropped, so it is analyzed again.
+
+    Args:
+        analysis (Analysis): named after the path of the .jack file.
+        output_format (str, optional): one of Emitters.EMITTERS. Defaults to
+            "xml".
+        cache (BuildCache, optional): see analyze_paths. Defaults to None.
+    """
+    output_path = output_path_for(analysis.name, output_format)
+    output = analysis.output
+    if analysis.error is None:
+        if cache is not None:
+            cache.store(analysis.name, output_path, output_format, output)
+            return
+    else:
+        if cache is not None:
+            cache.forget(analysis.name)
+        if not isinstance(analysis.error, CompilationErrors):
+            output = b"" if output_format == "binary" else ""
+    with open(output_path, 'wb' if output_format == "binary" else 'w') \
+            as output_file:
+        output_file.write(output)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def analyze_paths(
+        input_paths: typing.List[str], output_format: str = "xml",
+        use_mmap: bool = False, jobs: int = 1,
+        cache: typing.Optional['BuildCache'] = None,
+        token_cache_dir: typing.Optional[str] = None,
+        parser: str = "recursive", recover: bool = False,
+        profiler: typing.Optional['Profiler'] = None) \
+        -> typing.List[typing.Tuple[str, Exception]]:
+    """Analyzes .jack files, writing each output next to its input.
+
+    With more than one job, the files are spread over a pool of worker
+    processes, largest first so that a big file is not left to run alone at
+    the end. The workers return the outputs, which are written in the order
+    of input_paths. A file that fails does not stop the others, and its
+    output is written as write_analysis says, however many jobs there are.
+
+    Args:
+        input_paths (typing.List[str]): paths of the .jack files.
+        output_format (str, optional): one of Emitters.EMITTERS. Defaults to
+            "xml".
+        use_mmap (bool, optional): see analyze_file. Defaults to False.
+        jobs (int, optional): number of worker processes. Defaults to 1,
+            which analyzes the files one by one in this process.
+        cache (BuildCache, optional): if given, files whose output is up to
+            date are skipped, and outputs that did not change are not
+            rewritten. The caller saves it. Defaults to None.
+        token_cache_dir (str, optional): directory of a TokenCache to use.
+            Defaults to None.
+        parser (str, optional): one of ENGINES. Defaults to "recursive".
+        recover (bool, optional): see analyze_file. Defaults to False.
+        profiler (Profiler, optional): if given, every phase of every file
+            is timed into it, see analyze_file. Defaults to None.
+
+    Returns:
+        typing.List[typing.Tuple[str, Exception]]: the path and error of
+        every file that failed, in the order of input_paths.
+    """
+    errors = []
+    if cache is not None:
+        input_paths = [
+            input_path for input_path in input_paths
+            if not cache.is_fresh(input_path,
+                                  output_path_for(input_path, output_format),
+                                  output_format)]
+
+    def write_output(analysis: Analysis):
+        try:
+            if profiler is not None:
+                with profiler.file(analysis.name).phase("write"):
+                    write_analysis(analysis, output_format, cache)
+            else:
+                write_analysis(analysis, output_format, cache)
+        except Exception as error:
+            analysis = analysis._replace(error=error)
+            if cache is not None:
+                cache.forget(analysis.name)
+        if analysis.error is not None:
+            errors.append((analysis.name, analysis.error))
+
+    def profile_of(input_path: str) -> typing.Optional['FileProfile']:
+        return profiler.file(input_path) if profiler is not None else None
+
+    if jobs <= 1 or len(input_paths) <= 1:
+        for input_path in input_paths:
+            try:
+                analysis = analyze_to_string(
+                    input_path, output_format, use_mmap, token_cache_dir,
+                    parser, recover, profile_of(input_path))
+            except Exception as error:
+                analysis = Analysis(input_path, "", error)
+            write_output(analysis)
+        return errors
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(jobs, len(input_paths))) as pool:
+        worker = analyze_to_string if profiler is None else _profile_to_string
+        futures = {
+            input_path: pool.submit(
+                worker, input_path, output_format, use_mmap,
+                token_cache_dir, parser, recover)
+            for input_path in sorted(input_paths, key=_file_size, reverse=True)}
+        for input_path in input_paths:
+            try:
+                analysis = futures[input_path].result()
+                if profiler is not None:
+                    analysis, profiler.files[input_path] = analysis
+            except Exception as error:
+                analysis = Analysis(input_path, "", error)
+            write_output(analysis)
+    return errors
+
+
+def parse_arguments() -> 'argparse.Namespace':
+    """Parses the command line of main_analyzing.
+
+    Returns:
+        argparse.Namespace: the parsed arguments.
+    """
+    import argparse
+    from BuildCache import MANIFEST_NAME
+    parser = argparse.ArgumentParser(
+        prog="JackAnalyzer",
+        usage="JackAnalyzer <input path> [options]")
+    parser.add_argument(
+        "input_path", help="a .jack file, or a directory of .jack files")
+    parser.add_argument(
+        "--mmap", action="store_true",
+        help="memory-map the .jack files and tokenize their bytes directly")
+    parser.add_argument(
+        "--format", choices=EMITTERS, default="xml",
+        help="output format of the parse tree (default: xml)")
+    parser.add_argument(
+        "--parser", choices=ENGINES, default="recursive",
+        help="recursive descent, recursive descent with expressions parsed "
+             "on an explicit stack, or the table-driven LL(1) parser "
+             "(default: recursive)")
+    parser.add_argument(
+        "--recover", action="store_true",
+        help="do not stop at the first syntax error in a file, report all "
+             "of them")
+    parser.add_argument(
+        "--profile", nargs="?", const="-", metavar="REPORT",
+        help="time every phase of every file, and write a JSON report to "
+             "REPORT (default: standard output)")
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="analyze the files in one process, reading the next files and "
+             "writing the last outputs while parsing")
+    parser.add_argument(
+        "--split", action="store_true",
+        help="analyze the files one by one, parsing the subroutines of each "
+             "class in parallel instead, for a few very large classes")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count() or 1, metavar="N",
+        help="number of files, or with --split of subroutines, to analyze "
+             "in parallel (default: number of cores)")
+    parser.add_argument(
+        "--cache", nargs="?", const="", metavar="MANIFEST",
+        help="skip files whose output is up to date, using a manifest of "
+             f"content hashes (default: {MANIFEST_NAME} in the input "
+             "directory)")
+    parser.add_argument(
+        "--token-cache", metavar="DIR",
+        help="keep the tokens of every source in DIR, keyed by its content "
+             "hash, and reuse them in later runs of either mode")
+    parser.add_argument(
+        "--counters", action="store_true",
+        help="only print how often the hot paths of the tokenizer and "
+             "parser run for each file, writing nothing")
+    parser.add_argument(
+        "--tokens", action="store_true",
+        help="only tokenize, writing Compare/<name>T.xml files")
+    arguments = parser.parse_args()
+    if arguments.pipeline and arguments.profile is not None:
+        parser.error("--pipeline cannot be combined with --profile, which "
+                     "times the phases one after the other")
+    if arguments.pipeline and arguments.mmap:
+        parser.error("--pipeline cannot be combined with --mmap, it reads "
+                     "every file whole in an I/O thread")
+    if arguments.split and (arguments.pipeline or arguments.profile is not None
+                            or arguments.token_cache):
+        parser.error("--split cannot be combined with --pipeline, --profile "
+                     "or --token-cache")
+    # The modes that write no parse tree, and the options they use besides
+    # the input path.
+    for mode, used in (("tokens", ("token_cache",)),
+                       ("counters", ("parser",))):
+        if not getattr(arguments, mode):
+            continue
+        ignored = [f"--{dest.replace('_', '-')}"
+                   for dest, value in vars(arguments).items()
+                   if dest not in ("input_path", mode) + used
+                   and value != parser.get_default(dest)]
+        if ignored:
+            parser.error(f"--{mode} cannot be combined with "
+                         f"{', '.join(ignored)}")
+    return arguments
+
+
+def main_analyzing(args: typing.Optional['argparse.Namespace'] = None) -> None:
     # Parses the input path and calls analyze_file on each input file.
     # This opens both the input and the output files!
     # Both are closed automatically when the code finishes running.
     # If the output file does not exist, it is created automatically in the
     # correct path, using the correct filename.
-    if not len(sys.argv) == 2:
-        sys.exit("Invalid usage, please use: JackAnalyzer <input path>")
-    argument_path = os.path.abspath(sys.argv[1])
-    if os.path.isdir(argument_path):
-        files_to_assemble = [
-            os.path.join(argument_path, filename)
-            for filename in os.listdir(argument_path)]
+    if args is None:
+        args = parse_arguments()
+    argument_path = os.path.abspath(args.input_path)
+    jack_files = [input_path for input_path in find_jack_files(argument_path)
+                  if os.path.splitext(input_path)[1].lower() == ".jack"]
+    cache = None
+    if args.cache is not None:
+        from BuildCache import BuildCache, MANIFEST_NAME
+        input_dir = argument_path if os.path.isdir(argument_path) \
+            else os.path.dirname(argument_path)
+        cache = BuildCache(args.cache or os.path.join(input_dir, MANIFEST_NAME))
+    profiler = None
+    if args.profile is not None:
+        from Profiler import Profiler
+        profiler = Profiler()
+    if args.pipeline:
+        from Pipeline import analyze_paths_pipelined
+        errors = analyze_paths_pipelined(
+            jack_files, args.format, args.parser, args.recover, cache,
+            args.token_cache)
+    elif args.split:
+        from ParallelParser import analyze_paths_split
+        errors = analyze_paths_split(
+            jack_files, args.format, args.parser, args.recover, args.jobs,
+            cache, args.mmap)
     else:
-        files_to_assemble = [argument_path]
-    for input_path in files_to_assemble:
-        filename, extension = os.path.splitext(input_path)
-        if extension.lower() != ".jack":
-            continue
-        output_path = filename + ".xml"
-        with open(input_path, 'r') as input_file, \
-                open(output_path, 'w') as output_file:
-            analyze_file(input_file, output_file)
+        errors = analyze_paths(
+            jack_files, args.format, args.mmap, args.jobs, cache,
+            args.token_cache, args.parser, args.recover, profiler)
+    if cache is not None:
+        cache.evict_stale()
+        cache.save()
+    if profiler is not None:
+        import json
+        report = json.dumps(profiler.report(), indent=2)
+        if args.profile == "-":
+            print(report)
+        else:
+            with open(args.profile, 'w') as report_file:
+                report_file.write(report + "\n")
+    for input_path, error in errors:
+        print(f"{input_path}: {type(error).__name__}: {error}",
+              file=sys.stderr)
+    if errors:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    # commenting out our second main function used
-    # for the sake of unit-testing the JackTokenizer module. 
-    #main_only_tokens()
-    main_analyzing()
+    # our second main function is used for the sake of unit-testing the
+    # JackTokenizer module, run it with --tokens.
+    arguments = parse_arguments()
+    if arguments.tokens:
+        main_only_tokens(arguments)
+    elif arguments.counters:
+        main_counting(arguments)
+    else:
+        main_analyzing(arguments)
     # root = ET.Element("hello")
     # root.text = 99
     # xml_bytes = ET.tostring(root, encoding="utf-8", xml_declaration=False)
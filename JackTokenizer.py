@@ -5,14 +5,239 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import array
+import bisect
+import mmap
 import typing
 import re
+import sys
 KEYWORD = "KEYWORD".lower()
 SYMBOL = "SYMBOL".lower()
 INT_CONST = "INT_CONST".lower()
 STRING_CONST = "STRING_CONST".lower()
 IDENTIFIER = "IDENTIFIER".lower()
 
+# Number of characters a lazy tokenizer reads from its input at a time.
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+KEYWORDS = (
+    "class", "method", "function", "constructor", "int", "boolean", "char",
+    "void", "var", "static", "field", "let", "do", "if", "else", "while",
+    "return", "true", "false", "null", "this")
+SYMBOLS = (
+    '{', '}', '(', ')', '[', ']', '.', ',', ';', '+', '-', '*', '/', '&', '|',
+    '<', '>', '=', '~', '^', '#')
+
+# The tag each token type gets in the xml file.
+TOKEN_TAGS = {
+    KEYWORD: "keyword",
+    SYMBOL: "symbol",
+    IDENTIFIER: "identifier",
+    INT_CONST: "integerConstant",
+    STRING_CONST: "stringConstant"
+}
+
+# Every token is stored as a one byte code. Each keyword and symbol has a
+# code of its own, so the parser can compare codes instead of strings.
+# KEYWORD_CODE is shared by keywords that are not written in lower case,
+# which are keywords but do not match the grammar's terminals.
+UNKNOWN_CODE = 0
+IDENTIFIER_CODE = 1
+INT_CONST_CODE = 2
+STRING_CONST_CODE = 3
+KEYWORD_CODE = 4
+TOKEN_CODES = {text: code for code, text in
+               enumerate(KEYWORDS + SYMBOLS, start=KEYWORD_CODE + 1)}
+
+# Symbols that are written to the xml file as an entity.
+_SYMBOL_VALUES = {'<': '&lt', '>': '&gt', '&': '&amp'}
+
+# Lookup tables indexed by token code.
+CODE_TYPES = ("", IDENTIFIER, INT_CONST, STRING_CONST, KEYWORD) + \
+    (KEYWORD,) * len(KEYWORDS) + (SYMBOL,) * len(SYMBOLS)
+CODE_TAGS = tuple(TOKEN_TAGS.get(token_type, "") for token_type in CODE_TYPES)
+_CODE_VALUES = (None,) * (KEYWORD_CODE + 1) + KEYWORDS + \
+    tuple(_SYMBOL_VALUES.get(symbol, symbol) for symbol in SYMBOLS)
+
+_KEYWORD_SET = frozenset(KEYWORDS)
+_IDENTIFIER_START = frozenset(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_")
+_IDENTIFIER_PATTERN = re.compile(r'^[a-zA-Z_]\w*$', re.ASCII)
+
+# One alternation does both comment removal and tokenization. Whitespace and
+# comments are matched outside of any group, so match.lastindex is None for
+# them; otherwise it tells which kind of token was found. The order of the
+# alternatives is crucial: comments must come before the '/' symbol and
+# strings before everything else. An unterminated multi-line comment
+# swallows the rest of the file. Its \s, \d and \w are ASCII only, which is
+# all that valid Jack needs, so that text and bytes are scanned alike. Other
+# characters are only valid in strings and comments; elsewhere, each one is
+# a single token.
+_STRING_GROUP, _NUMBER_GROUP, _WORD_GROUP, _CHAR_GROUP = 1, 2, 3, 4
+_TOKEN_PATTERN = re.compile(
+    r'\s+'                          # Whitespace
+    r'|//[^\n]*'                    # Single-line comment
+    r'|/\*.*?(?:\*/|\Z)'            # Multi-line comment
+    r'|("(?:[^"\\\n]|\\[^\n])*")'   # 1. Double-quoted strings
+    r'|(\d+(?:\.\d+)?)'             # 2. Numbers
+    r'|(\w+)'                       # 3. Alphanumeric words
+    r'|(\S)',                       # 4. Any other single character
+    re.DOTALL | re.ASCII)
+# The same pattern over bytes, used for memory-mapped input. A character
+# that is not ASCII is a single token of all its UTF-8 bytes, so that its
+# lexeme can still be decoded.
+_BYTES_TOKEN_PATTERN = re.compile(
+    _TOKEN_PATTERN.pattern.encode().replace(
+        rb'|(\S)', rb'|([\xc0-\xff][\x80-\xbf]*|\S)'), re.DOTALL)
+_BYTES_TOKEN_CODES = {text.encode(): code for text, code in TOKEN_CODES.items()}
+_BYTES_KEYWORD_SET = frozenset(keyword.encode() for keyword in KEYWORDS)
+_BYTES_IDENTIFIER_START = frozenset(
+    b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_")
+
+
+def _is_valid_integer(s: str) -> bool:
+    """Checks if a string represents an integer in the range 0-32767."""
+    try:
+        num = int(s)
+    except ValueError:
+        return False
+    return 0 <= num <= 32767
+
+
+def _token_code(group: int, token: str) -> int:
+    """Determines the code of a scanned token.
+
+    Args:
+        group (int): the index of the pattern group that matched the token.
+        token (str): the token as it appears in the source.
+
+    Returns:
+        int: the token's code, UNKNOWN_CODE if it is not a valid token.
+    """
+    if group == _WORD_GROUP:
+        code = TOKEN_CODES.get(token)
+        if code is not None:
+            return code
+        if token.lower() in _KEYWORD_SET:
+            return KEYWORD_CODE
+        if token[0] in _IDENTIFIER_START:
+            return IDENTIFIER_CODE
+    elif group == _CHAR_GROUP:
+        if token == '"':
+            # A lone quote both starts and ends with a quote.
+            return STRING_CONST_CODE
+        return TOKEN_CODES.get(token, UNKNOWN_CODE)
+    elif group == _STRING_GROUP:
+        return STRING_CONST_CODE
+    if _is_valid_integer(token):
+        return INT_CONST_CODE
+    return UNKNOWN_CODE
+
+
+def _bytes_token_code(group: int, token: bytes) -> int:
+    """Same as _token_code(), for a token scanned from bytes. Nothing is
+    decoded: keywords and symbols are looked up as bytes, and int() parses
+    ASCII digits directly.
+    """
+    if group == _WORD_GROUP:
+        code = _BYTES_TOKEN_CODES.get(token)
+        if code is not None:
+            return code
+        if token.lower() in _BYTES_KEYWORD_SET:
+            return KEYWORD_CODE
+        if token[0] in _BYTES_IDENTIFIER_START:
+            return IDENTIFIER_CODE
+    elif group == _CHAR_GROUP:
+        if token == b'"':
+            return STRING_CONST_CODE
+        return _BYTES_TOKEN_CODES.get(token, UNKNOWN_CODE)
+    elif group == _STRING_GROUP:
+        return STRING_CONST_CODE
+    if _is_valid_integer(token):
+        return INT_CONST_CODE
+    return UNKNOWN_CODE
+
+
+def _map_input(input_stream: typing.IO) -> typing.Optional[mmap.mmap]:
+    """Memory-maps the file behind a stream, read only.
+
+    Args:
+        input_stream (typing.IO): the stream to map.
+
+    Returns:
+        mmap.mmap: the mapping, or None if the stream is not a seekable,
+        non-empty file (stdin, pipes, io.StringIO, ...).
+    """
+    try:
+        if not input_stream.seekable():
+            return None
+        return mmap.mmap(input_stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        # io.UnsupportedOperation is both an OSError and a ValueError, and
+        # mmap raises ValueError for an empty file.
+        return None
+
+
+def token_value(code: int, lexeme: str) -> typing.Union[str, int]:
+    """Decodes a token into its value, as it is written to the xml file.
+
+    Keywords and symbols are looked up by their code, so only identifiers,
+    integers and strings need their lexeme.
+
+    Args:
+        code (int): the token's code.
+        lexeme (str): the token as it appears in the source.
+
+    Returns:
+        str | int: the value, "" for unrecognised tokens.
+    """
+    value = _CODE_VALUES[code]
+    if value is not None:
+        return value
+    if code == IDENTIFIER_CODE:
+        return lexeme
+    if code == INT_CONST_CODE:
+        return int(lexeme)
+    if code == STRING_CONST_CODE:
+        return lexeme[1:-1]
+    if code == KEYWORD_CODE:
+        return lexeme.lower()
+    return ""
+
+
+class Token:
+    """A view of one token of an eagerly tokenized input. Nothing is copied
+    out of the tokenizer until one of the properties is read.
+    """
+    __slots__ = ("_tokenizer", "index")
+
+    def __init__(self, tokenizer: 'JackTokenizer', index: int) -> None:
+        self._tokenizer = tokenizer
+        self.index = index
+
+    @property
+    def code(self) -> int:
+        return self._tokenizer.code_at(self.index)
+
+    @property
+    def lexeme(self) -> str:
+        return self._tokenizer.lexeme_at(self.index)
+
+    @property
+    def token_type(self) -> str:
+        return CODE_TYPES[self.code]
+
+    @property
+    def tag(self) -> str:
+        return CODE_TAGS[self.code]
+
+    @property
+    def value(self) -> typing.Union[str, int]:
+        return self._tokenizer.value_at(self.index)
+
+    def __repr__(self) -> str:
+        return f"Token({self.index}, {self.tag}, {self.lexeme!r})"
+
 
 class JackTokenizer:
     """Removes all comments from the input stream and breaks it
@@ -98,144 +323,224 @@ class JackTokenizer:
     Note that ^, # correspond to shiftleft and shiftright, respectively.
     """
 
-    def __init__(self, input_stream: typing.TextIO) -> None:
+    def __init__(self, input_stream: typing.TextIO, lazy: bool = False,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 use_mmap: bool = False,
+                 token_cache: 'TokenCache' = None,
+                 tokens: typing.Optional[typing.Tuple[
+                     typing.Sequence[int], typing.Sequence[int],
+                     typing.Sequence[int]]] = None) -> None:
         """Opens the input stream and gets ready to tokenize it.
 
-        Args:
-            input_stream (typing.TextIO): input stream.
-        """
-        # Your code goes here!
-        # A good place to start is to read all the lines of the input:
-        input_lines = input_stream.read().splitlines()
-        self.token_list = self.get_words_from_code_script_filtered(input_lines)
-        self._current_token_index: int = 0
-        if self.token_list:
-            self._current_token: str = self.token_list[self._current_token_index]
+        The whole input is kept as one string, and each token is stored as
+        a one byte code plus its start and end offsets in that string, in
+        three arrays. Lexemes are only sliced out when they are asked for.
 
+        The input may also be bytes (a stream opened in binary mode, or a
+        memory-mapped file). It is then tokenized as is, and only the 
+        identifiers and strings that are asked for get decoded, as UTF-8.
 
-    def get_cleaned_code_string(self, input_lines):
+        Args:
+            input_stream (typing.TextIO): input stream.
+            lazy (bool, optional): if True, the input is read chunk_size
+                characters at a time and tokens are scanned only as advance()
+                asks for them, so memory use does not grow with the input.
+                The index based methods are not available in this mode.
+                Defaults to False.
+            chunk_size (int, optional): characters read per chunk in lazy
+                mode. Defaults to DEFAULT_CHUNK_SIZE.
+            use_mmap (bool, optional): if True, memory-map the file behind
+                input_stream instead of reading it, falling back to read()
+                for streams that cannot be mapped. Release the mapping with
+                close(). Defaults to False.
+            token_cache (TokenCache, optional): if given, the tokens of a
+                source it has seen before are loaded from it instead of
+                being scanned again, and new ones are stored in it. Not used
+                in lazy mode. Defaults to None.
+            tokens (tuple, optional): the codes, start and end offsets of the
+                input's tokens, as columns() returns them, e.g. from another
+                process. The input is then not scanned at all. Not used in
+                lazy mode. Defaults to None.
         """
-        Removes comments from Jack code while preserving string literals.
+        self._lazy = lazy
+        self._mapping = None
+        if lazy:
+            self.token_count = None
+            self._tokens = self.tokenize_stream(input_stream, chunk_size)
+        else:
+            if use_mmap:
+                self._mapping = _map_input(input_stream)
+            if self._mapping is not None:
+                self._source = self._mapping
+            else:
+                self._source = input_stream.read()
+            self._binary = not isinstance(self._source, str)
+            if tokens is not None:
+                self._codes, self._starts, self._ends = tokens
+            elif token_cache is not None:
+                self._codes, self._starts, self._ends = \
+                    token_cache.get_or_tokenize(self._source, self.tokenize)
+            else:
+                self._codes, self._starts, self._ends = \
+                    self.tokenize(self._source)
+            self.token_count = len(self._codes)
+        # After edit(), the offsets of the tokens from index _gap on are
+        # stored _gap_shift lower than they are, see edit().
+        self._gap = sys.maxsize
+        self._gap_shift = 0
+        self._current_code = UNKNOWN_CODE
+        self._current_lexeme = ""
+        self._has_token = True
+        self._current_token_index: int = -1
+        self.advance()
+
+    def tokenize(self, source: str) -> typing.Tuple[
+            array.array, array.array, array.array]:
+        """Breaks Jack source code into tokens in a single pass.
+
+        Comments and whitespace are matched by the same regex as the tokens
+        themselves and simply produce no token, so the source is never
+        copied into an intermediate comment-free string.
 
         Handles:
-        - multi-line comments (/* ... */)
+        - multi-line comments (/* ... */), an unterminated one runs to EOF
         - single-line comments (// ...)
         - strings containing // or /*
         - ignores quotes inside comments
 
-        Returns:
-            A single string of cleaned code.
-        """
-        cleaned_parts = []
-        in_multi_line_comment = False
-
-        for line in input_lines:
-            i = 0
-            in_string = False
-            cleaned_line = ""
-            length = len(line)
-
-            while i < length:
-                ch = line[i]
-                next_two = line[i:i+2]
-
-                # --- Handle end of multi-line comment ---
-                if in_multi_line_comment:
-                    if next_two == '*/':
-                        in_multi_line_comment = False
-                        i += 2
-                    else:
-                        i += 1
-                    continue  # skip all characters inside multi-line comments
-
-                # --- Handle start of multi-line comment ---
-                if not in_string and next_two == '/*':
-                    in_multi_line_comment = True
-                    i += 2
-                    continue
-
-                # --- Handle single-line comment ---
-                if not in_string and next_two == '//':
-                    break  # ignore rest of line
-
-                # --- Handle string toggling ---
-                if ch == '"' and not in_multi_line_comment:
-                    cleaned_line += ch
-                    in_string = not in_string
-                    i += 1
-                    continue
-
-                # --- Regular character ---
-                if not in_multi_line_comment:
-                    cleaned_line += ch
-                i += 1
-
-            cleaned_line = cleaned_line.strip()
-            if cleaned_line:
-                cleaned_parts.append(cleaned_line)
-
-        return " ".join(cleaned_parts)
+        Args:
+            source (str | bytes): the complete Jack source code, as a string
+                or as any bytes-like object.
 
-    def get_words_from_code_script_filtered(self, input_lines):
+        Returns:
+            The codes of the tokens, and their start and end offsets in the
+            source, as three arrays.
         """
-        Processes an array of strings (code lines) and returns a list of "words" in it.
-        It first cleans the code by removing comments and empty lines, then tokenizes it.
+        if isinstance(source, str):
+            pattern, token_code = _TOKEN_PATTERN, _token_code
+        else:
+            pattern, token_code = _BYTES_TOKEN_PATTERN, _bytes_token_code
+        offset_type = 'I' if len(source) < 1 << 32 else 'Q'
+        codes = array.array('B')
+        starts = array.array(offset_type)
+        ends = array.array(offset_type)
+        for match in pattern.finditer(source):
+            group = match.lastindex
+            if group is not None:
+                codes.append(token_code(group, match.group(group)))
+                starts.append(match.start())
+                ends.append(match.end())
+        return codes, starts, ends
+
+    def tokenize_stream(self, input_stream: typing.TextIO, chunk_size: int) \
+            -> typing.Iterator[typing.Tuple[int, str]]:
+        """Like tokenize(), but reads the input chunk by chunk.
+
+        Apart from multi-line comments, no token or comment spans a line
+        break, so every chunk is scanned up to its last line break and the
+        rest is carried over to the next one. A multi-line comment that is
+        still open at that point is skipped with str.find() while reading on,
+        keeping only its last character in case it is the '*' of '*/'.
+        Memory use is bounded by chunk_size plus the longest line.
 
         Args:
-            input_lines: An array (list) of strings, where each string is a line of code.
+            input_stream (typing.TextIO): input stream.
+            chunk_size (int): number of characters to read at a time.
+
+        Yields:
+            The code and lexeme of every token.
+        """
+        buffer = ""
+        in_comment = False
+        at_eof = False
+        while not at_eof:
+            chunk = input_stream.read(chunk_size)
+            at_eof = not chunk
+            buffer += chunk
+            if in_comment:
+                end = buffer.find('*/')
+                if end < 0:
+                    buffer = buffer[-1:]
+                    continue
+                buffer = buffer[end + 2:]
+                in_comment = False
+            limit = len(buffer) if at_eof else buffer.rfind('\n') + 1
+            scanned = limit
+            for match in _TOKEN_PATTERN.finditer(buffer, 0, limit):
+                group = match.lastindex
+                if group is not None:
+                    token = match.group(group)
+                    yield _token_code(group, token), token
+                elif not at_eof and match.end() == limit:
+                    # A multi-line comment cut off by the end of the chunk.
+                    text = match.group()
+                    if text.startswith('/*') and \
+                            (len(text) < 4 or not text.endswith('*/')):
+                        in_comment = True
+                        scanned = match.start() + 2
+            buffer = buffer[scanned:]
 
-        Returns:
-            A list of strings, where each string is a word or symbol from the script.
-        """
-        # Step 1: Get a single string of code with comments and empty lines removed.
-        cleaned_code = self.get_cleaned_code_string(input_lines) # Renamed method call
-
-        # Step 2: Define a comprehensive regex pattern for tokenization.
-        # The order of patterns is crucial: more specific/longer matches should come first.
-        #
-        # 1. Double-quoted strings:
-        #    \"(?:[^\"\\]|\\.)*\"
-        # 2. Numbers (positive, will be combined with standalone '-' for negative semantics):
-        #    \d+(?:\.\d+)?
-        # 3. Alphanumeric words (includes underscores):
-        #    \w+
-        # 4. Standalone dash:
-        #    -
-        # 5. Any other single non-whitespace character:
-        #    \S
-        item_pattern = re.compile(
-            r'\"(?:[^\"\\]|\\.)*\"'  # 1. Double-quoted strings (must be first)
-            r'|'                     # OR
-            r'\d+(?:\.\d+)?'         # 2. Numbers (e.g., '2', '3.14')
-            r'|'                     # OR
-            r'\w+'                   # 3. Alphanumeric words
-            r'|'                     # OR
-            r'-'                     # 4. Standalone dash (e.g., for '5 - 3' or from '-2')
-            r'|'                     # OR
-            r'\S'                    # 5. Any other single non-whitespace character (e.g., '+', '=', ';')
-        )
-
-        # Step 3: Find all matches in the cleaned code string.
-        words_and_symbols = item_pattern.findall(cleaned_code)
-
-        return words_and_symbols
-    
     def has_more_tokens(self) -> bool:
         """Do we have more tokens in the input?
 
         Returns:
             bool: True if there are more tokens, False otherwise.
         """
-        return self._current_token_index < len(self.token_list)
+        return self._has_token
 
     def advance(self) -> None:
         """Gets the next token from the input and makes it the current token. 
         This method should be called if has_more_tokens() is true. 
         Initially there is no current token.
+
+        After the last token, the current token is the end of the input: its
+        code is UNKNOWN_CODE, which no grammar rule accepts, its lexeme is
+        empty, and its index is token_count.
         """
+        if not self._has_token:
+            return
+        if self._lazy:
+            try:
+                self._current_code, self._current_lexeme = next(self._tokens)
+            except StopIteration:
+                self._end_input()
+                return
+        elif self._current_token_index + 1 < self.token_count:
+            self._current_code = self._codes[self._current_token_index + 1]
+        else:
+            self._end_input()
+            return
+        self._current_token_index += 1
+
+    def _end_input(self) -> None:
+        self._has_token = False
         self._current_token_index += 1
-        if self.has_more_tokens():
-            self._current_token = self.token_list[self._current_token_index]
+        self._current_code = UNKNOWN_CODE
+        self._current_lexeme = ""
+
+    def token_code(self) -> int:
+        """
+        Returns:
+            int: the code of the current token, see TOKEN_CODES.
+        """
+        return self._current_code
+
+    def token_index(self) -> int:
+        """
+        Returns:
+            int: the index of the current token, for the index based methods.
+        """
+        return self._current_token_index
+
+    def lexeme(self) -> str:
+        """
+        Returns:
+            str: the current token as it appears in the source.
+        """
+        if self._lazy or not self._has_token or \
+                self._current_token_index < 0:
+            return self._current_lexeme
+        return self.lexeme_at(self._current_token_index)
 
     def token_type(self) -> str:
         """
@@ -243,25 +548,7 @@ class JackTokenizer:
             str: the type of the current token, can be
             "KEYWORD", "SYMBOL", "IDENTIFIER", "INT_CONST", "STRING_CONST"
         """
-        keyword_list = ["CLASS", "METHOD", "FUNCTION", "CONSTRUCTOR", "INT", 
-            "BOOLEAN", "CHAR", "VOID", "VAR", "STATIC", "FIELD", "LET", "DO", 
-            "IF", "ELSE", "WHILE", "RETURN", "TRUE", "FALSE", "NULL", "THIS"]
-        if self._current_token.upper() in keyword_list:
-            return KEYWORD
-        
-        symbol_list = ['{', '}', '(', ')', '[', ']', '.', ',', ';', '+', '-', '*', '/', '&', '|', '<', '>', '=', '~', '^', '#']
-        if self._current_token in symbol_list:
-            return SYMBOL
-        
-        if self.is_valid_identifier(self._current_token):
-            return IDENTIFIER
-        
-        if self.is_valid_integer(self._current_token):
-            return INT_CONST
-        
-        if self._current_token.startswith('\"') and self._current_token.endswith('\"'):
-            return STRING_CONST
-        return ""
+        return CODE_TYPES[self._current_code]
         
     def token_type_translated(self) -> str:
         """returns the token type at the same format of the xml file.
@@ -270,14 +557,7 @@ class JackTokenizer:
         Returns:
             str: The token type as it appears on the xml file.
         """
-        translation_dict = {
-            KEYWORD: "keyword",
-            SYMBOL: "symbol",
-            IDENTIFIER: "identifier",
-            INT_CONST: "integerConstant",
-            STRING_CONST: "stringConstant"
-        }
-        return translation_dict[self.token_type()]
+        return CODE_TAGS[self._current_code]
     
     def current_token_val(self) -> str | int:
         """Returns the token after its type had been determined,
@@ -287,18 +567,224 @@ class JackTokenizer:
         Returns:
             str: The current token.
         """
-        cur_type = self.token_type()
-        if cur_type == KEYWORD:
-            return self.keyword()
-        if cur_type == SYMBOL:
-            return self.symbol()
-        if cur_type == INT_CONST:
-            return self.int_val()
-        if cur_type == STRING_CONST:
-            return self.string_val()
-        if cur_type == IDENTIFIER:
-            return self.identifier()
-        return ""
+        if self._lazy or not self._has_token or \
+                self._current_token_index < 0:
+            return token_value(self._current_code, self._current_lexeme)
+        return self.value_at(self._current_token_index)
+
+    def code_at(self, index: int) -> int:
+        """
+        Args:
+            index (int): index of a token, not available in lazy mode.
+
+        Returns:
+            int: the code of that token.
+        """
+        return self._codes[index]
+
+    def lexeme_at(self, index: int) -> str:
+        """
+        Args:
+            index (int): index of a token, not available in lazy mode.
+
+        Returns:
+            str: that token as it appears in the source.
+        """
+        if index < self._gap:
+            lexeme = self._source[self._starts[index]:self._ends[index]]
+        else:
+            lexeme = self._source[self._starts[index] + self._gap_shift:
+                                  self._ends[index] + self._gap_shift]
+        if self._binary:
+            return lexeme.decode()
+        return lexeme
+
+    def value_at(self, index: int) -> typing.Union[str, int]:
+        """
+        Args:
+            index (int): index of a token, not available in lazy mode.
+
+        Returns:
+            str | int: the value of that token, like current_token_val().
+        """
+        code = self._codes[index]
+        if _CODE_VALUES[code] is not None:
+            return _CODE_VALUES[code]
+        if code == INT_CONST_CODE:
+            return int(self.lexeme_at(index))
+        return token_value(code, self.lexeme_at(index))
+
+    def position_at(self, index: int) -> typing.Tuple[int, int]:
+        """
+        Args:
+            index (int): index of a token, or token_count for the end of
+                the input, not available in lazy mode.
+
+        Returns:
+            typing.Tuple[int, int]: the line and column the token starts at,
+            both counted from 1. Columns count bytes if the input is bytes.
+        """
+        start = self._start_at(index) if index < self.token_count \
+            else len(self._source)
+        before = self._source[:start]
+        newline = b'\n' if self._binary else '\n'
+        return before.count(newline) + 1, start - before.rfind(newline)
+
+    def token_at(self, index: int) -> Token:
+        """
+        Args:
+            index (int): index of a token, not available in lazy mode.
+
+        Returns:
+            Token: a view of that token.
+        """
+        return Token(self, index)
+
+    def seek(self, index: int) -> None:
+        """Makes a token the current token, e.g. to parse the source again
+        from there. Not available in lazy mode.
+
+        Args:
+            index (int): index of the token, or token_count for the end of
+                the input.
+        """
+        if index == self.token_count:
+            self._current_token_index = index - 1
+            self._has_token = True
+            self._end_input()
+            return
+        self._current_token_index = index
+        self._current_code = self._codes[index]
+        self._has_token = True
+
+    def columns(self) -> typing.Tuple[array.array, array.array, array.array]:
+        """The tokens as they are stored, e.g. to hand them to another
+        JackTokenizer over the same input. Not available in lazy mode, nor
+        after edit().
+
+        Returns:
+            The codes of the tokens, and their start and end offsets in the
+            source, as tokenize() returns them.
+        """
+        return self._codes, self._starts, self._ends
+
+    def _start_at(self, index: int) -> int:
+        if index < self._gap:
+            return self._starts[index]
+        return self._starts[index] + self._gap_shift
+
+    def _end_at(self, index: int) -> int:
+        if index < self._gap:
+            return self._ends[index]
+        return self._ends[index] + self._gap_shift
+
+    def edit(self, start: int, end: int, text: str) \
+            -> typing.Tuple[int, int, int]:
+        """Replaces part of the source, scanning again only the tokens that
+        the edit can change.
+
+        No token spans a line break, and tokens are never inside a comment
+        or a string, so scanning starts at the end of the last token before
+        the line the edit starts on: the only matches that could start
+        earlier and run into the edit are whitespace and comments, which are
+        scanned again too. Once past the edit, scanning stops at the first
+        token that starts where an old token started, moved by the edit,
+        since everything from there on is the same text, scanned from the
+        same state. Closing or opening a multi-line comment scans as far as
+        its other end.
+
+        The tokens after the edit are not moved one by one. Their offsets
+        are left behind by the edit's change in length, which is added back
+        when they are read. Only the tokens between this edit and the
+        one before are moved, so a run of edits in one place costs the same
+        however long the source is, apart from copying the source itself.
+        The current token becomes the first one.
+
+        Args:
+            start (int): offset of the first character to replace.
+            end (int): offset after the last character to replace.
+            text (str): the text to put instead.
+
+        Returns:
+            typing.Tuple[int, int, int]: first, old_stop and new_stop, such
+            that the old tokens [first, old_stop) were replaced by the new
+            tokens [first, new_stop). Later tokens moved by
+            new_stop - old_stop.
+
+        Raises:
+            ValueError: the source was read lazily or as bytes, or the range
+                is not within it.
+        """
+        if self._lazy or self._binary:
+            raise ValueError("only a source read whole, as text, can be "
+                             "edited")
+        if not 0 <= start <= end <= len(self._source):
+            raise ValueError(f"cannot replace [{start}, {end}) of a source "
+                             f"of length {len(self._source)}")
+        if self._starts.typecode != 'q':
+            # The offsets left behind by an edit may be negative.
+            self._starts = array.array('q', self._starts)
+            self._ends = array.array('q', self._ends)
+        codes, starts, ends = self._codes, self._starts, self._ends
+        gap, gap_shift = self._gap, self._gap_shift
+        source = self._source[:start] + text + self._source[end:]
+        shift = len(text) - (end - start)
+        line_start = self._source.rfind('\n', 0, start) + 1
+        indices = range(self.token_count)
+        first = bisect.bisect_left(indices, line_start, key=self._end_at)
+        # The first old token that starts after the edit, the earliest one
+        # that the scan can meet again.
+        resync = bisect.bisect_left(indices, end, key=self._start_at)
+        edit_end = start + len(text)
+        old_stop = self.token_count
+        new_codes = array.array('B')
+        new_starts = array.array('q')
+        new_ends = array.array('q')
+        for match in _TOKEN_PATTERN.finditer(
+                source, self._end_at(first - 1) if first else 0):
+            group = match.lastindex
+            if group is None:
+                continue
+            match_start = match.start()
+            if match_start >= edit_end:
+                while resync < old_stop and \
+                        self._start_at(resync) + shift < match_start:
+                    resync += 1
+                if resync < old_stop and \
+                        self._start_at(resync) + shift == match_start:
+                    old_stop = resync
+                    break
+            new_codes.append(_token_code(group, match.group(group)))
+            new_starts.append(match_start)
+            new_ends.append(match.end())
+        if gap_shift:
+            # Moves the offsets of the old tokens kept, so that from old_stop
+            # on they are all left behind by gap_shift, and before first by
+            # nothing.
+            for index in range(gap, first):
+                starts[index] += gap_shift
+                ends[index] += gap_shift
+            for index in range(old_stop, min(gap, len(starts))):
+                starts[index] -= gap_shift
+                ends[index] -= gap_shift
+        codes[first:old_stop] = new_codes
+        starts[first:old_stop] = new_starts
+        ends[first:old_stop] = new_ends
+        new_stop = first + len(new_codes)
+        self._source = source
+        self.token_count = len(codes)
+        self._gap = new_stop
+        self._gap_shift = gap_shift + shift
+        self.seek(0)
+        return first, old_stop, new_stop
+
+    def close(self) -> None:
+        """Releases the memory-mapped input, if there is one. The index based
+        methods must not be used afterwards.
+        """
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
 
     
     def keyword(self) -> str:
@@ -310,7 +796,7 @@ class JackTokenizer:
             "BOOLEAN", "CHAR", "VOID", "VAR", "STATIC", "FIELD", "LET", "DO", 
             "IF", "ELSE", "WHILE", "RETURN", "TRUE", "FALSE", "NULL", "THIS"
         """
-        return self._current_token.lower()
+        return self.current_token_val()
 
     def symbol(self) -> str:
         """
@@ -321,13 +807,7 @@ class JackTokenizer:
             symbol: '{' | '}' | '(' | ')' | '[' | ']' | '.' | ',' | ';' | '+' | 
               '-' | '*' | '/' | '&' | '|' | '<' | '>' | '=' | '~' | '^' | '#'
         """
-        if self._current_token == '<': 
-            pass
-            return '&lt'
-        if self._current_token == '>': return '&gt'
-        if self._current_token == '&': 
-                return '&amp'
-        return self._current_token
+        return self.current_token_val()
 
     def identifier(self) -> str:
         """
@@ -339,7 +819,7 @@ class JackTokenizer:
                   starting with a digit. You can assume keywords cannot be
                   identifiers, so 'self' cannot be an identifier, etc'.
         """
-        return self._current_token
+        return self.current_token_val()
     
     def is_valid_identifier(self, s: str) -> bool:
         """
@@ -361,14 +841,7 @@ class JackTokenizer:
         if not s:
             return False
 
-        # Regex breakdown:
-        # ^       : Start of the string
-        # [a-zA-Z_] : The first character must be a letter (a-z, A-Z) or an underscore.
-        # \w* : The rest of the string can be zero or more word characters (letters, digits, or underscores).
-        # $       : End of the string
-        pattern = re.compile(r'^[a-zA-Z_]\w*$')
-
-        return bool(pattern.match(s))
+        return bool(_IDENTIFIER_PATTERN.match(s))
 
     def int_val(self) -> int:
         """
@@ -378,7 +851,7 @@ class JackTokenizer:
             Recall that integerConstant was defined in the grammar like so:
             integerConstant: A decimal number in the range 0-32767.
         """
-        return int(self._current_token)
+        return self.current_token_val()
     
     def is_valid_integer(self, s: str) -> bool:
         """
@@ -394,15 +867,8 @@ class JackTokenizer:
         if not isinstance(s, str):
             return False
 
-        # 2. Attempt to convert the string to an integer
-        try:
-            num = int(s)
-        except ValueError:
-            # If conversion fails (e.g., "abc", "1.5", "-"), it's not a valid integer string
-            return False
-
-        # 3. Check if the integer falls within the specified range [0, 32767]
-        return 0 <= num <= 32767
+        # 2. Check that it converts to an integer in the range [0, 32767]
+        return _is_valid_integer(s)
 
     def string_val(self) -> str:
         """
@@ -413,4 +879,4 @@ class JackTokenizer:
             StringConstant: '"' A sequence of Unicode characters not including 
                       double quote or newline '"'
         """
-        return self._current_token[1:-1]
\ No newline at end of file
+        return self.current_token_val()
\ No newline at end of file
@@ -0,0 +1,339 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Parses the members of a single, very large class over several processes.
+
+Once its tokens are known, every member of a class, a classVarDec or a
+subroutineDec, can be parsed on its own: a classVarDec ends at the first
+';', and a subroutineDec at the '}' that matches the first '{' after it.
+The class is split there, the members are handed out to worker processes in
+chunks of about the same number of tokens, and every worker writes its
+members in the output format, as they would appear inside the class. The
+pieces are then put between the class header and its '}', in order.
+
+The tokens are not sent to the workers. They are copied once into a shared
+memory block, which the workers map and read in place. For the lexemes, the
+workers open the .jack file itself, the same way the tokens were made of it.
+"""
+import array
+import contextlib
+import io
+import os
+import re
+import typing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from JackTokenizer import (JackTokenizer, TOKEN_CODES, IDENTIFIER_CODE,
+                           KEYWORD, SYMBOL, IDENTIFIER)
+from CompilationEngine import CompilationError, CompilationErrors
+from Emitters import EMITTERS
+from JackAnalyzer import ENGINES, Analysis, output_path_for, write_analysis
+if typing.TYPE_CHECKING:
+    from BuildCache import BuildCache
+
+_CLASS_VAR_DEC_CODES = frozenset(TOKEN_CODES[k] for k in ("static", "field"))
+_SUBROUTINE_DEC_CODES = frozenset(
+    TOKEN_CODES[k] for k in ("constructor", "function", "method"))
+_CLASS, _LEFT_BRACE, _RIGHT_BRACE, _SEMICOLON = (
+    TOKEN_CODES[s] for s in ("class", "{", "}", ";"))
+_BRACES = re.compile(b"[" + re.escape(bytes((_LEFT_BRACE,))) +
+                     re.escape(bytes((_RIGHT_BRACE,))) + b"]")
+# The tokens before the first member: 'class' className '{'.
+_CLASS_HEADER_SIZE = 3
+
+# How many chunks of members every worker gets, so that one with slow
+# members does not hold up the rest.
+CHUNKS_PER_JOB = 4
+# Classes with fewer members are parsed in this process.
+MIN_MEMBERS = 2
+
+Members = typing.List[typing.Tuple[int, int]]
+
+
+def split_members(codes: typing.Sequence[int]) \
+        -> typing.Optional[typing.Tuple[Members, int]]:
+    """Finds the members of a class by its token codes alone.
+
+    Args:
+        codes (typing.Sequence[int]): the codes of the class's tokens, as
+            JackTokenizer.columns() returns them.
+
+    Returns:
+        The [first, stop) token indices of every member, in order, and the
+        index of the class's '}'. None if the tokens are not shaped like a
+        class, in which case parsing them will raise a CompilationError.
+    """
+    data = bytes(codes)
+    if len(data) <= _CLASS_HEADER_SIZE or data[0] != _CLASS or \
+            data[1] != IDENTIFIER_CODE or data[2] != _LEFT_BRACE:
+        return None
+    members = []
+    index = _CLASS_HEADER_SIZE
+    in_subroutines = False
+    while index < len(data):
+        code = data[index]
+        if code in _CLASS_VAR_DEC_CODES and not in_subroutines:
+            stop = data.find(_SEMICOLON, index) + 1
+            if not stop:
+                return None
+        elif code in _SUBROUTINE_DEC_CODES:
+            in_subroutines = True
+            body = data.find(_LEFT_BRACE, index)
+            if body < 0:
+                return None
+            depth = 0
+            for match in _BRACES.finditer(data, body):
+                depth += 1 if data[match.start()] == _LEFT_BRACE else -1
+                if not depth:
+                    stop = match.end()
+                    break
+            else:
+                return None
+        else:
+            break
+        members.append((index, stop))
+        index = stop
+    if index >= len(data) or data[index] != _RIGHT_BRACE:
+        return None
+    return members, index
+
+
+def _chunks(members: Members, count: int) -> typing.List[Members]:
+    # Splits the members into about count runs of about as many tokens.
+    size = max(1, (members[-1][1] - members[0][0]) // count)
+    chunks = [[]]
+    tokens = 0
+    for member in members:
+        if tokens >= size:
+            chunks.append([])
+            tokens = 0
+        chunks[-1].append(member)
+        tokens += member[1] - member[0]
+    return chunks
+
+
+def _layout(count: int, itemsize: int) -> typing.Tuple[int, int, int]:
+    # Where the starts and the ends begin in the shared block, after the
+    # codes and aligned for their type, and the size of the block.
+    starts_at = -(-count // itemsize) * itemsize
+    ends_at = starts_at + count * itemsize
+    return starts_at, ends_at, ends_at + count * itemsize
+
+
+@contextlib.contextmanager
+def _shared_columns(name: str, count: int, offset_type: str) \
+        -> typing.Iterator[typing.Tuple[memoryview, memoryview, memoryview]]:
+    # Maps the token columns another process put in a shared block. The
+    # views must be released before the block can be closed.
+    block = shared_memory.SharedMemory(name)
+    views = []
+    try:
+        starts_at, ends_at, size = _layout(
+            count, array.array(offset_type).itemsize)
+        for begin, end, typecode in ((0, count, 'B'),
+                                     (starts_at, ends_at, offset_type),
+                                     (ends_at, size, offset_type)):
+            views.append(block.buf[begin:end])
+            views.append(views[-1].cast(typecode))
+        yield views[1], views[3], views[5]
+    finally:
+        for view in reversed(views):
+            view.release()
+        block.close()
+
+
+def _parse_members(input_path: str, block_name: str, count: int,
+                   offset_type: str, members: Members, output_format: str,
+                   parser: str, use_mmap: bool) \
+        -> typing.Optional[typing.Union[str, bytes]]:
+    # What a worker process runs: writes some members of the class, as they
+    # appear inside it. Returns None if one of them does not parse, or does
+    # not end where split_members() said, and the class must be parsed as a
+    # whole to tell why.
+    output_file = io.BytesIO() if output_format == "binary" else io.StringIO()
+    emitter = EMITTERS[output_format](output_file, parents=("class",))
+    with _shared_columns(block_name, count, offset_type) as columns, \
+            open(input_path, 'rb' if use_mmap else 'r') as input_file:
+        tokenizer = JackTokenizer(input_file, use_mmap=use_mmap,
+                                  tokens=columns)
+        try:
+            engine = ENGINES[parser](tokenizer, output_file, emitter)
+            for first, stop in members:
+                tokenizer.seek(first)
+                if tokenizer.token_code() in _CLASS_VAR_DEC_CODES:
+                    engine.compile_class_var_dec()
+                else:
+                    engine.compile_subroutine()
+                if tokenizer.token_index() != stop:
+                    return None
+        except (CompilationError, RecursionError):
+            return None
+        finally:
+            tokenizer.close()
+    emitter.flush()
+    return output_file.getvalue()
+
+
+def _parse_in_workers(input_path: str, tokenizer: JackTokenizer,
+                      members: Members, output_format: str, parser: str,
+                      use_mmap: bool, pool: Executor, jobs: int) \
+        -> typing.Optional[typing.List[typing.Union[str, bytes]]]:
+    codes, starts, ends = tokenizer.columns()
+    count = len(codes)
+    starts_at, ends_at, size = _layout(count, starts.itemsize)
+    block = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        block.buf[:count] = codes
+        block.buf[starts_at:ends_at] = memoryview(starts).cast('B')
+        block.buf[ends_at:size] = memoryview(ends).cast('B')
+        futures = [
+            pool.submit(_parse_members, input_path, block.name, count,
+                        starts.typecode, chunk, output_format, parser,
+                        use_mmap)
+            for chunk in _chunks(members, jobs * CHUNKS_PER_JOB)]
+        parts = [future.result() for future in futures]
+    finally:
+        block.close()
+        block.unlink()
+    return None if None in parts else parts
+
+
+def analyze_file_split(input_path: str, output_file: typing.IO,
+                       output_format: str = "xml", parser: str = "recursive",
+                       recover: bool = False,
+                       jobs: int = os.cpu_count() or 1,
+                       pool: typing.Optional[Executor] = None,
+                       use_mmap: bool = False) -> None:
+    """Analyzes a single file, parsing the members of its class in parallel.
+    The output is the same as analyze_file's.
+
+    The file is tokenized here, read as analyze_file reads it, and the
+    members are parsed by worker processes. A class that cannot be split, or with a
+    member that does not parse, is parsed again here as a whole, so its
+    syntax errors are reported, and recovered from, as analyze_file does.
+
+    Args:
+        input_path (str): path of the .jack file.
+        output_file (typing.IO): writes all output to this file. Must be
+            opened in binary mode for the "binary" format.
+        output_format (str, optional): one of Emitters.EMITTERS. Defaults to
+            "xml".
+        parser (str, optional): one of JackAnalyzer.ENGINES, which the
+            workers also parse the members with. Defaults to "recursive".
+        recover (bool, optional): see JackAnalyzer.analyze_file. Defaults to
+            False.
+        jobs (int, optional): number of worker processes. With 1, the file
+            is parsed in this process. Defaults to the number of cores.
+        pool (Executor, optional): a process pool of jobs workers to use,
+            e.g. for many files. Defaults to None, a pool for this file.
+        use_mmap (bool, optional): memory-map the file, here and in the
+            workers, rather than read it, see JackTokenizer. Defaults to
+            False.
+
+    Raises:
+        CompilationError: see JackAnalyzer.analyze_file.
+    """
+    with open(input_path, 'rb' if use_mmap else 'r') as input_file:
+        tokenizer = JackTokenizer(input_file, use_mmap=use_mmap)
+    try:
+        split = split_members(tokenizer.columns()[0]) if jobs > 1 else None
+        parts = None
+        if split is not None and len(split[0]) >= MIN_MEMBERS:
+            with contextlib.ExitStack() as stack:
+                if pool is None:
+                    pool = stack.enter_context(ProcessPoolExecutor(jobs))
+                parts = _parse_in_workers(input_path, tokenizer, split[0],
+                                          output_format, parser, use_mmap,
+                                          pool, jobs)
+        emitter = EMITTERS[output_format](output_file)
+        if parts is None:
+            engine = ENGINES[parser](tokenizer, output_file, emitter,
+                                     recover=recover)
+            try:
+                engine.run()
+            except CompilationError:
+                emitter.flush()
+                raise
+            if engine.errors:
+                raise CompilationErrors(engine.errors)
+            return
+        # The header and the '}' were checked by split_members().
+        engine = ENGINES[parser](tokenizer, output_file, emitter)
+        emitter.open_node("class")
+        engine.add_token_to_xml(KEYWORD, "class")
+        engine.add_token_to_xml(IDENTIFIER)
+        engine.add_token_to_xml(SYMBOL, "{")
+        emitter.flush()
+        for part in parts:
+            output_file.write(part)
+        tokenizer.seek(split[1])
+        engine.add_token_to_xml(SYMBOL, "}")
+        emitter.close_node()
+        emitter.flush()
+    finally:
+        tokenizer.close()
+
+
+def analyze_paths_split(
+        input_paths: typing.List[str], output_format: str = "xml",
+        parser: str = "recursive", recover: bool = False,
+        jobs: int = os.cpu_count() or 1,
+        cache: typing.Optional['BuildCache'] = None,
+        use_mmap: bool = False) \
+        -> typing.List[typing.Tuple[str, Exception]]:
+    """Analyzes .jack files one after the other, writing each output next to
+    its input, with the members of every class parsed in parallel by a
+    single pool of jobs worker processes. For a few very large classes,
+    where JackAnalyzer.analyze_paths would leave most workers idle.
+
+    Args:
+        input_paths (typing.List[str]): paths of the .jack files.
+        output_format (str, optional): one of Emitters.EMITTERS. Defaults to
+            "xml".
+        parser (str, optional): one of JackAnalyzer.ENGINES. Defaults to
+            "recursive".
+        recover (bool, optional): see JackAnalyzer.analyze_file. Defaults to
+            False.
+        jobs (int, optional): number of worker processes. Defaults to the
+            number of cores.
+        cache (BuildCache, optional): see JackAnalyzer.analyze_paths.
+            Defaults to None.
+        use_mmap (bool, optional): see analyze_file_split. Defaults to
+            False.
+
+    Returns:
+        typing.List[typing.Tuple[str, Exception]]: the path and error of
+        every file that failed, in the order of input_paths. Their outputs
+        are written as JackAnalyzer.write_analysis says.
+    """
+    errors = []
+    with ProcessPoolExecutor(jobs) if jobs > 1 \
+            else contextlib.nullcontext() as pool:
+        for input_path in input_paths:
+            output_path = output_path_for(input_path, output_format)
+            if cache is not None and \
+                    cache.is_fresh(input_path, output_path, output_format):
+                continue
+            output_file = io.BytesIO() if output_format == "binary" \
+                else io.StringIO()
+            error = None
+            try:
+                analyze_file_split(input_path, output_file, output_format,
+                                   parser, recover, jobs, pool, use_mmap)
+            except Exception as raised:
+                error = raised
+            try:
+                write_analysis(
+                    Analysis(input_path, output_file.getvalue(), error),
+                    output_format, cache)
+            except Exception as raised:
+                error = raised
+                if cache is not None:
+                    cache.forget(input_path)
+            if error is not None:
+                errors.append((input_path, error))
+    return errors
@@ -0,0 +1,129 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import io
+import typing
+from JackTokenizer import JackTokenizer, CODE_TAGS
+from CompilationEngine import Compilationengine
+from Emitters import Emitter, XmlEmitter, NODE_TAGS
+
+# The kind of each non-terminal, its index in NODE_TAGS.
+NODE_KINDS = {tag: kind for kind, tag in enumerate(NODE_TAGS)}
+
+
+class Node:
+    """A non-terminal of the parse tree.
+
+    Its children are Nodes and, for terminals, plain ints: the index of the
+    token in the tokenizer the tree was parsed from. Reading a terminal's
+    tag or value therefore needs that tokenizer.
+    """
+    __slots__ = ("kind", "children")
+
+    def __init__(self, kind: int) -> None:
+        """
+        Args:
+            kind (int): the non-terminal's kind, see NODE_KINDS.
+        """
+        self.kind = kind
+        self.children: typing.List[typing.Union['Node', int]] = []
+
+    @property
+    def tag(self) -> str:
+        return NODE_TAGS[self.kind]
+
+    def __repr__(self) -> str:
+        return f"Node({self.tag}, {len(self.children)} children)"
+
+
+class TreeBuilder(Emitter):
+    """An emitter that builds the parse tree out of Nodes instead of writing
+    anything. The tokenizer must not be lazy, since terminals refer to it.
+    """
+
+    def __init__(self, tokenizer: JackTokenizer) -> None:
+        """
+        Args:
+            tokenizer (JackTokenizer): the tokenizer the engine reads from.
+        """
+        super().__init__(None)
+        self.tokenizer = tokenizer
+        self.root: typing.Optional[Node] = None
+        self._open_nodes: typing.List[Node] = []
+
+    def open_node(self, tag: str) -> None:
+        node = Node(NODE_KINDS[tag])
+        if self._open_nodes:
+            self._open_nodes[-1].children.append(node)
+        else:
+            self.root = node
+        self._open_nodes.append(node)
+
+    def close_node(self) -> None:
+        self._open_nodes.pop()
+
+    def terminal(self, tag: str, value: typing.Union[str, int]) -> None:
+        self._open_nodes[-1].children.append(self.tokenizer.token_index())
+
+    def flush(self) -> None:
+        pass
+
+
+def parse(tokenizer: JackTokenizer) -> Node:
+    """Parses a class into a tree of Nodes.
+
+    Args:
+        tokenizer (JackTokenizer): a tokenizer over the class, not lazy.
+
+    Returns:
+        Node: the class node.
+    """
+    builder = TreeBuilder(tokenizer)
+    Compilationengine(tokenizer, None, builder).run()
+    return builder.root
+
+
+def emit_tree(root: Node, tokenizer: JackTokenizer,
+              emitter: Emitter) -> None:
+    """Sends a tree to an emitter, as if it was being parsed again. The tree
+    is walked with an explicit stack, so its depth is not limited by Python's
+    recursion limit.
+
+    Args:
+        root (Node): the tree.
+        tokenizer (JackTokenizer): the tokenizer the tree was parsed from.
+        emitter (Emitter): receives the tree.
+    """
+    emitter.open_node(root.tag)
+    stack = [iter(root.children)]
+    while stack:
+        for child in stack[-1]:
+            if type(child) is int:
+                emitter.terminal(CODE_TAGS[tokenizer.code_at(child)],
+                                 tokenizer.value_at(child))
+            else:
+                emitter.open_node(child.tag)
+                stack.append(iter(child.children))
+                break
+        else:
+            stack.pop()
+            emitter.close_node()
+    emitter.flush()
+
+
+def to_xml(root: Node, tokenizer: JackTokenizer) -> str:
+    """
+    Args:
+        root (Node): the tree.
+        tokenizer (JackTokenizer): the tokenizer the tree was parsed from.
+
+    Returns:
+        str: the tree as xml, exactly as Compilationengine writes it.
+    """
+    output = io.StringIO()
+    emit_tree(root, tokenizer, XmlEmitter(output))
+    return output.getvalue()
@@ -0,0 +1,151 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import asyncio
+import io
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from CompilationEngine import CompilationError
+from JackAnalyzer import (Analysis, analyze_file, output_path_for,
+                          write_analysis)
+if typing.TYPE_CHECKING:
+    from BuildCache import BuildCache
+
+# How many files may be read ahead of the one being parsed, and how many
+# outputs may wait to be written, before the stage in front has to wait.
+DEFAULT_PREFETCH = 4
+
+
+async def pipeline(
+        input_paths: typing.List[str], output_format: str = "xml",
+        parser: str = "recursive", recover: bool = False,
+        cache: typing.Optional['BuildCache'] = None,
+        token_cache_dir: typing.Optional[str] = None,
+        prefetch: int = DEFAULT_PREFETCH) \
+        -> typing.List[typing.Tuple[str, Exception]]:
+    """Analyzes .jack files in three overlapping stages, writing each output
+    next to its input: reading, parsing and writing.
+
+    Up to prefetch files are read at once, by a pool of threads, while
+    another thread parses the oldest file that has been read, and the
+    outputs are written by the I/O threads as the parser moves on. Both
+    queues between the stages hold at most prefetch files, so a slow stage
+    holds back the ones in front of it rather than filling memory. Reading
+    and writing files let go of the GIL, so they overlap with parsing even
+    though everything runs in one process.
+
+    Args:
+        input_paths (typing.List[str]): paths of the .jack files.
+        output_format (str, optional): one of Emitters.EMITTERS. Defaults to
+            "xml".
+        parser (str, optional): one of JackAnalyzer.ENGINES. Defaults to
+            "recursive".
+        recover (bool, optional): see JackAnalyzer.analyze_file. Defaults to
+            False.
+        cache (BuildCache, optional): see JackAnalyzer.analyze_paths.
+            Defaults to None.
+        token_cache_dir (str, optional): directory of a TokenCache to use.
+            Defaults to None.
+        prefetch (int, optional): the size of the queues. Defaults to
+            DEFAULT_PREFETCH.
+
+    Returns:
+        typing.List[typing.Tuple[str, Exception]]: the path and error of
+        every file that failed, in the order of input_paths. Their outputs
+        are written as JackAnalyzer.write_analysis says.
+    """
+    loop = asyncio.get_running_loop()
+    token_cache = None
+    if token_cache_dir:
+        from TokenCache import TokenCache
+        token_cache = TokenCache(token_cache_dir)
+    if cache is not None:
+        input_paths = [
+            input_path for input_path in input_paths
+            if not cache.is_fresh(input_path,
+                                  output_path_for(input_path, output_format),
+                                  output_format)]
+    errors: typing.Dict[str, Exception] = {}
+    # Holds (path, future of its source), then None after the last one.
+    sources: asyncio.Queue = asyncio.Queue(prefetch)
+    # Holds an Analysis for every file, then None after the last one.
+    outputs: asyncio.Queue = asyncio.Queue(prefetch)
+
+    def read(input_path: str) -> str:
+        with open(input_path, 'r') as input_file:
+            return input_file.read()
+
+    def parse(input_path: str, source: str) -> Analysis:
+        output_file = io.BytesIO() if output_format == "binary" \
+            else io.StringIO()
+        error = None
+        try:
+            analyze_file(io.StringIO(source), output_file,
+                         output_format=output_format, token_cache=token_cache,
+                         parser=parser, recover=recover)
+        except CompilationError as raised:
+            error = raised
+        return Analysis(input_path, output_file.getvalue(), error)
+
+    def report_error(input_path: str, error: Exception) -> None:
+        errors[input_path] = error
+        if cache is not None:
+            cache.forget(input_path)
+
+    with ThreadPoolExecutor(prefetch, "jack-io") as io_pool, \
+            ThreadPoolExecutor(1, "jack-parse") as parse_pool:
+
+        async def read_all() -> None:
+            for input_path in input_paths:
+                await sources.put(
+                    (input_path, loop.run_in_executor(io_pool, read,
+                                                      input_path)))
+            await sources.put(None)
+
+        async def parse_all() -> None:
+            while True:
+                item = await sources.get()
+                if item is None:
+                    break
+                input_path, source = item
+                try:
+                    analysis = await loop.run_in_executor(
+                        parse_pool, parse, input_path, await source)
+                except Exception as error:
+                    analysis = Analysis(input_path, "", error)
+                await outputs.put(analysis)
+            await outputs.put(None)
+
+        async def write_all() -> None:
+            # One write at a time, since the cache is not thread-safe.
+            while True:
+                analysis = await outputs.get()
+                if analysis is None:
+                    break
+                try:
+                    await loop.run_in_executor(
+                        io_pool, write_analysis, analysis, output_format,
+                        cache)
+                except Exception as error:
+                    report_error(analysis.name, error)
+                    continue
+                if analysis.error is not None:
+                    errors[analysis.name] = analysis.error
+
+        await asyncio.gather(read_all(), parse_all(), write_all())
+    return [(input_path, errors[input_path]) for input_path in input_paths
+            if input_path in errors]
+
+
+def analyze_paths_pipelined(*args, **kwargs) \
+        -> typing.List[typing.Tuple[str, Exception]]:
+    """Runs pipeline() to completion, with the same arguments.
+
+    Returns:
+        typing.List[typing.Tuple[str, Exception]]: see pipeline().
+    """
+    return asyncio.run(pipeline(*args, **kwargs))
@@ -0,0 +1,390 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from JackTokenizer import (
+    TOKEN_CODES, CODE_TYPES, CODE_TAGS, IDENTIFIER_CODE, INT_CONST_CODE,
+    STRING_CONST_CODE, token_value)
+from CompilationEngine import (
+    Compilationengine, CompilationError, STATEMENT_SYNC_CODES,
+    MEMBER_SYNC_CODES)
+from Emitters import NODE_TAGS
+
+# The grammar of the JackTokenizer docstring, left-factored so that a single
+# token of lookahead always picks the alternative. Quoted symbols are
+# terminals, as are identifier, integerConstant and stringConstant. The
+# non-terminals named in NODE_TAGS become elements of the tree; the others
+# only group symbols. An empty alternative matches nothing.
+#
+# Where Compilationengine is narrower than the docstring, the grammar
+# follows the engine: unaryOp is only '-' and '~'. Where the engine is
+# wider, the grammar does not follow it. For a token that cannot start a
+# term, compile_term() emits an empty term and leaves the token to the next
+# rule, so the engine accepts e.g. "let x = ;", "return 1 + ;" and
+# "do f(,);", which this parser rejects. An empty alternative of term would
+# not be LL(1): '-' could then be a unaryOp or the op after an empty term.
+# Both engines build the same tree for every program this parser accepts,
+# but on the others they differ, also in the errors --recover reports.
+GRAMMAR: typing.Dict[str, typing.List[typing.List[str]]] = {
+    "class": [["'class'", "identifier", "'{'", "classVarDecs",
+               "subroutineDecs", "'}'"]],
+    "classVarDecs": [["classVarDec", "classVarDecs"], []],
+    "classVarDec": [["classVarKind", "type", "identifier", "varNames",
+                     "';'"]],
+    "classVarKind": [["'static'"], ["'field'"]],
+    "type": [["'int'"], ["'char'"], ["'boolean'"], ["identifier"]],
+    "varNames": [["','", "identifier", "varNames"], []],
+    "subroutineDecs": [["subroutineDec", "subroutineDecs"], []],
+    "subroutineDec": [["subroutineKind", "returnType", "identifier", "'('",
+                       "parameterList", "')'", "subroutineBody"]],
+    "subroutineKind": [["'constructor'"], ["'function'"], ["'method'"]],
+    "returnType": [["'void'"], ["type"]],
+    "parameterList": [["type", "identifier", "parameters"], []],
+    "parameters": [["','", "type", "identifier", "parameters"], []],
+    "subroutineBody": [["'{'", "varDecs", "statements", "'}'"]],
+    "varDecs": [["varDec", "varDecs"], []],
+    "varDec": [["'var'", "type", "identifier", "varNames", "';'"]],
+    "statements": [["statementList"]],
+    "statementList": [["statement", "statementList"], []],
+    "statement": [["letStatement"], ["ifStatement"], ["whileStatement"],
+                  ["doStatement"], ["returnStatement"]],
+    "letStatement": [["'let'", "identifier", "index", "'='", "expression",
+                      "';'"]],
+    "index": [["'['", "expression", "']'"], []],
+    "ifStatement": [["'if'", "'('", "expression", "')'", "'{'",
+                     "statements", "'}'", "elseClause"]],
+    "elseClause": [["'else'", "'{'", "statements", "'}'"], []],
+    "whileStatement": [["'while'", "'('", "expression", "')'", "'{'",
+                        "statements", "'}'"]],
+    "doStatement": [["'do'", "identifier", "call", "';'"]],
+    "call": [["'('", "expressionList", "')'"],
+             ["'.'", "identifier", "'('", "expressionList", "')'"]],
+    "returnStatement": [["'return'", "returnValue", "';'"]],
+    "returnValue": [["expression"], []],
+    "expression": [["term", "operations"]],
+    "operations": [["op", "term", "operations"], []],
+    "op": [["'+'"], ["'-'"], ["'*'"], ["'/'"], ["'&'"], ["'|'"], ["'<'"],
+           ["'>'"], ["'='"]],
+    "term": [["integerConstant"], ["stringConstant"], ["keywordConstant"],
+             ["identifier", "variableOrCall"], ["'('", "expression", "')'"],
+             ["unaryOp", "term"]],
+    "variableOrCall": [["'['", "expression", "']'"], ["call"], []],
+    "keywordConstant": [["'true'"], ["'false'"], ["'null'"], ["'this'"]],
+    "unaryOp": [["'-'"], ["'~'"]],
+    "expressionList": [["expression", "expressions"], []],
+    "expressions": [["','", "expression", "expressions"], []],
+}
+START_SYMBOL = "class"
+
+_CLASS_TERMINALS = {"identifier": IDENTIFIER_CODE,
+                    "integerConstant": INT_CONST_CODE,
+                    "stringConstant": STRING_CONST_CODE}
+
+# Everything the parser keeps on its stack is an int. Terminals are token
+# codes, and the numbers after them stand for the non-terminals, then for
+# opening each element of the tree, then for closing the innermost one.
+_FIRST_NONTERMINAL = len(CODE_TYPES)
+_NONTERMINALS = {name: number for number, name in
+                 enumerate(GRAMMAR, start=_FIRST_NONTERMINAL)}
+_FIRST_OPEN = _FIRST_NONTERMINAL + len(GRAMMAR)
+_CLOSE = _FIRST_OPEN + len(NODE_TAGS)
+
+_STATEMENT_LIST = _NONTERMINALS["statementList"]
+# The non-terminals a recovering parser can resume at.
+_RECOVERY_POINTS = frozenset(_NONTERMINALS[name] for name in (
+    "statementList", "classVarDecs", "subroutineDecs"))
+
+
+def _terminal_code(symbol: str) -> typing.Optional[int]:
+    if symbol in _CLASS_TERMINALS:
+        return _CLASS_TERMINALS[symbol]
+    if symbol.startswith("'"):
+        return TOKEN_CODES[symbol[1:-1]]
+    return None
+
+
+def _first_sets() -> typing.Tuple[typing.Dict[str, typing.Set[int]],
+                                  typing.Set[str]]:
+    first = {name: set() for name in GRAMMAR}
+    nullable = set()
+    changed = True
+    while changed:
+        changed = False
+        for name, alternatives in GRAMMAR.items():
+            for alternative in alternatives:
+                codes, alternative_nullable = _first_of(
+                    alternative, first, nullable)
+                if not codes <= first[name]:
+                    first[name] |= codes
+                    changed = True
+                if alternative_nullable and name not in nullable:
+                    nullable.add(name)
+                    changed = True
+    return first, nullable
+
+
+def _first_of(symbols: typing.List[str],
+              first: typing.Dict[str, typing.Set[int]],
+              nullable: typing.Set[str]) -> typing.Tuple[typing.Set[int], bool]:
+    codes = set()
+    for symbol in symbols:
+        code = _terminal_code(symbol)
+        if code is not None:
+            codes.add(code)
+            return codes, False
+        codes |= first[symbol]
+        if symbol not in nullable:
+            return codes, False
+    return codes, True
+
+
+def _follow_sets(first: typing.Dict[str, typing.Set[int]],
+                 nullable: typing.Set[str]) -> typing.Dict[str, typing.Set[int]]:
+    follow = {name: set() for name in GRAMMAR}
+    changed = True
+    while changed:
+        changed = False
+        for name, alternatives in GRAMMAR.items():
+            for alternative in alternatives:
+                for position, symbol in enumerate(alternative):
+                    if symbol not in GRAMMAR:
+                        continue
+                    codes, rest_nullable = _first_of(
+                        alternative[position + 1:], first, nullable)
+                    if rest_nullable:
+                        codes = codes | follow[name]
+                    if not codes <= follow[symbol]:
+                        follow[symbol] |= codes
+                        changed = True
+    return follow
+
+
+def _encode(name: str, alternative: typing.List[str]) -> typing.Tuple[int, ...]:
+    symbols = [_terminal_code(symbol) if symbol not in GRAMMAR
+               else _NONTERMINALS[symbol] for symbol in alternative]
+    if name in NODE_TAGS:
+        symbols = [_FIRST_OPEN + NODE_TAGS.index(name)] + symbols + [_CLOSE]
+    # Reversed, so that the parser can push it onto its stack as is.
+    return tuple(reversed(symbols))
+
+
+def build_parse_table() -> typing.List[typing.Optional[
+        typing.List[typing.Optional[typing.Tuple[int, ...]]]]]:
+    """Builds the LL(1) parse table of GRAMMAR.
+
+    Returns:
+        A list indexed by the stack number of a non-terminal (None at the
+        numbers of terminals). Each entry is a list indexed by token code,
+        holding the alternative to expand into when that token is next,
+        already encoded and reversed, or None if the token cannot start it.
+
+    Raises:
+        ValueError: if GRAMMAR is not LL(1).
+    """
+    first, nullable = _first_sets()
+    follow = _follow_sets(first, nullable)
+    table = [None] * _FIRST_OPEN
+    for name, alternatives in GRAMMAR.items():
+        row = [None] * len(CODE_TYPES)
+        for alternative in alternatives:
+            codes, alternative_nullable = _first_of(
+                alternative, first, nullable)
+            if alternative_nullable:
+                codes = codes | follow[name]
+            for code in codes:
+                if row[code] is not None:
+                    raise ValueError(
+                        f"{name} is not LL(1) on {CODE_TYPES[code]} {code}")
+                row[code] = _encode(name, alternative)
+        table[_NONTERMINALS[name]] = row
+    return table
+
+
+def _predict(table: list, alternative: typing.Tuple[int, ...],
+             code: int) -> typing.Tuple[int, ...]:
+    # Every non-terminal that would be expanded before the next terminal is
+    # matched is expanded on the same token, so do it once, here.
+    pending = list(alternative)
+    predicted = []
+    while pending:
+        symbol = pending.pop()
+        if _FIRST_NONTERMINAL <= symbol < _FIRST_OPEN:
+            expansion = table[symbol][code]
+            if expansion is None:
+                pending.append(symbol)
+                break
+            pending.extend(expansion)
+        else:
+            predicted.append(symbol)
+            if symbol < _FIRST_NONTERMINAL:
+                break
+    return tuple(pending + predicted[::-1])
+
+
+def build_prediction_table() -> list:
+    """Builds the table the parser runs on: the parse table, where every
+    alternative is already expanded up to the terminal that the token
+    choosing it matches.
+
+    Returns:
+        A list shaped like the result of build_parse_table().
+    """
+    table = build_parse_table()
+    return [None if row is None else
+            [None if alternative is None else
+             _predict(table, alternative, code)
+             for code, alternative in enumerate(row)]
+            for row in table]
+
+
+_PREDICTION_TABLE = build_prediction_table()
+
+# The value of every keyword and symbol, by code, so the parser only asks
+# the tokenizer for the values of the other tokens.
+_CONSTANT_VALUES = [None] * len(CODE_TYPES)
+for _text, _code in TOKEN_CODES.items():
+    _CONSTANT_VALUES[_code] = token_value(_code, _text)
+
+
+def _describe(symbol: int) -> str:
+    if symbol >= _FIRST_NONTERMINAL:
+        return " or ".join(
+            _describe(code) for code, alternative in
+            enumerate(_PREDICTION_TABLE[symbol]) if alternative is not None)
+    for text, code in TOKEN_CODES.items():
+        if code == symbol:
+            return repr(text)
+    return CODE_TAGS[symbol]
+
+
+class PredictiveEngine(Compilationengine):
+    """A Compilationengine that parses with the LL(1) table of GRAMMAR
+    instead of one method per rule. It keeps the pending symbols on an
+    explicit stack and picks every alternative with a single table lookup
+    on the next token's code, and emits exactly the same events.
+
+    In recover mode, it skips ahead to the same tokens as the recursive
+    engine after a syntax error, then drops pending symbols up to the
+    nearest list of statements or class members that can go on from there.
+    """
+
+    def compile_class(self) -> None:
+        """Compiles a complete class.
+
+        Raises:
+            CompilationError: if the next token cannot continue the class.
+        """
+        self._compile_symbol(_NONTERMINALS[START_SYMBOL], self.recover)
+
+    def compile_class_var_dec(self) -> None:
+        """Compiles a static declaration or a field declaration, by the
+        table too, so a member parsed on its own is held to the same rules
+        as in its class. It does not recover from errors.
+
+        Raises:
+            CompilationError: if the next token cannot continue it.
+        """
+        self._compile_symbol(_NONTERMINALS["classVarDec"], False)
+
+    def compile_subroutine(self) -> None:
+        """Compiles a complete method, function, or constructor, by the
+        table, see compile_class_var_dec.
+
+        Raises:
+            CompilationError: if the next token cannot continue it.
+        """
+        self._compile_symbol(_NONTERMINALS["subroutineDec"], False)
+
+    def _compile_symbol(self, start: int, recover: bool) -> None:
+        tokenizer = self.tknzr
+        advance = tokenizer.advance
+        token_code = tokenizer.token_code
+        current_value = tokenizer.current_token_val
+        emitter = self.emitter
+        terminal = emitter.terminal
+        open_node = emitter.open_node
+        close_node = emitter.close_node
+        table = _PREDICTION_TABLE
+        constant_values = _CONSTANT_VALUES
+        first_nonterminal = _FIRST_NONTERMINAL
+        first_open = _FIRST_OPEN
+        close = _CLOSE
+
+        stack = [start]
+        pop = stack.pop
+        extend = stack.extend
+        code = token_code()
+        while True:
+            try:
+                while stack:
+                    symbol = pop()
+                    if symbol < first_nonterminal:
+                        if symbol != code:
+                            self._mismatch(symbol)
+                        value = constant_values[code]
+                        terminal(CODE_TAGS[code],
+                                 current_value() if value is None else value)
+                        advance()
+                        code = token_code()
+                    elif symbol < first_open:
+                        alternative = table[symbol][code]
+                        if alternative is None:
+                            self._mismatch(symbol)
+                        extend(alternative)
+                    elif symbol == close:
+                        close_node()
+                    else:
+                        open_node(NODE_TAGS[symbol - first_open])
+                return
+            except CompilationError as error:
+                if not recover:
+                    raise
+                self._recover(stack, error)
+                code = token_code()
+
+    def _mismatch(self, symbol: int) -> None:
+        raise self._mismatch_error(symbol)
+
+    def _mismatch_error(self, symbol: int) -> CompilationError:
+        return self.error(
+            f"Mismatched token: Expected {_describe(symbol)}, got "
+            f"{self.describe_token()}")
+
+    def _recover(self, stack: typing.List[int],
+                 error: CompilationError) -> None:
+        self._record(error)
+        # As the recursive engine does, resume at the next statement if the
+        # error is inside one, and at the next member otherwise.
+        self.synchronize(
+            STATEMENT_SYNC_CODES if _STATEMENT_LIST in stack
+            else MEMBER_SYNC_CODES, error)
+        while True:
+            code = self.tknzr.token_code()
+            resume = len(stack)
+            while resume and not (
+                    stack[resume - 1] in _RECOVERY_POINTS and
+                    _PREDICTION_TABLE[stack[resume - 1]][code] is not None):
+                resume -= 1
+            if resume:
+                break
+            # Nothing pending can go on from here, which is an error of its
+            # own, unless parsing resumed at the token of the last one. Skip
+            # to the next member.
+            points = [symbol for symbol in stack if symbol in _RECOVERY_POINTS]
+            if points:
+                self._record(self._mismatch_error(points[-1]))
+            if code in MEMBER_SYNC_CODES:
+                self.tknzr.advance()
+            self.synchronize(MEMBER_SYNC_CODES, error)
+        # Dropped elements are still opened and closed, so the output stays
+        # well-formed.
+        while len(stack) > resume:
+            symbol = stack.pop()
+            if symbol == _CLOSE:
+                self.emitter.close_node()
+            elif symbol >= _FIRST_OPEN:
+                self.emitter.open_node(NODE_TAGS[symbol - _FIRST_OPEN])
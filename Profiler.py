@@ -0,0 +1,108 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import contextlib
+import time
+import typing
+
+# The phases of analyzing a file, in order. Comments are removed by the
+# tokenizer in the same pass as tokenizing, so they have no phase of their
+# own.
+PHASES = ("read", "tokenize", "parse", "serialize", "write")
+
+
+def _measurement(wall: float, cpu: float) -> typing.Dict[str, float]:
+    return {"wall_seconds": wall, "cpu_seconds": cpu}
+
+
+class FileProfile:
+    """The wall and CPU time spent on each phase of analyzing one file."""
+
+    def __init__(self) -> None:
+        self.phases: typing.Dict[str, typing.List[float]] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        """Times the code run inside the with block as part of a phase.
+
+        Args:
+            name (str): one of PHASES.
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall,
+                     time.process_time() - cpu)
+
+    def add(self, name: str, wall: float, cpu: float) -> None:
+        """Adds time to a phase.
+
+        Args:
+            name (str): one of PHASES.
+            wall (float): wall time, in seconds.
+            cpu (float): CPU time of this process, in seconds.
+        """
+        times = self.phases.setdefault(name, [0.0, 0.0])
+        times[0] += wall
+        times[1] += cpu
+
+    def report(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        """
+        Returns:
+            The time of every phase that was timed, and their total.
+        """
+        report = {name: _measurement(*self.phases[name])
+                  for name in PHASES if name in self.phases}
+        report["total"] = _measurement(
+            sum(wall for wall, _ in self.phases.values()),
+            sum(cpu for _, cpu in self.phases.values()))
+        return report
+
+
+class Profiler:
+    """Collects the FileProfile of every analyzed file, and reports them
+    with their totals per phase.
+    """
+
+    def __init__(self) -> None:
+        self.files: typing.Dict[str, FileProfile] = {}
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def file(self, path: str) -> FileProfile:
+        """
+        Args:
+            path (str): path of a .jack file.
+
+        Returns:
+            FileProfile: the profile of that file, new if it has none yet.
+        """
+        if path not in self.files:
+            self.files[path] = FileProfile()
+        return self.files[path]
+
+    def report(self) -> dict:
+        """
+        Returns:
+            dict: the profile of every file, the total of every phase over
+            all files, and the wall and CPU time of this process since the
+            profiler was created. With worker processes, the per-file CPU
+            times are those of the workers.
+        """
+        total = FileProfile()
+        for profile in self.files.values():
+            for name, (wall, cpu) in profile.phases.items():
+                total.add(name, wall, cpu)
+        return {
+            "phases": list(PHASES),
+            "files": {path: profile.report()
+                      for path, profile in self.files.items()},
+            "total": total.report(),
+            "run": _measurement(time.perf_counter() - self._wall,
+                                time.process_time() - self._cpu),
+        }
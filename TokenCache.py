@@ -0,0 +1,139 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import hashlib
+import os
+import struct
+import sys
+import typing
+
+# Start of every token file. The tokenizer version that follows it is the
+# hash of JackTokenizer.py, so changing the tokenizer invalidates the cache.
+TOKEN_FILE_MAGIC = b"JKT1"
+_HEADER = struct.Struct("<4s32sQc")
+# The typecodes of the offset arrays JackTokenizer.tokenize makes.
+_OFFSET_TYPES = (b"I", b"Q")
+
+Columns = typing.Tuple[array.array, array.array, array.array]
+
+
+def _tokenizer_version() -> bytes:
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "JackTokenizer.py")
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+class TokenCache:
+    """A directory of tokenized sources, one file per source, named after the
+    SHA-256 of the source.
+
+    A token file holds the token columns of JackTokenizer: a header, then
+    the codes, start offsets and end offsets arrays, little-endian. Offsets
+    count characters in a source that was read as text and bytes in one that
+    was read as bytes, so the two are cached under different keys.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        Args:
+            directory (str): where to keep the token files. Created if needed.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._version = _tokenizer_version()
+
+    def _path(self, source: typing.Union[str, bytes]) -> str:
+        if isinstance(source, str):
+            digest = hashlib.sha256(source.encode('utf-8', 'surrogatepass'))
+            suffix = ".tok"
+        else:
+            digest = hashlib.sha256(source)
+            suffix = ".btok"
+        return os.path.join(self.directory, digest.hexdigest() + suffix)
+
+    def load(self, path: str) -> typing.Optional[Columns]:
+        """Reads a token file.
+
+        Args:
+            path (str): path of the token file.
+
+        Returns:
+            The codes, starts and ends arrays, or None if the file does not
+            exist, was written by a different tokenizer, or is corrupt.
+        """
+        try:
+            with open(path, 'rb') as token_file:
+                data = token_file.read()
+        except OSError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, count, offset_type = _HEADER.unpack_from(data)
+        if magic != TOKEN_FILE_MAGIC or version != self._version or \
+                offset_type not in _OFFSET_TYPES:
+            return None
+        codes = array.array('B')
+        starts = array.array(offset_type.decode())
+        ends = array.array(offset_type.decode())
+        if len(data) != _HEADER.size + count * (
+                codes.itemsize + starts.itemsize + ends.itemsize):
+            return None
+        position = _HEADER.size
+        for column in (codes, starts, ends):
+            size = count * column.itemsize
+            column.frombytes(data[position:position + size])
+            position += size
+            if sys.byteorder == "big":
+                column.byteswap()
+        return codes, starts, ends
+
+    def store(self, path: str, codes: array.array, starts: array.array,
+              ends: array.array) -> None:
+        """Writes a token file, atomically.
+
+        Args:
+            path (str): path of the token file.
+            codes, starts, ends (array.array): the token columns.
+        """
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as token_file:
+            token_file.write(_HEADER.pack(
+                TOKEN_FILE_MAGIC, self._version, len(codes),
+                starts.typecode.encode()))
+            for column in (codes, starts, ends):
+                if sys.byteorder == "big":
+                    column = array.array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(token_file)
+        os.replace(temporary_path, path)
+
+    def get_or_tokenize(
+            self, source: typing.Union[str, bytes],
+            tokenize: typing.Callable[[typing.Union[str, bytes]], Columns]) \
+            -> Columns:
+        """Loads the tokens of a source, tokenizing and storing them if they
+        are not cached yet.
+
+        Args:
+            source (str | bytes): the source.
+            tokenize: JackTokenizer.tokenize, or anything that turns a source
+                into token columns the same way.
+
+        Returns:
+            The codes, starts and ends arrays.
+        """
+        path = self._path(source)
+        columns = self.load(path)
+        if columns is None:
+            columns = tokenize(source)
+            try:
+                self.store(path, *columns)
+            except OSError:
+                pass
+        return columns
@@ -0,0 +1,462 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Benchmarks the analyzer on a synthetic corpus of valid Jack classes, and
+writes the results as JSON. Run it on two commits with the same options and
+pass the first result to --baseline to compare them:
+
+    python benchmark.py --output before.json
+    python benchmark.py --baseline before.json
+
+With --startup it measures how long the analyzer takes to start instead,
+each run in a new interpreter, and fails if JackAnalyzer imports a module
+that only some modes need, see LAZY_MODULES.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+from JackTokenizer import JackTokenizer
+from Emitters import XmlEmitter
+from ParseTree import TreeBuilder, emit_tree
+from JackAnalyzer import ENGINES
+
+
+class CorpusShape(typing.NamedTuple):
+    """The size and shape of a generated corpus."""
+    # Number of classes, one source each.
+    classes: int = 20
+    # Subroutines per class.
+    subroutines: int = 10
+    # Statements per subroutine, not counting nested ones.
+    statements: int = 20
+    # Nesting depth of the deepest expression of each subroutine.
+    expression_depth: int = 8
+    # Chance of a comment before each statement.
+    comment_ratio: float = 0.2
+    # Chance of a statement being a call with a string argument.
+    string_ratio: float = 0.2
+    # Seed of the random generator, so a corpus can be generated again.
+    seed: int = 0
+
+
+_OPS = ("+", "-", "*", "/", "&", "|", "<", ">", "=")
+_COMMENTS = (
+    "// {}\n",
+    "/* {} */\n",
+    "/** {}\n * @param x some value\n * @return nothing at all\n */\n")
+_WORDS = ("value", "index", "sum", "the", "next", "player", "square", "size",
+          "array", "loop", "counter", "draw", "move", "done", "x", "y")
+_VARIABLES = ("a", "b", "c", "i", "j")
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12)))
+
+
+def _term(rng: random.Random) -> str:
+    choice = rng.randrange(6)
+    if choice == 0:
+        return str(rng.randint(0, 32767))
+    if choice == 1:
+        return rng.choice(("true", "false", "null", "this"))
+    if choice == 2:
+        return f"arr[{rng.choice(_VARIABLES)}]"
+    if choice == 3:
+        return f"Math.min({rng.choice(_VARIABLES)}, {rng.randint(0, 99)})"
+    return rng.choice(_VARIABLES)
+
+
+def _expression(rng: random.Random, depth: int) -> str:
+    # Built inside out, so that any depth can be generated.
+    expression = _term(rng)
+    for _ in range(depth):
+        choice = rng.randrange(4)
+        if choice == 0:
+            expression = f"({expression} {rng.choice(_OPS)} {_term(rng)})"
+        elif choice == 1:
+            expression = f"{rng.choice('-~')}({expression})"
+        elif choice == 2:
+            expression = f"arr[{expression}]"
+        else:
+            expression = f"f{rng.randrange(3)}({expression}, {_term(rng)})"
+    return expression
+
+
+def _statements(rng: random.Random, shape: CorpusShape, count: int,
+                indent: str, nesting: int) -> typing.List[str]:
+    lines = []
+    for _ in range(count):
+        if rng.random() < shape.comment_ratio:
+            lines.append(indent + rng.choice(_COMMENTS).format(_sentence(rng)))
+        if rng.random() < shape.string_ratio:
+            lines.append(
+                f'{indent}do Output.printString("{_sentence(rng)}");\n')
+            continue
+        choice = rng.randrange(5 if nesting < 2 else 3)
+        depth = rng.randint(0, shape.expression_depth)
+        if choice == 0:
+            lines.append(f"{indent}let {rng.choice(_VARIABLES)} = "
+                         f"{_expression(rng, depth)};\n")
+        elif choice == 1:
+            lines.append(f"{indent}let arr[{_expression(rng, 1)}] = "
+                         f"{_expression(rng, depth)};\n")
+        elif choice == 2:
+            lines.append(f"{indent}do f{rng.randrange(3)}("
+                         f"{_expression(rng, depth)}, {_term(rng)});\n")
+        elif choice == 3:
+            lines.append(f"{indent}if ({_expression(rng, depth)}) {{\n")
+            lines += _statements(rng, shape, 3, indent + "    ", nesting + 1)
+            lines.append(f"{indent}}}\n{indent}else {{\n")
+            lines += _statements(rng, shape, 2, indent + "    ", nesting + 1)
+            lines.append(f"{indent}}}\n")
+        else:
+            lines.append(f"{indent}while ({_expression(rng, depth)}) {{\n")
+            lines += _statements(rng, shape, 3, indent + "    ", nesting + 1)
+            lines.append(f"{indent}}}\n")
+    return lines
+
+
+def generate_class(rng: random.Random, name: str, shape: CorpusShape) -> str:
+    """
+    Args:
+        rng (random.Random): the random generator to use.
+        name (str): name of the class.
+        shape (CorpusShape): the shape of the class.
+
+    Returns:
+        str: the source of a valid Jack class.
+    """
+    lines = [f"/** {name}: {_sentence(rng)} */\n", f"class {name} {{\n",
+             "    field int a, b, c;\n", "    static Array arr;\n\n"]
+    for index in range(shape.subroutines):
+        kind = rng.choice(("function", "method", "constructor"))
+        return_type = name if kind == "constructor" else \
+            rng.choice(("void", "int", "boolean", "char", "Array"))
+        lines.append(f"    {kind} {return_type} f{index}"
+                     f"(int x, boolean y, {name} other) {{\n")
+        lines.append("        var int i, j;\n        var Array values;\n")
+        lines += _statements(rng, shape, shape.statements, " " * 8, 0)
+        lines.append("        return this;\n" if kind == "constructor"
+                     else "        return;\n")
+        lines.append("    }\n\n")
+    lines.append("}\n")
+    return "".join(lines)
+
+
+def generate_corpus(shape: CorpusShape) -> typing.Dict[str, str]:
+    """
+    Args:
+        shape (CorpusShape): the shape of the corpus.
+
+    Returns:
+        typing.Dict[str, str]: the source of every class, by file name.
+    """
+    rng = random.Random(shape.seed)
+    return {f"Class{index}.jack": generate_class(rng, f"Class{index}", shape)
+            for index in range(shape.classes)}
+
+
+def _timed(function: typing.Callable[[], None], prepare: typing.Callable[
+        [], None], repeat: int) -> typing.Dict[str, float]:
+    # The best of repeat runs, each after an untimed prepare().
+    wall = cpu = float("inf")
+    for _ in range(repeat):
+        prepare()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        function()
+        wall = min(wall, time.perf_counter() - wall_start)
+        cpu = min(cpu, time.process_time() - cpu_start)
+    prepare()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"wall_seconds": wall, "cpu_seconds": cpu, "peak_bytes": peak}
+
+
+def run_benchmark(sources: typing.Dict[str, str], parser: str = "recursive",
+                  repeat: int = 5) -> typing.Dict[str, dict]:
+    """Measures each phase of the analyzer on its own.
+
+    - tokenizer: building a JackTokenizer over every source.
+    - parser: parsing the tokens into a ParseTree, with no output.
+    - serializer: writing those trees as xml.
+    - analyzer: tokenizing, parsing and writing xml in one pass, like
+      JackAnalyzer does.
+
+    Times are the best of repeat runs, and peak memory is measured in one
+    more run, since tracing memory slows everything down.
+
+    Args:
+        sources (typing.Dict[str, str]): the sources, by file name.
+        parser (str, optional): one of JackAnalyzer.ENGINES. Defaults to
+            "recursive".
+        repeat (int, optional): number of timed runs. Defaults to 5.
+
+    Returns:
+        typing.Dict[str, dict]: the measurements of each phase.
+    """
+    engine = ENGINES[parser]
+    texts = list(sources.values())
+    tokenizers: typing.List[JackTokenizer] = []
+    trees = []
+
+    def make_tokenizers():
+        tokenizers[:] = [JackTokenizer(io.StringIO(text)) for text in texts]
+
+    def tokenize():
+        for text in texts:
+            JackTokenizer(io.StringIO(text))
+
+    def parse():
+        trees.clear()
+        for tokenizer in tokenizers:
+            builder = TreeBuilder(tokenizer)
+            engine(tokenizer, None, builder).run()
+            trees.append(builder.root)
+
+    def parse_once():
+        make_tokenizers()
+        parse()
+
+    def serialize():
+        for tokenizer, tree in zip(tokenizers, trees):
+            emit_tree(tree, tokenizer, XmlEmitter(io.StringIO()))
+
+    def analyze():
+        for text in texts:
+            output = io.StringIO()
+            engine(JackTokenizer(io.StringIO(text)), output).run()
+
+    make_tokenizers()
+    token_count = sum(tokenizer.token_count for tokenizer in tokenizers)
+    results = {
+        "tokenizer": _timed(tokenize, lambda: None, repeat),
+        "parser": _timed(parse, make_tokenizers, repeat),
+        "serializer": _timed(serialize, parse_once, repeat),
+        "analyzer": _timed(analyze, lambda: None, repeat),
+    }
+    for phase in results.values():
+        phase["tokens_per_second"] = token_count / phase["wall_seconds"]
+    results["corpus"] = {
+        "files": len(texts), "tokens": token_count,
+        "characters": sum(len(text) for text in texts)}
+    return results
+
+
+# Modules that JackAnalyzer must not import when it starts, since only some
+# of its modes need them.
+LAZY_MODULES = (
+    "argparse", "json", "hashlib", "xml", "PredictiveParser", "TokenCache",
+    "BuildCache", "ParseTree", "Profiler", "Counters",
+    "Pipeline", "ParallelParser", "multiprocessing")
+
+_ANALYZER_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def _timed_process(arguments: typing.List[str], repeat: int) \
+        -> typing.Dict[str, float]:
+    # The best of repeat runs of a new interpreter with these arguments.
+    wall = cpu = float("inf")
+    for _ in range(repeat):
+        times = os.times()
+        wall_start = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, check=True,
+                       cwd=_ANALYZER_DIRECTORY, stdout=subprocess.DEVNULL)
+        wall = min(wall, time.perf_counter() - wall_start)
+        after = os.times()
+        cpu = min(cpu, after.children_user - times.children_user
+                  + after.children_system - times.children_system)
+    return {"wall_seconds": wall, "cpu_seconds": cpu}
+
+
+def import_times(module: str = "JackAnalyzer") -> typing.Dict[str, int]:
+    """Imports a module in a new interpreter, with -X importtime.
+
+    Args:
+        module (str, optional): the module. Defaults to "JackAnalyzer".
+
+    Returns:
+        typing.Dict[str, int]: the cumulative import time of every module
+        the import loaded, in microseconds, by module name.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True, cwd=_ANALYZER_DIRECTORY, capture_output=True,
+        text=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def run_startup_benchmark(repeat: int = 5) -> dict:
+    """Measures how long the analyzer takes to start.
+
+    - import: importing JackAnalyzer.
+    - analyze: running JackAnalyzer.py on one small class.
+
+    Args:
+        repeat (int, optional): number of timed runs, the best one counts.
+            Defaults to 5.
+
+    Returns:
+        dict: the measurements, the import time of every module that
+        importing JackAnalyzer loads, and the LAZY_MODULES among them.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = os.path.join(directory, "Main.jack")
+        with open(source_path, 'w') as source:
+            source.write(generate_class(
+                random.Random(0), "Main", CorpusShape(subroutines=1)))
+        results = {
+            "import": _timed_process(["-c", "import JackAnalyzer"], repeat),
+            "analyze": _timed_process(
+                ["JackAnalyzer.py", source_path, "--jobs", "1"], repeat),
+        }
+    times = min((import_times() for _ in range(repeat)),
+                key=lambda times: times.get("JackAnalyzer", 0))
+    eager = sorted(name for name in times
+                   if name.split(".")[0] in LAZY_MODULES)
+    return {"results": results, "import_microseconds": times,
+            "eager_modules": eager}
+
+
+def _git_commit() -> typing.Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict) -> typing.List[str]:
+    """
+    Args:
+        report (dict): a report of this script.
+        baseline (dict): an earlier report, made with the same options.
+
+    Returns:
+        typing.List[str]: one line per phase and measurement, with the
+        ratio of the new value to the old one.
+    """
+    lines = []
+    for phase, measurements in report["results"].items():
+        if phase == "corpus" or phase not in baseline["results"]:
+            continue
+        for name in ("wall_seconds", "cpu_seconds", "peak_bytes"):
+            if name not in measurements or \
+                    name not in baseline["results"][phase]:
+                continue
+            old = baseline["results"][phase][name]
+            new = measurements[name]
+            ratio = new / old if old else float("inf")
+            lines.append(f"{phase:>10} {name:<13} {old:12.6g} -> "
+                         f"{new:12.6g}  x{ratio:.3f}")
+    return lines
+
+
+def main() -> None:
+    defaults = CorpusShape()
+    parser = argparse.ArgumentParser(
+        prog="benchmark",
+        description="Benchmarks JackTokenizer and the parsers on a "
+                    "generated corpus.")
+    parser.add_argument("--classes", type=int, default=defaults.classes)
+    parser.add_argument("--subroutines", type=int,
+                        default=defaults.subroutines)
+    parser.add_argument("--statements", type=int,
+                        default=defaults.statements)
+    parser.add_argument("--expression-depth", type=int,
+                        default=defaults.expression_depth)
+    parser.add_argument("--comment-ratio", type=float,
+                        default=defaults.comment_ratio)
+    parser.add_argument("--string-ratio", type=float,
+                        default=defaults.string_ratio)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--parser", choices=ENGINES, default="recursive")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed runs per phase, the best one counts")
+    parser.add_argument("--write-corpus", metavar="DIR",
+                        help="also write the generated sources to DIR")
+    parser.add_argument("--output", "-o", metavar="FILE",
+                        help="write the JSON report to FILE instead of "
+                             "standard output")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare with an earlier JSON report")
+    parser.add_argument("--startup", action="store_true",
+                        help="measure how long the analyzer takes to start "
+                             "instead")
+    args = parser.parse_args()
+
+    if args.startup:
+        report = {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        }
+        report.update(run_startup_benchmark(args.repeat))
+        _write_report(report, args)
+        if report["eager_modules"]:
+            print("JackAnalyzer imports modules it should only import when "
+                  f"needed: {', '.join(report['eager_modules'])}",
+                  file=sys.stderr)
+            sys.exit(1)
+        return
+
+    shape = CorpusShape(
+        args.classes, args.subroutines, args.statements,
+        args.expression_depth, args.comment_ratio, args.string_ratio,
+        args.seed)
+    sources = generate_corpus(shape)
+    if args.write_corpus:
+        os.makedirs(args.write_corpus, exist_ok=True)
+        for filename, source in sources.items():
+            with open(os.path.join(args.write_corpus, filename), 'w') as file:
+                file.write(source)
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parser": args.parser,
+        "repeat": args.repeat,
+        "shape": shape._asdict(),
+        "results": run_benchmark(sources, args.parser, args.repeat),
+    }
+    _write_report(report, args)
+
+
+def _write_report(report: dict, args: argparse.Namespace) -> None:
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline, 'r') as baseline:
+            print("\n".join(compare(report, json.load(baseline))),
+                  file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
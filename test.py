@@ -1,4 +1,11 @@
+import argparse
+import functools
+import io
 import os
+import re
+import sys
+import typing
+from JackAnalyzer import analyze_file, create_token_file
 
 def rename_xml_files(base_dir):
     for root, dirs, files in os.walk(base_dir):
@@ -22,49 +29,222 @@ def delete_temp_files(base_dir):
                 path = os.path.join(root, file)
                 os.remove(path)
                 print(f"[DELETE] Removed {file}")
-import subprocess
 
-def run_and_compare(base_dir):
-    for root, dirs, files in os.walk(base_dir):
-        jack_files = [f for f in files if f.endswith('.jack')]
-
-        # Run JackAnalyzer on each .jack file
-        for jack_file in jack_files:
-            jack_path = os.path.join(root, jack_file)
-            try:
-                subprocess.run(['python', '.\\JackAnalyzer.py', jack_path], check=True)
-                print(f"[RUN] JackAnalyzer on {jack_path}")
-            except subprocess.CalledProcessError as e:
-                print(f"[ERROR] JackAnalyzer failed on {jack_path}: {e}")
-                continue
 
-        # Compare new .xml with renamed *2.xml
-        for jack_file in jack_files:
-            base_name = os.path.splitext(jack_file)[0]
-            xml_new = os.path.join(root, base_name + '.xml')
-            xml_old = os.path.join(root, base_name + '2.xml')
+# The golden files next to X.jack: X2.xml holds its parse tree, and XT.xml,
+# if there is one, its tokens.
+PARSE_GOLDEN_SUFFIX = "2.xml"
+TOKENS_GOLDEN_SUFFIX = "T.xml"
 
-            if not os.path.exists(xml_old):
-                print(f"[SKIP] Missing renamed XML: {xml_old}")
-                continue
-            if not os.path.exists(xml_new):
-                print(f"[ERROR] New XML output missing: {xml_new}")
+# How the output is compared with a golden file: "exact" byte for byte,
+# "elements" only by its elements, see xml_events(), and "auto" byte for
+# byte, except parse trees whose goldens are not indented at all, like the
+# p10 ones, which another tool wrote and which are compared by elements.
+COMPARISONS = ("auto", "exact", "elements")
+_INDENTED_LINE = re.compile(rb"^[ \t]", re.MULTILINE)
+
+_ELEMENT_PATTERN = re.compile(r'<(/?)([A-Za-z]\w*)>([^<]*)')
+
+
+def xml_events(text: str) -> typing.List[typing.Tuple[str, str, str]]:
+    """Reads the flat xml the analyzer and the golden files use, ignoring
+    indentation and the spaces around values.
+
+    Args:
+        text (str): the xml.
+
+    Returns:
+        One ("open", tag, text) or ("close", tag, "") tuple per tag, where
+        text is the stripped text that follows an opening tag.
+    """
+    return [("close", tag, "") if slash else ("open", tag, value.strip())
+            for slash, tag, value in _ELEMENT_PATTERN.findall(text)]
+
+
+def first_difference(expected: str, actual: str) -> typing.Optional[str]:
+    """
+    Args:
+        expected (str): the golden xml.
+        actual (str): the analyzer's xml.
+
+    Returns:
+        str: where the two first diverge, as the path of the element and
+        both versions of it, or None if they match.
+    """
+    expected_events = xml_events(expected)
+    actual_events = xml_events(actual)
+    path = []
+    for expected_event, actual_event in zip(expected_events, actual_events):
+        if expected_event != actual_event:
+            return (f"at /{'/'.join(path)}: expected "
+                    f"{_describe(expected_event)}, got "
+                    f"{_describe(actual_event)}")
+        if expected_event[0] == "open":
+            path.append(expected_event[1])
+        else:
+            path.pop()
+    if len(expected_events) != len(actual_events):
+        longer = expected_events if len(expected_events) > len(actual_events) \
+            else actual_events
+        event = longer[min(len(expected_events), len(actual_events))]
+        return (f"at /{'/'.join(path)}: "
+                f"{'missing' if longer is expected_events else 'unexpected'} "
+                f"{_describe(event)}")
+    return None
+
+
+def first_line_difference(expected: str, actual: str) -> str:
+    """
+    Args:
+        expected (str): the golden xml.
+        actual (str): the analyzer's xml, which differs from it.
+
+    Returns:
+        str: the first line where the two differ, both versions of it.
+    """
+    expected_lines = expected.splitlines(keepends=True)
+    actual_lines = actual.splitlines(keepends=True)
+    for number, (expected_line, actual_line) in enumerate(
+            zip(expected_lines, actual_lines), start=1):
+        if expected_line != actual_line:
+            break
+    else:
+        number = min(len(expected_lines), len(actual_lines)) + 1
+        expected_line = "".join(expected_lines[number - 1:number])
+        actual_line = "".join(actual_lines[number - 1:number])
+    return (f"at line {number}: expected {expected_line!r}, "
+            f"got {actual_line!r}")
+
+
+def _describe(event: typing.Tuple[str, str, str]) -> str:
+    kind, tag, value = event
+    if kind == "close":
+        return f"</{tag}>"
+    return f"<{tag}> {value} </{tag}>" if value else f"<{tag}>"
+
+
+def check_file(jack_path: str, comparison: str = "auto") \
+        -> typing.List[typing.Tuple[str, str, str]]:
+    """Analyzes a .jack file in memory, both ways, and compares the results
+    with its golden files. A failure is reported at the first element that
+    differs, or at the first line if only whitespace does.
+
+    Args:
+        jack_path (str): path of the .jack file.
+        comparison (str, optional): one of COMPARISONS. Defaults to "auto".
+
+    Returns:
+        One (status, golden path, detail) tuple per golden file, where
+        status is "PASS", "FAIL" or "ERROR".
+    """
+    base = os.path.splitext(jack_path)[0]
+    checks = [(base + PARSE_GOLDEN_SUFFIX, analyze_file),
+              (base + TOKENS_GOLDEN_SUFFIX, create_token_file)]
+    results = []
+    for golden_path, analyze in checks:
+        if not os.path.exists(golden_path):
+            continue
+        output = io.StringIO()
+        try:
+            with open(jack_path, 'r') as input_file:
+                analyze(input_file, output)
+        except Exception as error:
+            results.append(
+                ("ERROR", golden_path, f"{type(error).__name__}: {error}"))
+            continue
+        with open(golden_path, 'rb') as golden_file:
+            golden = golden_file.read()
+        actual = output.getvalue()
+        if actual.encode() == golden:
+            results.append(("PASS", golden_path, ""))
+            continue
+        by_elements = comparison == "elements" or comparison == "auto" and \
+            analyze is analyze_file and not _INDENTED_LINE.search(golden)
+        golden = golden.decode(errors="replace")
+        difference = first_difference(golden, actual)
+        if difference is None and not by_elements:
+            difference = first_line_difference(golden, actual)
+        results.append(("FAIL", golden_path, difference) if difference
+                       else ("PASS", golden_path, ""))
+    return results
+
+
+def check_directory(directory: str, comparison: str = "auto") \
+        -> typing.List[typing.Tuple[str, str, str]]:
+    """
+    Args:
+        directory (str): a directory of .jack files.
+        comparison (str, optional): see check_file. Defaults to "auto".
+
+    Returns:
+        The results of check_file for each of its .jack files.
+    """
+    results = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.jack'):
+            results += check_file(os.path.join(directory, filename),
+                                  comparison)
+    return results
+
+
+def run_and_compare(base_dirs: typing.List[str], jobs: int = 1,
+                    comparison: str = "auto") -> int:
+    """Checks every .jack file under base_dirs against its golden files,
+    one test directory per task, spread over jobs worker processes.
+
+    Args:
+        base_dirs (typing.List[str]): directories to search for tests.
+        jobs (int, optional): number of worker processes. Defaults to 1,
+            which runs everything in this process.
+        comparison (str, optional): see check_file. Defaults to "auto".
+
+    Returns:
+        int: the number of golden files that did not match.
+    """
+    directories = sorted({
+        root for base_dir in base_dirs for root, _, files in os.walk(base_dir)
+        if any(file.endswith('.jack') for file in files)})
+    check = functools.partial(check_directory, comparison=comparison)
+    if jobs > 1 and len(directories) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            all_results = list(pool.map(check, directories))
+    else:
+        all_results = [check(directory) for directory in directories]
+    failures = passes = 0
+    for results in all_results:
+        for status, golden_path, detail in results:
+            if status == "PASS":
+                passes += 1
                 continue
+            failures += 1
+            print(f"[{status}] {golden_path} {detail}")
+    print(f"{passes} passed, {failures} failed")
+    return failures
 
-            with open(xml_old, 'r') as f_old, open(xml_new, 'r') as f_new:
-                old_lines = f_old.readlines()
-                new_lines = f_new.readlines()
-
-            if old_lines == new_lines:
-                print(f"[PASS] {xml_new} matches {xml_old}")
-            else:
-                print(f"[FAIL] {xml_new} does NOT match {xml_old}")
-                for i, (l1, l2) in enumerate(zip(old_lines, new_lines)):
-                    if l1 != l2:
-                        print(f"   First difference at line {i+1}:\n   OLD: {l1.strip()}\n   NEW: {l2.strip()}")
-                        break
-# Set your base directory
-base_dir = "p10"
-# Step 3: Run JackAnalyzer and compare
-run_and_compare(base_dir)
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares the analyzer's output with the golden "
+                    "*2.xml and *T.xml files.")
+    parser.add_argument(
+        "base_dirs", nargs="*",
+        default=[os.path.dirname(os.path.abspath(__file__))],
+        help="directories to search for .jack files (default: all of them)")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count() or 1, metavar="N",
+        help="number of worker processes (default: number of cores)")
+    comparisons = parser.add_mutually_exclusive_group()
+    comparisons.add_argument(
+        "--exact", dest="comparison", action="store_const", const="exact",
+        default="auto",
+        help="compare every golden byte for byte, also the p10 ones, which "
+             "are not indented")
+    comparisons.add_argument(
+        "--ignore-whitespace", dest="comparison", action="store_const",
+        const="elements",
+        help="only compare the elements and their values, for goldens that "
+             "are indented differently")
+    arguments = parser.parse_args()
+    sys.exit(1 if run_and_compare(arguments.base_dirs, arguments.jobs,
+                                  arguments.comparison) else 0)
@@ -0,0 +1,181 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from BuildCache import BuildCache
+from CompilationEngine import CompilationError, CompilationErrors
+from Emitters import EMITTERS
+from JackAnalyzer import (analyze_file, analyze_many, analyze_paths,
+                          analyze_to_string, output_path_for)
+from ParallelParser import analyze_paths_split
+from Pipeline import analyze_paths_pipelined
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SQUARE = os.path.join(ROOT, "Square")
+BROKEN = "class Broken { function void f() { let = 5; return; } }\n"
+
+
+def analyze(path: str, recover: bool = False) -> str:
+    # What analyze_file writes for a file, errors or not.
+    output = io.StringIO()
+    try:
+        with open(path, 'r') as input_file:
+            analyze_file(input_file, output, recover=recover)
+    except Exception:
+        pass
+    return output.getvalue()
+
+
+class DriverTest(unittest.TestCase):
+    """Runs every way of analyzing many files on a directory with a valid
+    and a broken file.
+    """
+
+    DRIVERS = ("serial", "workers", "cache", "pipeline", "split")
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def run_driver(self, driver: str, recover: bool = False):
+        # Runs a driver in a directory of its own.
+        self.directory = os.path.join(self.root, driver)
+        os.mkdir(self.directory)
+        self.valid_path = os.path.join(self.directory, "SquareGame.jack")
+        shutil.copy(os.path.join(SQUARE, "SquareGame.jack"), self.valid_path)
+        self.broken_path = os.path.join(self.directory, "Broken.jack")
+        with open(self.broken_path, 'w') as broken_file:
+            broken_file.write(BROKEN)
+        # Left by an earlier run, when the file was still valid.
+        with open(output_path_for(self.broken_path), 'w') as stale_file:
+            stale_file.write("<class>\n</class>\n")
+        input_paths = [self.broken_path, self.valid_path]
+        if driver == "serial":
+            return analyze_paths(input_paths, jobs=1, recover=recover)
+        if driver == "workers":
+            return analyze_paths(input_paths, jobs=2, recover=recover)
+        if driver == "cache":
+            cache = BuildCache(os.path.join(self.directory, "cache.json"))
+            return analyze_paths(input_paths, jobs=1, cache=cache,
+                                 recover=recover)
+        if driver == "pipeline":
+            return analyze_paths_pipelined(input_paths, recover=recover)
+        return analyze_paths_split(input_paths, recover=recover, jobs=2)
+
+    def output_of(self, input_path: str) -> str:
+        with open(output_path_for(input_path), 'r') as output_file:
+            return output_file.read()
+
+
+class FailedOutputTest(DriverTest):
+    """A file that fails leaves the same output behind, whichever way it
+    was analyzed.
+    """
+
+    def test_every_driver_truncates_the_output(self):
+        for driver in self.DRIVERS:
+            with self.subTest(driver=driver):
+                errors = self.run_driver(driver)
+                self.assertEqual([path for path, _ in errors],
+                                 [self.broken_path])
+                self.assertEqual(self.output_of(self.broken_path), "")
+                self.assertEqual(self.output_of(self.valid_path),
+                                 analyze(self.valid_path))
+
+
+class RecoveredOutputTest(DriverTest):
+    """The tree recovered from syntax errors is written, whichever way the
+    file was analyzed.
+    """
+
+    def test_every_driver_writes_the_recovered_tree(self):
+        for driver in self.DRIVERS:
+            with self.subTest(driver=driver):
+                errors = self.run_driver(driver, recover=True)
+                self.assertEqual([path for path, _ in errors],
+                                 [self.broken_path])
+                self.assertIsInstance(errors[0][1], CompilationErrors)
+                recovered = self.output_of(self.broken_path)
+                self.assertIn("<returnStatement>", recovered)
+                self.assertEqual(recovered,
+                                 analyze(self.broken_path, recover=True))
+
+    def test_analyze_to_string_returns_the_recovered_tree(self):
+        path = os.path.join(self.root, "Broken.jack")
+        with open(path, 'w') as broken_file:
+            broken_file.write(BROKEN)
+        analysis = analyze_to_string(path, recover=True)
+        self.assertEqual(analysis.name, path)
+        self.assertIsInstance(analysis.error, CompilationErrors)
+        self.assertEqual(analysis.output, analyze(path, recover=True))
+
+
+class AnalyzeManyTest(unittest.TestCase):
+    """analyze_many makes of every source what analyze_file makes of it
+    alone, though it reuses one emitter for all of them.
+    """
+
+    def setUp(self):
+        self.sources = []
+        for name in sorted(os.listdir(SQUARE)):
+            if name.endswith(".jack"):
+                with open(os.path.join(SQUARE, name), 'r') as input_file:
+                    self.sources.append((name, input_file.read()))
+        main = self.sources[0][1]
+        # Broken sources between the valid ones, so a valid one follows
+        # each, and the same source twice.
+        self.sources[1:1] = [("Broken.jack", BROKEN),
+                             ("Truncated.jack", main[:len(main) // 2]),
+                             ("Empty.jack", ""), self.sources[0]]
+
+    def analyze_alone(self, source, output_format: str, recover: bool):
+        output = io.BytesIO() if output_format == "binary" \
+            else io.StringIO()
+        if isinstance(source, str):
+            source = io.StringIO(source)
+        error = None
+        try:
+            analyze_file(source, output, output_format=output_format,
+                         recover=recover)
+        except CompilationError as raised:
+            error = raised
+        return output.getvalue(), error
+
+    def assert_same_as_alone(self, output_format: str, recover: bool,
+                             as_stream) -> None:
+        analyses = list(analyze_many(
+            [(name, as_stream(source)) for name, source in self.sources],
+            output_format, recover=recover))
+        self.assertEqual([analysis.name for analysis in analyses],
+                         [name for name, _ in self.sources])
+        for (name, source), analysis in zip(self.sources, analyses):
+            with self.subTest(name=name):
+                output, error = self.analyze_alone(
+                    as_stream(source), output_format, recover)
+                self.assertEqual(analysis.output, output)
+                self.assertIs(type(analysis.error), type(error))
+                self.assertEqual(str(analysis.error), str(error))
+        errors = [analysis.name for analysis in analyses if analysis.error]
+        self.assertEqual(errors, ["Broken.jack", "Truncated.jack",
+                                  "Empty.jack"])
+
+    def test_every_format(self):
+        for output_format in EMITTERS:
+            for recover in (False, True):
+                with self.subTest(output_format=output_format,
+                                  recover=recover):
+                    self.assert_same_as_alone(output_format, recover,
+                                              io.StringIO)
+
+    def test_streams(self):
+        for as_stream in (io.StringIO,
+                          lambda source: io.BytesIO(source.encode())):
+            self.assert_same_as_alone("xml", False, as_stream)
+
+    def test_strings(self):
+        self.assert_same_as_alone("xml", True, lambda source: source)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from BuildCache import BuildCache
+from JackAnalyzer import analyze_paths, output_path_for
+
+SQUARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Square")
+
+
+class BuildCacheTest(unittest.TestCase):
+    """An output is fresh until its source, its format, the output itself
+    or the analyzer changes.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.manifest_path = os.path.join(self.directory, "cache.json")
+        self.input_path = os.path.join(self.directory, "Main.jack")
+        shutil.copy(os.path.join(SQUARE, "Main.jack"), self.input_path)
+        self.output_path = output_path_for(self.input_path)
+
+    def cache(self, version: str = "1") -> BuildCache:
+        return BuildCache(self.manifest_path, version)
+
+    def build(self, cache: BuildCache) -> None:
+        # Analyzes the file, if it is not fresh, and saves the manifest.
+        self.assertEqual(analyze_paths([self.input_path], cache=cache), [])
+        cache.save()
+
+    def is_fresh(self, cache: BuildCache, output_format: str = "xml") -> bool:
+        return cache.is_fresh(self.input_path, self.output_path,
+                              output_format)
+
+    def touch(self, path: str) -> None:
+        # Moves the modification time on, whatever the file system's
+        # resolution.
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_hit_after_build(self):
+        self.assertFalse(self.is_fresh(self.cache()))
+        self.build(self.cache())
+        self.assertTrue(self.is_fresh(self.cache()))
+
+    def test_edited_source_misses(self):
+        self.build(self.cache())
+        with open(self.input_path, 'a') as input_file:
+            input_file.write("// edited\n")
+        self.assertFalse(self.is_fresh(self.cache()))
+
+    def test_touched_source_hits(self):
+        self.build(self.cache())
+        self.touch(self.input_path)
+        self.assertTrue(self.is_fresh(self.cache()))
+
+    def test_other_format_misses(self):
+        self.build(self.cache())
+        self.assertFalse(self.is_fresh(self.cache(), "jsonl"))
+
+    def test_changed_or_missing_output_misses(self):
+        self.build(self.cache())
+        with open(self.output_path, 'a') as output_file:
+            output_file.write("\n")
+        self.touch(self.output_path)
+        self.assertFalse(self.is_fresh(self.cache()))
+        os.remove(self.output_path)
+        self.assertFalse(self.is_fresh(self.cache()))
+
+    def test_other_analyzer_version_misses(self):
+        self.build(self.cache("1"))
+        self.assertFalse(self.is_fresh(self.cache("2")))
+        self.assertTrue(self.is_fresh(self.cache("1")))
+
+    def test_unchanged_output_is_not_rewritten(self):
+        self.build(self.cache())
+        before = os.stat(self.output_path).st_mtime_ns
+        with open(self.input_path, 'a') as input_file:
+            input_file.write("// only a comment\n")
+        self.build(self.cache())
+        self.assertEqual(os.stat(self.output_path).st_mtime_ns, before)
+        self.assertTrue(self.is_fresh(self.cache()))
+
+    def test_forget(self):
+        cache = self.cache()
+        self.build(cache)
+        cache.forget(self.input_path)
+        self.assertFalse(self.is_fresh(cache))
+
+    def test_failed_file_is_forgotten(self):
+        self.build(self.cache())
+        with open(self.input_path, 'w') as input_file:
+            input_file.write("class Main {\n")
+        cache = self.cache()
+        errors = analyze_paths([self.input_path], cache=cache)
+        cache.save()
+        self.assertEqual([path for path, _ in errors], [self.input_path])
+        self.assertFalse(self.is_fresh(self.cache()))
+
+    def test_evict_stale(self):
+        cache = self.cache()
+        self.build(cache)
+        os.remove(self.input_path)
+        cache.evict_stale()
+        cache.save()
+        with open(self.manifest_path, 'r') as manifest:
+            self.assertEqual(json.load(manifest)["entries"], {})
+
+    def test_corrupt_manifest_is_empty(self):
+        self.build(self.cache())
+        entry = {"source": "0", "source_stat": [0, 0], "format": "xml",
+                 "output_stat": [0, 0]}
+        for content in ("{not json", "[]", '{"version": "1"}',
+                        '{"version": "1", "entries": []}',
+                        json.dumps({"version": "1",
+                                    "entries": {"Main.jack": 5}}),
+                        json.dumps({"version": "1",
+                                    "entries": {"Main.jack": {}}}),
+                        json.dumps({"version": "1",
+                                    "entries": {"Main.jack": entry}})):
+            with self.subTest(content=content):
+                with open(self.manifest_path, 'w') as manifest:
+                    manifest.write(content)
+                self.assertFalse(self.is_fresh(self.cache()))
+                self.build(self.cache())
+                self.assertTrue(self.is_fresh(self.cache()))
+
+
+if __name__ == "__main__":
+    unittest.main()
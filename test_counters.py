@@ -0,0 +1,65 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+import JackAnalyzer
+from JackAnalyzer import ENGINES, count_file
+from JackTokenizer import JackTokenizer
+
+SQUARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Square")
+
+
+class CountFileTest(unittest.TestCase):
+
+    def test_every_advance_is_counted(self):
+        # One advance to the first token, and one past each token.
+        for name in ("Main.jack", "Square.jack", "SquareGame.jack"):
+            input_path = os.path.join(SQUARE, name)
+            with open(input_path, 'r') as input_file:
+                token_count = JackTokenizer(input_file).token_count
+            for parser in ENGINES:
+                with self.subTest(name=name, parser=parser):
+                    counters = count_file(input_path, parser)
+                    self.assertEqual(counters.advance_calls, token_count + 1)
+
+
+class ArgumentsTest(unittest.TestCase):
+    """--tokens and --counters refuse the options they would ignore."""
+
+    def parse(self, *options: str):
+        argv = ["JackAnalyzer", SQUARE] + list(options)
+        with mock.patch.object(sys, "argv", argv):
+            return JackAnalyzer.parse_arguments()
+
+    def assert_rejected(self, *options: str) -> str:
+        with contextlib.redirect_stderr(io.StringIO()) as stderr, \
+                self.assertRaises(SystemExit):
+            self.parse(*options)
+        return stderr.getvalue()
+
+    def test_used_options_are_accepted(self):
+        self.assertTrue(self.parse("--tokens", "--token-cache", "/tmp").tokens)
+        self.assertTrue(self.parse("--counters", "--parser", "table").counters)
+
+    def test_ignored_options_are_rejected(self):
+        for mode in ("--tokens", "--counters"):
+            for options in (("--format", "jsonl"), ("--recover",),
+                            ("--mmap",), ("--pipeline",), ("--split",),
+                            ("--cache",), ("--profile",), ("--jobs", "0")):
+                with self.subTest(mode=mode, options=options):
+                    message = self.assert_rejected(mode, *options)
+                    self.assertIn(f"{mode} cannot be combined with "
+                                  f"{options[0]}", message)
+        self.assertIn("--parser",
+                      self.assert_rejected("--tokens", "--parser", "table"))
+        self.assertIn("--token-cache",
+                      self.assert_rejected("--counters", "--token-cache",
+                                           "/tmp"))
+        self.assertIn("--counters",
+                      self.assert_rejected("--tokens", "--counters"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import io
+import os
+import unittest
+from CompilationEngine import CompilationError, CompilationErrors
+from JackAnalyzer import analyze_file
+from JackTokenizer import JackTokenizer
+
+TRUNCATED_EXPRESSION = "class A { function void f() { let x = -"
+SQUARE_MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "Square", "Main.jack")
+
+
+def analyze(source: str, parser: str, recover: bool = False) -> str:
+    output = io.StringIO()
+    analyze_file(io.StringIO(source), output, parser=parser, recover=recover)
+    return output.getvalue()
+
+
+class TruncatedInputTest(unittest.TestCase):
+    """Input that ends in the middle of a rule is a syntax error at the end
+    of the input, however the engine got there.
+    """
+
+    def assert_rejected_at_end(self, source: str, parser: str) -> None:
+        line = source.count("\n") + 1
+        column = len(source) - source.rfind("\n")
+        with self.assertRaises(CompilationError) as raised:
+            analyze(source, parser)
+        error = raised.exception
+        self.assertIn("end of input", error.message)
+        self.assertEqual((error.line, error.column), (line, column))
+        with self.assertRaises(CompilationErrors) as raised:
+            analyze(source, parser, recover=True)
+        self.assertEqual(raised.exception.errors[-1].token_index,
+                         error.token_index)
+
+    def assert_every_prefix_rejected(self, parser: str) -> None:
+        with open(SQUARE_MAIN, 'r') as input_file:
+            source = input_file.read()
+        _, _, ends = JackTokenizer(io.StringIO(source)).columns()
+        # Cut after every token but the class's last '}'.
+        for end in ends[:-1]:
+            with self.subTest(end=end):
+                with self.assertRaises(CompilationError):
+                    analyze(source[:end], parser)
+
+    def test_table_after_unary_operator(self):
+        self.assert_rejected_at_end(TRUNCATED_EXPRESSION, "table")
+
+    def test_table_every_prefix(self):
+        self.assert_every_prefix_rejected("table")
+
+    def test_recursive_after_unary_operator(self):
+        self.assert_rejected_at_end(TRUNCATED_EXPRESSION, "recursive")
+
+    def test_recursive_every_prefix(self):
+        self.assert_every_prefix_rejected("recursive")
+
+    def test_iterative_after_unary_operator(self):
+        self.assert_rejected_at_end(TRUNCATED_EXPRESSION, "iterative")
+
+    def test_iterative_inside_nested_expression(self):
+        self.assert_rejected_at_end(
+            "class A { function void f() { let x = a[(1 + -(~", "iterative")
+
+    def test_iterative_every_prefix(self):
+        self.assert_every_prefix_rejected("iterative")
+
+
+class MissingClosingBraceTest(unittest.TestCase):
+    """A class without its last '}' is an error at the end of the input,
+    also when recovering.
+    """
+
+    def test_every_engine(self):
+        with open(SQUARE_MAIN, 'r') as input_file:
+            source = input_file.read()
+        source = source[:source.rindex("}")]
+        line = source.count("\n") + 1
+        column = len(source) - source.rfind("\n")
+        for parser in ("recursive", "iterative", "table"):
+            with self.subTest(parser=parser):
+                with self.assertRaises(CompilationErrors) as raised:
+                    analyze(source, parser, recover=True)
+                errors = raised.exception.errors
+                self.assertEqual(len(errors), 1)
+                self.assertIn("end of input", errors[0].message)
+                self.assertEqual((errors[0].line, errors[0].column),
+                                 (line, column))
+
+
+class RecoverTest(unittest.TestCase):
+    """Every error is reported once, including one on the token parsing
+    resumed at.
+    """
+
+    def errors(self, body: str, parser: str) -> list:
+        source = f"class A {{ function void f() {{ {body} }} }}"
+        with self.assertRaises(CompilationErrors) as raised:
+            analyze(source, parser, recover=True)
+        return [(error.column, error.message)
+                for error in raised.exception.errors]
+
+    def test_error_where_parsing_resumes(self):
+        # Parsing resumes after the ';', where 'garbage' cannot go on.
+        body = "let = 5; garbage; return;"
+        for parser in ("recursive", "iterative", "table"):
+            with self.subTest(parser=parser):
+                errors = self.errors(body, parser)
+                self.assertEqual([column for column, _ in errors],
+                                 [35, 40])
+                self.assertIn("garbage", errors[1][1])
+
+    def test_repeated_error_reported_once(self):
+        # The statement cannot end at 'function', nor can the body.
+        source = "class A { function void f() { let x = 1 " \
+                 "function void g() { return; } }"
+        for parser in ("recursive", "iterative", "table"):
+            with self.subTest(parser=parser):
+                with self.assertRaises(CompilationErrors) as raised:
+                    output = io.StringIO()
+                    analyze_file(io.StringIO(source), output, parser=parser,
+                                 recover=True)
+                self.assertEqual([error.column
+                                  for error in raised.exception.errors],
+                                 [source.index("function void g") + 1])
+                self.assertIn("<identifier> g </identifier>",
+                              output.getvalue())
+
+
+class EmptyTermTest(unittest.TestCase):
+    """The recursive engines accept an empty term where a term cannot
+    start, the table parser does not, see PredictiveParser.GRAMMAR.
+    """
+
+    # Statements with an empty term, and where in them it is.
+    EMPTY_TERMS = (("let x = ;", 8), ("return 1 + ;", 11), ("do f(,);", 5))
+
+    def test_recursive_engines_emit_empty_terms(self):
+        for statement, _ in self.EMPTY_TERMS:
+            source = f"class A {{ function void f() {{ {statement} }} }}"
+            with self.subTest(statement=statement):
+                output = analyze(source, "recursive")
+                self.assertIn("<term>\n", output)
+                self.assertEqual(analyze(source, "iterative"), output)
+
+    def test_table_rejects_empty_terms(self):
+        for statement, offset in self.EMPTY_TERMS:
+            source = f"class A {{ function void f() {{ {statement} }} }}"
+            with self.subTest(statement=statement):
+                with self.assertRaises(CompilationError) as raised:
+                    analyze(source, "table")
+                self.assertEqual(raised.exception.column,
+                                 source.index(statement) + offset + 1)
+
+    def test_recover_counts_differ(self):
+        source = "class A { function void f() { %s } }" % \
+            " ".join(statement for statement, _ in self.EMPTY_TERMS)
+        analyze(source, "recursive", recover=True)
+        with self.assertRaises(CompilationErrors) as raised:
+            analyze(source, "table", recover=True)
+        self.assertEqual(len(raised.exception.errors), len(self.EMPTY_TERMS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import glob
+import io
+import os
+import random
+import unittest
+from CompilationEngine import CompilationError
+from Incremental import IncrementalParser
+from JackTokenizer import JackTokenizer
+from ParseTree import parse, to_xml
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SQUARE_GAME = os.path.join(ROOT, "p10", "Square", "SquareGame.jack")
+# What random edits insert: whole members and statements, half-typed ones,
+# and the tokens that open or close comments, strings and blocks.
+SNIPPETS = ("", " ", "\n", "x", "1", ";", "{", "}", "(", ")", "-", "/*",
+            "*/", "//", '"', '"a"', "let ", "let x = ", "let y = 1;",
+            "do f();", "return;", "var int q;", "field int z;\n",
+            "function void g() { return; }\n", " /* c */ ", "\n// c\n")
+
+
+def fresh_xml(source: str) -> str:
+    # What parsing the source from scratch makes of it, None on an error.
+    try:
+        return to_xml(parse(JackTokenizer(io.StringIO(source))),
+                      JackTokenizer(io.StringIO(source)))
+    except CompilationError:
+        return None
+
+
+class IncrementalParserTest(unittest.TestCase):
+
+    def edit(self, parser: IncrementalParser, source: str, start: int,
+             end: int, text: str) -> str:
+        # Edits both, and checks the parser against a fresh parse.
+        source = source[:start] + text + source[end:]
+        try:
+            parser.edit(start, end, text)
+            xml = parser.to_xml()
+        except CompilationError:
+            xml = None
+        self.assertEqual(xml, fresh_xml(source))
+        return source
+
+    def test_random_edits(self):
+        rng = random.Random(0)
+        paths = sorted(glob.glob(os.path.join(ROOT, "p10", "**", "*.jack"),
+                                 recursive=True))
+        for path in paths:
+            with open(path, 'r') as input_file:
+                original = input_file.read()
+            source = original
+            parser = IncrementalParser(source)
+            for step in range(40):
+                start = rng.randrange(len(source) + 1)
+                end = min(len(source), start + rng.choice((0, 0, 1, 2, 5, 20)))
+                text = rng.choice(SNIPPETS)
+                with self.subTest(path=path, step=step, start=start, end=end,
+                                  text=text):
+                    source = self.edit(parser, source, start, end, text)
+                # Mostly go back to a valid class, so members get parsed.
+                if parser.tree is None and rng.random() < 0.7:
+                    source = original
+                    parser = IncrementalParser(source)
+
+    def test_every_parser(self):
+        rng = random.Random(1)
+        with open(SQUARE_GAME, 'r') as input_file:
+            original = input_file.read()
+        for engine in ("recursive", "iterative", "table"):
+            source = original
+            parser = IncrementalParser(source, engine)
+            for step in range(40):
+                start = rng.randrange(len(source) + 1)
+                text = rng.choice(SNIPPETS)
+                with self.subTest(engine=engine, step=step):
+                    source = self.edit(parser, source, start, start, text)
+
+    def test_unterminated_comment_then_edit(self):
+        with open(SQUARE_GAME, 'r') as input_file:
+            source = input_file.read()
+        parser = IncrementalParser(source)
+        source = self.edit(parser, source, 2528, 2533, "/*")
+        self.assertIsNone(parser.tree)
+        self.edit(parser, source, 2326, 2346, " ")
+
+    def test_typing_a_statement(self):
+        # Every keystroke of a statement typed into a subroutine body.
+        with open(SQUARE_GAME, 'r') as input_file:
+            source = input_file.read()
+        parser = IncrementalParser(source)
+        body = source.index("{", source.index("method void dispose")) + 1
+        for offset, character in enumerate("\n let x = -(y + 1);"):
+            with self.subTest(typed=offset):
+                source = self.edit(parser, source, body + offset,
+                                   body + offset, character)
+        self.assertIsNotNone(parser.tree)
+
+    def test_table_rejects_empty_terms(self):
+        # A member parsed on its own is held to the table's rules too.
+        with open(SQUARE_GAME, 'r') as input_file:
+            source = input_file.read()
+        body = source.index("{", source.index("method void dispose")) + 1
+        for engine in ("recursive", "table"):
+            parser = IncrementalParser(source, engine)
+            with self.subTest(engine=engine):
+                try:
+                    parser.edit(body, body, " let x = ;")
+                    xml = parser.to_xml()
+                except CompilationError:
+                    xml = None
+                self.assertEqual(xml is None, engine == "table")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import glob
+import io
+import os
+import random
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from CompilationEngine import CompilationError
+from JackAnalyzer import analyze_file
+from JackTokenizer import JackTokenizer, TOKEN_CODES
+from ParallelParser import analyze_file_split, split_members
+import benchmark
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+P10_PATHS = sorted(glob.glob(os.path.join(ROOT, "p10", "**", "*.jack"),
+                             recursive=True))
+MEMBER_CODES = frozenset(TOKEN_CODES[keyword] for keyword in (
+    "static", "field", "constructor", "function", "method"))
+
+
+def serial(path: str, output_format: str, recover: bool = False,
+           parser: str = "recursive"):
+    # The output and error of the serial analyzer.
+    output_file = io.BytesIO() if output_format == "binary" else io.StringIO()
+    try:
+        with open(path, 'r') as input_file:
+            analyze_file(input_file, output_file,
+                         output_format=output_format, parser=parser,
+                         recover=recover)
+    except CompilationError as error:
+        return output_file.getvalue(), str(error)
+    return output_file.getvalue(), None
+
+
+class ParallelParserTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = ProcessPoolExecutor(2)
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.large_path = os.path.join(cls.directory.name, "Large.jack")
+        with open(cls.large_path, 'w') as large_file:
+            large_file.write(benchmark.generate_class(
+                random.Random(0), "Large",
+                benchmark.CorpusShape(subroutines=60, statements=5)))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+        cls.directory.cleanup()
+
+    def split(self, path: str, output_format: str, recover: bool = False,
+              parser: str = "recursive"):
+        output_file = io.BytesIO() if output_format == "binary" \
+            else io.StringIO()
+        try:
+            analyze_file_split(path, output_file, output_format, parser,
+                               recover=recover, jobs=2, pool=self.pool)
+        except CompilationError as error:
+            return output_file.getvalue(), str(error)
+        return output_file.getvalue(), None
+
+    def write(self, name: str, source: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as jack_file:
+            jack_file.write(source)
+        return path
+
+    def test_split_members(self):
+        for path in P10_PATHS + [self.large_path]:
+            with open(path, 'r') as input_file:
+                codes = JackTokenizer(input_file).columns()[0]
+            with self.subTest(path=path):
+                members, end = split_members(codes)
+                # The members follow each other from the header to the '}'.
+                self.assertEqual(
+                    [first for first, _ in members],
+                    [3] + [stop for _, stop in members[:-1]])
+                self.assertEqual(members[-1][1] if members else 3, end)
+                self.assertEqual(codes[end], TOKEN_CODES["}"])
+                for first, _ in members:
+                    self.assertIn(codes[first], MEMBER_CODES)
+
+    def test_p10_matches_serial(self):
+        for path in P10_PATHS + [self.large_path]:
+            for output_format in ("xml", "binary"):
+                with self.subTest(path=path, output_format=output_format):
+                    self.assertEqual(self.split(path, output_format),
+                                     serial(path, output_format))
+
+    def test_broken_classes_match_serial(self):
+        with open(self.large_path, 'r') as large_file:
+            source = large_file.read()
+        middle = len(source) // 2
+        broken = {
+            "MissingSemicolon.jack": source.replace("return;", "return", 1),
+            "MissingBrace.jack":
+                source[:middle] + source[middle:].replace("{", "", 1),
+            "LateField.jack":
+                source.replace("    }\n", "    }\n    static int z;\n", 1),
+            "Truncated.jack": source[:middle],
+            "Empty.jack": "",
+        }
+        for name, broken_source in broken.items():
+            path = self.write(name, broken_source)
+            for recover in (False, True):
+                with self.subTest(name=name, recover=recover):
+                    expected = serial(path, "xml", recover)
+                    self.assertIsNotNone(expected[1])
+                    self.assertEqual(self.split(path, "xml", recover),
+                                     expected)
+
+    def test_non_ascii_and_crlf_match_serial(self):
+        source = "class Wide {\r\n" + "".join(
+            f"  function void f{index}() {{\r\n"
+            f"    var int x; // naïve\r\n"
+            f"    do Output.printString(\"héllo wörld {index}\");\r\n"
+            f"    return;\r\n  }}\r\n" for index in range(8)) + "}\r\n"
+        path = os.path.join(self.directory.name, "Wide.jack")
+        with open(path, 'w', newline="") as jack_file:
+            jack_file.write(source)
+        expected = serial(path, "xml")
+        self.assertIsNone(expected[1])
+        self.assertIn("<stringConstant> héllo wörld 0 </stringConstant>",
+                      expected[0])
+        self.assertEqual(self.split(path, "xml"), expected)
+
+    def test_every_parser_on_empty_terms(self):
+        # The workers parse members by the table too, so they reject the
+        # empty terms the serial table parser rejects.
+        with open(self.large_path, 'r') as large_file:
+            source = large_file.read()
+        path = self.write("EmptyTerm.jack",
+                          source.replace("return;", "let x = ; return;", 1))
+        for parser in ("recursive", "iterative", "table"):
+            with self.subTest(parser=parser):
+                expected = serial(path, "xml", parser=parser)
+                self.assertEqual(expected[1] is None, parser != "table")
+                self.assertEqual(self.split(path, "xml", parser=parser),
+                                 expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import JackAnalyzer
+import Pipeline
+from JackAnalyzer import analyze_file, output_path_for
+from Pipeline import analyze_paths_pipelined
+
+SQUARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Square")
+BROKEN = "class Broken { function void f() { let = 5; return; } }\n"
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        with open(os.path.join(SQUARE, "Main.jack"), 'r') as input_file:
+            self.source = input_file.read()
+        self.input_paths = []
+        for index in range(12):
+            self.input_paths.append(
+                os.path.join(self.directory, f"Main{index}.jack"))
+            with open(self.input_paths[-1], 'w') as jack_file:
+                jack_file.write(self.source)
+        expected = io.StringIO()
+        analyze_file(io.StringIO(self.source), expected)
+        self.expected = expected.getvalue()
+        # What happened, in order, e.g. ("read", path).
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, event: str, path: str) -> None:
+        with self.lock:
+            self.events.append((event, path))
+
+    def count(self, event: str) -> int:
+        return sum(1 for kind, _ in self.events if kind == event)
+
+    def output_of(self, input_path: str) -> str:
+        with open(output_path_for(input_path), 'r') as output_file:
+            return output_file.read()
+
+    @contextlib.contextmanager
+    def traced(self, parse_delay: float = 0, write_delay: float = 0):
+        # Records every read, parse and write of the pipeline, slowing the
+        # parses or the writes down.
+        opened = open
+        parse = Pipeline.analyze_file
+        write = Pipeline.write_analysis
+
+        def traced_open(path, *args, **kwargs):
+            self.record("read", path)
+            return opened(path, *args, **kwargs)
+
+        def traced_parse(*args, **kwargs):
+            self.record("parse", None)
+            time.sleep(parse_delay)
+            return parse(*args, **kwargs)
+
+        def traced_write(analysis, *args):
+            time.sleep(write_delay)
+            write(analysis, *args)
+            self.record("write", analysis.name)
+
+        with mock.patch.object(Pipeline, "open", traced_open, create=True), \
+                mock.patch.object(Pipeline, "analyze_file", traced_parse), \
+                mock.patch.object(Pipeline, "write_analysis", traced_write):
+            yield
+
+    def test_outputs_are_written_in_order(self):
+        with self.traced():
+            self.assertEqual(analyze_paths_pipelined(self.input_paths), [])
+        self.assertEqual([path for kind, path in self.events
+                          if kind == "write"], self.input_paths)
+        for input_path in self.input_paths:
+            self.assertEqual(self.output_of(input_path), self.expected)
+
+    def test_reading_is_held_back_by_parsing(self):
+        prefetch = 2
+        ahead = []
+
+        def watch(event: str, path: str) -> None:
+            with self.lock:
+                self.events.append((event, path))
+                if event == "parse":
+                    ahead.append(self.count("read") - self.count("parse"))
+
+        with mock.patch.object(self, "record", watch), \
+                self.traced(parse_delay=0.01):
+            analyze_paths_pipelined(self.input_paths, prefetch=prefetch)
+        # The files in the queue, and the one waiting to be put in it.
+        self.assertLessEqual(max(ahead), prefetch + 1)
+        self.assertGreater(max(ahead), 0)
+
+    def test_parsing_is_held_back_by_writing(self):
+        prefetch = 2
+        behind = []
+
+        def watch(event: str, path: str) -> None:
+            with self.lock:
+                self.events.append((event, path))
+                if event == "parse":
+                    behind.append(self.count("parse") - self.count("write"))
+
+        with mock.patch.object(self, "record", watch), \
+                self.traced(write_delay=0.01):
+            analyze_paths_pipelined(self.input_paths, prefetch=prefetch)
+        # The outputs in the queue, the one being written and the one being
+        # parsed.
+        self.assertLessEqual(max(behind), prefetch + 2)
+
+    def test_failures_partway(self):
+        broken_path = self.input_paths[4]
+        with open(broken_path, 'w') as broken_file:
+            broken_file.write(BROKEN)
+        missing_path = os.path.join(self.directory, "Missing.jack")
+        self.input_paths.insert(8, missing_path)
+        errors = analyze_paths_pipelined(self.input_paths)
+        self.assertEqual([path for path, _ in errors],
+                         [broken_path, missing_path])
+        self.assertIsInstance(errors[1][1], OSError)
+        self.assertEqual(self.output_of(broken_path), "")
+        for input_path in self.input_paths:
+            if input_path not in (broken_path, missing_path):
+                self.assertEqual(self.output_of(input_path), self.expected)
+
+    def test_mmap_is_rejected(self):
+        argv = ["JackAnalyzer", self.directory, "--pipeline", "--mmap"]
+        with mock.patch.object(sys, "argv", argv), \
+                contextlib.redirect_stderr(io.StringIO()) as stderr, \
+                self.assertRaises(SystemExit):
+            JackAnalyzer.parse_arguments()
+        self.assertIn("--mmap", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from BuildCache import BuildCache
+from JackAnalyzer import analyze_paths, _profile_to_string
+from Profiler import FileProfile, Profiler
+
+SQUARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Square")
+
+
+class WritePhaseTest(unittest.TestCase):
+    """Every phase of a file is timed once, whichever way analyze_paths
+    gets its output to disk.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.input_paths = []
+        for name in ("Main.jack", "Square.jack"):
+            self.input_paths.append(os.path.join(self.directory, name))
+            shutil.copy(os.path.join(SQUARE, name), self.input_paths[-1])
+
+    def assert_timed_once(self, **options) -> None:
+        profiler = Profiler()
+        timed = []
+        add = FileProfile.add
+
+        def record(profile, name, wall, cpu):
+            timed.append((id(profile), name))
+            add(profile, name, wall, cpu)
+
+        with mock.patch.object(FileProfile, "add", record):
+            self.assertEqual(analyze_paths(self.input_paths,
+                                           profiler=profiler, **options), [])
+        self.assertEqual(len(profiler.files), len(self.input_paths))
+        for profile in profiler.files.values():
+            self.assertIn("write", profile.phases)
+        self.assertEqual(len(timed), len(set(timed)))
+
+    def test_serial(self):
+        self.assert_timed_once()
+
+    def test_serial_with_cache(self):
+        cache = BuildCache(os.path.join(self.directory, "cache.json"))
+        self.assert_timed_once(cache=cache)
+
+    def test_workers(self):
+        # A worker only returns the output, which this process writes.
+        _, profile = _profile_to_string(self.input_paths[0])
+        self.assertNotIn("write", profile.phases)
+        self.assertIn("serialize", profile.phases)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import base64
+import io
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from AnalyzerServer import AnalyzerServer, request
+from JackAnalyzer import analyze_file, output_path_for
+
+SQUARE_MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "Square", "Main.jack")
+BROKEN = "class Broken { function void f() { let = 5; return; } }\n"
+
+
+def analyze(source: str, output_format: str = "xml",
+            recover: bool = False):
+    output = io.BytesIO() if output_format == "binary" else io.StringIO()
+    try:
+        analyze_file(io.StringIO(source), output,
+                     output_format=output_format, recover=recover)
+    except Exception:
+        pass
+    return output.getvalue()
+
+
+class AnalyzerServerTest(unittest.TestCase):
+    """Requests and responses over a real socket, one JSON line each."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.socket_path = os.path.join(self.directory, "analyzer.sock")
+        self.server = AnalyzerServer(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       args=(0.01,))
+        self.thread.start()
+        self.addCleanup(self.stop)
+        with open(SQUARE_MAIN, 'r') as input_file:
+            self.source = input_file.read()
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.server.shutdown()
+            self.thread.join()
+        self.server.server_close()
+
+    def send_lines(self, *lines: bytes) -> list:
+        # Sends raw lines on one connection, and reads a response to each.
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(self.socket_path)
+            connection.sendall(b"".join(line + b"\n" for line in lines))
+            connection.shutdown(socket.SHUT_WR)
+            with connection.makefile("rb") as responses:
+                return [json.loads(line) for line in responses]
+
+    def test_ping(self):
+        self.assertEqual(request(self.socket_path, {"command": "ping"}),
+                         {"ok": True})
+
+    def test_source(self):
+        response = request(self.socket_path, {"source": self.source})
+        self.assertEqual(response, {"ok": True,
+                                    "output": analyze(self.source)})
+
+    def test_binary_source(self):
+        response = request(self.socket_path,
+                           {"source": self.source, "format": "binary"})
+        self.assertEqual(response["encoding"], "base64")
+        self.assertEqual(base64.b64decode(response["output"]),
+                         analyze(self.source, "binary"))
+
+    def test_tokens(self):
+        response = request(self.socket_path,
+                           {"source": self.source, "tokens": True})
+        self.assertTrue(response["ok"])
+        self.assertTrue(response["output"].startswith("<tokens>"))
+
+    def test_syntax_error(self):
+        response = request(self.socket_path, {"source": BROKEN})
+        self.assertFalse(response["ok"])
+        self.assertIn("line 1", response["error"])
+        self.assertNotIn("output", response)
+
+    def test_syntax_errors_when_recovering(self):
+        response = request(self.socket_path,
+                           {"source": BROKEN, "recover": True})
+        self.assertFalse(response["ok"])
+        self.assertEqual(len(response["errors"]), 1)
+        self.assertEqual(response["output"], analyze(BROKEN, recover=True))
+
+    def test_paths(self):
+        valid_path = os.path.join(self.directory, "Main.jack")
+        broken_path = os.path.join(self.directory, "Broken.jack")
+        shutil.copy(SQUARE_MAIN, valid_path)
+        with open(broken_path, 'w') as broken_file:
+            broken_file.write(BROKEN)
+        response = request(self.socket_path, {"paths": [self.directory]})
+        self.assertFalse(response["ok"])
+        self.assertEqual([error["path"] for error in response["errors"]],
+                         [broken_path])
+        with open(output_path_for(valid_path), 'r') as output_file:
+            self.assertEqual(output_file.read(), analyze(self.source))
+
+    def test_bad_requests(self):
+        responses = self.send_lines(
+            b"{not json", b"[1, 2]", b'{"source": 5}',
+            b'{"source": "", "format": "nope"}', b'{"paths": "Main.jack"}',
+            b"{}", b'{"command": "dance"}', b"",
+            b'{"command": "ping"}')
+        self.assertEqual(len(responses), 8)
+        for response in responses[:-1]:
+            with self.subTest(response=response):
+                self.assertFalse(response["ok"])
+                self.assertTrue(response["error"].startswith("bad request"))
+        # The connection is still served after them.
+        self.assertEqual(responses[-1], {"ok": True})
+
+    def test_many_requests_on_one_connection(self):
+        lines = [json.dumps({"source": source}).encode()
+                 for source in (self.source, BROKEN, self.source)]
+        responses = self.send_lines(*lines)
+        self.assertEqual([response["ok"] for response in responses],
+                         [True, False, True])
+
+    def test_second_server_is_refused(self):
+        with self.assertRaises(OSError):
+            AnalyzerServer(self.socket_path)
+
+    def test_shutdown(self):
+        self.assertEqual(request(self.socket_path, {"command": "shutdown"}),
+                         {"ok": True})
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from JackTokenizer import JackTokenizer
+from TokenCache import TokenCache, _HEADER
+
+SQUARE_MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "Square", "Main.jack")
+
+
+class TokenCacheTest(unittest.TestCase):
+    """A token file is only used when it is whole and was written by this
+    tokenizer, otherwise the source is tokenized again.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = TokenCache(self.directory)
+        with open(SQUARE_MAIN, 'r') as input_file:
+            self.source = input_file.read()
+        self.calls = 0
+        self.tokenizer = JackTokenizer(io.StringIO(""))
+
+    def tokenize(self, source):
+        self.calls += 1
+        return self.tokenizer.tokenize(source)
+
+    def columns(self, source):
+        return tuple(column.tolist() for column in
+                     self.cache.get_or_tokenize(source, self.tokenize))
+
+    def test_hit_after_miss(self):
+        for source in (self.source, self.source.encode()):
+            with self.subTest(binary=isinstance(source, bytes)):
+                self.calls = 0
+                expected = tuple(column.tolist() for column in
+                                 self.tokenizer.tokenize(source))
+                self.assertEqual(self.columns(source), expected)
+                self.assertEqual(self.columns(source), expected)
+                self.assertEqual(self.calls, 1)
+
+    def test_text_and_bytes_are_kept_apart(self):
+        self.assertNotEqual(self.cache._path(self.source),
+                            self.cache._path(self.source.encode()))
+
+    def test_corrupt_files_miss(self):
+        path = self.cache._path(self.source)
+        expected = self.columns(self.source)
+        with open(path, 'rb') as token_file:
+            good = token_file.read()
+        # The typecode is the last byte of the header.
+        typecode = _HEADER.size - 1
+        corrupt = {
+            "empty": b"",
+            "truncated": good[:len(good) // 2],
+            "header only": good[:_HEADER.size],
+            "trailing bytes": good + b"\0",
+            "magic": b"XXXX" + good[4:],
+            "version": good[:4] + bytes(32) + good[36:],
+        }
+        for code in (b"x", b"\xff", b"d", b"b"):
+            corrupt[f"typecode {code!r}"] = \
+                good[:typecode] + code + good[typecode + 1:]
+        for name, data in corrupt.items():
+            with self.subTest(name=name):
+                with open(path, 'wb') as token_file:
+                    token_file.write(data)
+                self.assertIsNone(self.cache.load(path))
+                self.calls = 0
+                self.assertEqual(self.columns(self.source), expected)
+                self.assertEqual(self.calls, 1)
+                # It was written again, whole.
+                self.assertIsNotNone(self.cache.load(path))
+
+    def test_tokenizer_with_cache(self):
+        for use_cache in (False, True, True):
+            tokenizer = JackTokenizer(
+                io.StringIO(self.source),
+                token_cache=self.cache if use_cache else None)
+            values = []
+            while tokenizer.has_more_tokens():
+                values.append(tokenizer.current_token_val())
+                tokenizer.advance()
+            if not use_cache:
+                expected = values
+            self.assertEqual(values, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import glob
+import io
+import os
+import random
+import tempfile
+import unittest
+from JackTokenizer import JackTokenizer, UNKNOWN_CODE
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+JACK_PATHS = sorted(glob.glob(os.path.join(ROOT, "**", "*.jack"),
+                              recursive=True))
+# Pieces of source that scan differently depending on what is around them.
+FRAGMENTS = ("a", "b1", "12", " ", "\n", "\r\n", '"s t"', '"', "//", "/*",
+             "*/", "/", "*", ";", "class", '"a//b"', '"/*"', "/**/", "/*/")
+
+
+def dump(tokenizer: JackTokenizer) -> list:
+    # Everything the tokenizer tells about every token, in order.
+    tokens = []
+    while tokenizer.has_more_tokens():
+        tokens.append((tokenizer.lexeme(), tokenizer.token_type(),
+                       tokenizer.current_token_val(),
+                       tokenizer.token_type_translated()))
+        tokenizer.advance()
+    return tokens
+
+
+def read(path: str) -> str:
+    with open(path, 'r', newline='') as input_file:
+        return input_file.read()
+
+
+class LazyTokenizerTest(unittest.TestCase):
+    """The lazy, chunked mode finds the same tokens as the eager one,
+    wherever the chunks end.
+    """
+
+    def assert_same_tokens(self, source: str, chunk_sizes) -> None:
+        expected = dump(JackTokenizer(io.StringIO(source, newline='')))
+        for chunk_size in chunk_sizes:
+            with self.subTest(source=source[:40], chunk_size=chunk_size):
+                tokenizer = JackTokenizer(io.StringIO(source, newline=''),
+                                          lazy=True, chunk_size=chunk_size)
+                self.assertEqual(dump(tokenizer), expected)
+
+    def test_chunk_ends_inside_multi_line_comment(self):
+        source = "let x = 1;\n/* a comment\n that runs on ; \n*/ let y = 2;\n"
+        self.assert_same_tokens(source, range(1, len(source) + 1))
+
+    def test_chunk_ends_inside_comment_closer(self):
+        source = "a\n/* x\n**/b\n/*\n*/c /**/\nd"
+        self.assert_same_tokens(source, range(1, len(source) + 1))
+
+    def test_chunk_ends_inside_string(self):
+        source = 'do f("a // not /* a comment");\nlet s = "x y";\n'
+        self.assert_same_tokens(source, range(1, len(source) + 1))
+
+    def test_chunk_ends_inside_crlf(self):
+        source = "class A {\r\n  field int x; // c\r\n  /* d\r\n */ }\r\n"
+        self.assert_same_tokens(source, range(1, len(source) + 1))
+
+    def test_random_sources(self):
+        rng = random.Random(2)
+        for _ in range(500):
+            source = "".join(rng.choice(FRAGMENTS)
+                             for _ in range(rng.randint(0, 15)))
+            self.assert_same_tokens(source, (1, 2, 3, 7, 4096))
+
+    def test_jack_files(self):
+        for path in JACK_PATHS:
+            self.assert_same_tokens(read(path), (1, 17, 4096))
+
+
+class ColumnarTokenizerTest(unittest.TestCase):
+    """Bytes and memory-mapped input give the same tokens as text."""
+
+    def assert_same_tokens(self, source: str) -> None:
+        expected = dump(JackTokenizer(io.StringIO(source, newline='')))
+        encoded = source.encode()
+        self.assertEqual(dump(JackTokenizer(io.BytesIO(encoded))), expected)
+        with tempfile.TemporaryFile() as input_file:
+            input_file.write(encoded)
+            input_file.seek(0)
+            tokenizer = JackTokenizer(input_file, use_mmap=True)
+            try:
+                self.assertEqual(dump(tokenizer), expected)
+            finally:
+                tokenizer.close()
+
+    def test_non_ascii(self):
+        self.assert_same_tokens(
+            'class A { /* é */ function void f() {\n'
+            '  do Output.printString("naïve – ✓"); return; } }\n')
+
+    def test_non_ascii_outside_strings(self):
+        # Letters, digits and whitespace that are not ASCII are not Jack's,
+        # whichever way the source is read.
+        for source in ("let café = 1;", "let x = ٣٤;", "let x = 1;",
+                       "let x = 1; ", "let x = 1;\x85\x1c",
+                       "let é = 1;", "let x = 😀;", "let ǅx = 1;"):
+            with self.subTest(source=source):
+                self.assert_same_tokens(source)
+        tokenizer = JackTokenizer(io.StringIO("let café = ٣;"))
+        self.assertEqual(
+            [tokenizer.lexeme_at(index)
+             for index in range(tokenizer.token_count)],
+            ["let", "caf", "é", "=", "٣", ";"])
+
+    def test_random_sources(self):
+        rng = random.Random(3)
+        for _ in range(300):
+            source = "".join(rng.choice(FRAGMENTS + ('"ü"', "/* é */",
+                                                     "// ✓\n"))
+                             for _ in range(rng.randint(0, 15)))
+            with self.subTest(source=source):
+                self.assert_same_tokens(source)
+
+    def test_jack_files(self):
+        for path in JACK_PATHS:
+            with self.subTest(path=path):
+                self.assert_same_tokens(read(path))
+
+    def test_stray_non_ascii(self):
+        # Invalid outside strings and comments, but still a token.
+        source = "let x = é;"
+        for input_file in (io.StringIO(source), io.BytesIO(source.encode())):
+            tokenizer = JackTokenizer(input_file)
+            lexemes = [tokenizer.lexeme_at(index)
+                       for index in range(tokenizer.token_count)]
+            self.assertIn("é", lexemes)
+            self.assertEqual(tokenizer.code_at(lexemes.index("é")),
+                             UNKNOWN_CODE)
+
+    def test_index_based_methods(self):
+        source = read(os.path.join(ROOT, "Square", "Square.jack"))
+        tokenizer = JackTokenizer(io.StringIO(source))
+        codes, starts, ends = tokenizer.columns()
+        self.assertEqual(tokenizer.token_count, len(codes))
+        for index in range(tokenizer.token_count):
+            token = tokenizer.token_at(index)
+            self.assertEqual(token.lexeme, source[starts[index]:ends[index]])
+            self.assertEqual(token.code, codes[index])
+            line, column = tokenizer.position_at(index)
+            before = source[:starts[index]]
+            self.assertEqual(line, before.count("\n") + 1)
+            self.assertEqual(column, starts[index] - before.rfind("\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()